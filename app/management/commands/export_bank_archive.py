@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from app.models import QuestionBank
+from app.services.bank_archive import write_bank_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta un banco de preguntas con sus opciones y multimedia a un "
+        "archivo portable, que se importa con import_bank_archive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bank_id", type=int, help="ID del banco de preguntas")
+        parser.add_argument("output", help="Ruta del archivo ZIP a generar")
+
+    def handle(self, *args, **options):
+        try:
+            bank = QuestionBank.objects.get(
+                pk=options["bank_id"], deleted_at__isnull=True
+            )
+        except QuestionBank.DoesNotExist:
+            raise CommandError(f"El banco {options['bank_id']} no existe.")
+
+        with open(options["output"], "wb") as output:
+            manifest = write_bank_archive(bank, output)
+
+        for name in manifest["missing_media"]:
+            self.stdout.write(self.style.WARNING(f"Archivo no encontrado: {name}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Banco exportado: {manifest['questions']} preguntas, "
+                f"{manifest['options']} opciones y {manifest['media']} archivos."
+            )
+        )
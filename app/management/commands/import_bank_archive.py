@@ -0,0 +1,50 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from app.models import Institution
+from app.services.bank_archive import import_bank_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea un banco de preguntas a partir de un archivo generado con "
+        "export_bank_archive, en esta u otra instalación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Ruta del banco exportado (ZIP)")
+        parser.add_argument("--name", help="Nombre del banco nuevo")
+        parser.add_argument(
+            "--institution", type=int, help="ID de la institución del banco"
+        )
+
+    def handle(self, *args, **options):
+        institution = None
+        if options["institution"]:
+            try:
+                institution = Institution.objects.get(
+                    pk=options["institution"], deleted_at__isnull=True
+                )
+            except Institution.DoesNotExist:
+                raise CommandError(
+                    f"La institución {options['institution']} no existe."
+                )
+
+        try:
+            with open(options["archive"], "rb") as archive:
+                report = import_bank_archive(
+                    archive, institution=institution, name=options["name"]
+                )
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        for name in report["areas_created"]:
+            self.stdout.write(f"Área de conocimiento creada: {name}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Banco '{report['bank'].name}' importado (id {report['bank'].id}): "
+                f"{report['questions']} preguntas, {report['options']} opciones, "
+                f"{report['media_created']} archivos copiados y "
+                f"{report['media_reused']} reutilizados."
+            )
+        )
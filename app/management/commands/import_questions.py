@@ -0,0 +1,65 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from app.models import QuestionBank
+from app.services.question_import import import_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa preguntas a un banco desde un archivo XLSX o CSV, con un ZIP "
+        "opcional de imágenes y audios, y reporta las filas con errores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("bank_id", type=int, help="ID del banco de preguntas")
+        parser.add_argument("file", help="Ruta del archivo XLSX o CSV")
+        parser.add_argument("--media", help="Ruta del ZIP de multimedia")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Valida el archivo sin importar preguntas",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            bank = QuestionBank.objects.get(
+                pk=options["bank_id"], deleted_at__isnull=True
+            )
+        except QuestionBank.DoesNotExist:
+            raise CommandError(f"El banco {options['bank_id']} no existe.")
+
+        media = open(options["media"], "rb") if options["media"] else None
+
+        try:
+            with open(options["file"], "rb") as file:
+                report = import_questions(
+                    bank,
+                    file,
+                    options["file"],
+                    media_file=media,
+                    dry_run=options["dry_run"],
+                )
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+        finally:
+            if media:
+                media.close()
+
+        for item in report["errors"]:
+            for error in item["errors"]:
+                self.stdout.write(self.style.WARNING(f"Fila {item['row']}: {error}"))
+
+        self.stdout.write(
+            f"Filas: {report['total_rows']} - válidas: {report['valid_rows']} - "
+            f"con errores: {len(report['errors'])}"
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS("Validación completada."))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Preguntas importadas: {report['created']} "
+                    f"({report['options']} opciones)."
+                )
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from app.services.question_search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de búsqueda de texto completo de las preguntas, "
+        "por ejemplo después de restaurar la tabla FTS5 o cambiar su configuración."
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Preguntas reindexadas: {total}"))
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from app.models import Question
+from app.services.sprt_rescoring import REGRADE_BATCH_SIZE, regrade_question
+
+
+class Command(BaseCommand):
+    help = (
+        "Corrige los intentos que respondieron una pregunta después de cambiar "
+        "su clave de respuestas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("question_id", type=int)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Muestra los cambios sin guardarlos",
+        )
+        parser.add_argument("--batch-size", type=int, default=REGRADE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not Question.objects.filter(pk=options["question_id"]).exists():
+            raise CommandError("La pregunta no existe.")
+
+        started = time.perf_counter()
+        report = regrade_question(
+            options["question_id"],
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for change in report["changed_attempts"]:
+            if change["old_status"] != change["new_status"]:
+                self.stdout.write(
+                    f"Intento {change['attempt_id']}: "
+                    f"{change['old_status']} -> {change['new_status']}"
+                )
+
+        self.stdout.write(
+            f"Intentos afectados: {report['attempts']}, "
+            f"respuestas reproducidas: {report['answers']} ({elapsed:.2f}s)"
+        )
+        self.stdout.write(
+            f"Intentos modificados: {len(report['changed_attempts'])} "
+            f"({report['status_changes']} con cambio de resultado), "
+            f"respuestas: {report['changed_answers']}, "
+            f"niveles: {report['changed_levels']}"
+        )
+
+        if options["dry_run"]:
+            self.stdout.write("Simulación: no se guardó ningún cambio.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Recalificación completada."))
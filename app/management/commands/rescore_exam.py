@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from app.models import Exam, ExamSPRTConfig
+from app.services.sprt_rescoring import BATCH_SIZE, rescore_exam
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el índice S y el resultado de los intentos históricos de un "
+        "examen con su configuración SPRT actual."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Muestra los cambios sin guardarlos",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        try:
+            report = rescore_exam(
+                options["exam_id"],
+                dry_run=options["dry_run"],
+                batch_size=options["batch_size"],
+            )
+        except (Exam.DoesNotExist, ExamSPRTConfig.DoesNotExist):
+            raise CommandError("El examen no existe o no tiene configuración SPRT.")
+
+        elapsed = time.perf_counter() - started
+
+        for change in report["changed_attempts"]:
+            self.stdout.write(
+                f"Intento {change['attempt_id']}: "
+                f"{change['old_status']} -> {change['new_status']}, "
+                f"S {change['old_s_index']:.4f} -> {change['new_s_index']:.4f}"
+            )
+
+        self.stdout.write(
+            f"Intentos procesados: {report['attempts']}, "
+            f"respuestas: {report['answers']} ({elapsed:.2f}s)"
+        )
+        self.stdout.write(
+            f"Intentos modificados: {len(report['changed_attempts'])} "
+            f"({report['status_changes']} con cambio de resultado), "
+            f"respuestas: {report['changed_answers']}, "
+            f"niveles: {report['changed_levels']}"
+        )
+
+        if options["dry_run"]:
+            self.stdout.write("Simulación: no se guardó ningún cambio.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Recalificación completada."))
@@ -0,0 +1,59 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from app.services.export_jobs import claim_next_job, purge_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de exportaciones: genera los archivos solicitados "
+        "desde la aplicación y los deja listos para descargar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesa los trabajos pendientes y termina",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Segundos de espera cuando la cola está vacía",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Días que se conservan los archivos generados (0 para no depurar)",
+        )
+
+    def handle(self, *args, **options):
+        if options["keep_days"]:
+            purged = purge_jobs(timezone.now() - timedelta(days=options["keep_days"]))
+            if purged:
+                self.stdout.write(f"Exportaciones antiguas eliminadas: {purged}")
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            started = time.perf_counter()
+            self.stdout.write(f"Generando exportación {job.pk}: {job.title}")
+
+            if run_job(job):
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    self.style.SUCCESS(f"Exportación {job.pk} lista ({elapsed:.2f}s)")
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f"Exportación {job.pk} falló"))
@@ -0,0 +1,163 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from app.models import Exam, ExamSPRTConfig
+from app.services.exam_runtime import get_exam_runtime
+from app.services.question_pool import get_question_pool
+from app.services import sprt_simulation
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula intentos SPRT de examinados sintéticos sobre el banco real de "
+        "preguntas de un examen, para ajustar su configuración antes de aplicarlo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("--examinees", type=int, default=20000)
+        parser.add_argument(
+            "--ability-mean",
+            type=float,
+            default=0.6,
+            help="Probabilidad media de acierto en el nivel más bajo (0-1)",
+        )
+        parser.add_argument("--ability-sd", type=float, default=0.15)
+        parser.add_argument(
+            "--level-drop",
+            type=float,
+            default=0.05,
+            help="Disminución de la probabilidad de acierto por cada nivel",
+        )
+        parser.add_argument(
+            "--competence-threshold",
+            type=float,
+            default=None,
+            help="Habilidad a partir de la cual un examinado es competente "
+            "(por defecto, el punto medio entre P0 y P1)",
+        )
+        parser.add_argument("--seed", type=int, default=None)
+
+        # Parámetros a evaluar en lugar de la configuración guardada
+        parser.add_argument("--p0", type=float)
+        parser.add_argument("--p1", type=float)
+        parser.add_argument("--alpha", type=float)
+        parser.add_argument("--beta", type=float)
+        parser.add_argument("--min-questions-per-level", type=int)
+        parser.add_argument("--success-threshold-to-advance", type=float)
+        parser.add_argument("--max-questions", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            runtime = get_exam_runtime(options["exam_id"])
+        except (Exam.DoesNotExist, ExamSPRTConfig.DoesNotExist):
+            raise CommandError("El examen no existe o no tiene configuración SPRT.")
+
+        exam = runtime.exam
+        config = runtime.config
+
+        params = {
+            "p0": options["p0"] if options["p0"] is not None else config.p0,
+            "p1": options["p1"] if options["p1"] is not None else config.p1,
+            "alpha": (
+                options["alpha"] if options["alpha"] is not None else config.alpha
+            ),
+            "beta": options["beta"] if options["beta"] is not None else config.beta,
+            "min_questions_per_level": (
+                options["min_questions_per_level"]
+                if options["min_questions_per_level"] is not None
+                else config.min_questions_per_level
+            ),
+            "success_threshold_to_advance": (
+                options["success_threshold_to_advance"]
+                if options["success_threshold_to_advance"] is not None
+                else config.success_threshold_to_advance
+            ),
+            "max_questions": (
+                options["max_questions"]
+                if options["max_questions"] is not None
+                else exam.max_questions
+            ),
+            "enable_difficulty_progression": exam.enable_difficulty_progression,
+        }
+
+        if params["p0"] <= params["p1"]:
+            raise CommandError("P0 debe ser mayor que P1.")
+
+        # Instantánea del banco de preguntas por nivel
+        levels = runtime.levels
+        if not levels:
+            raise CommandError("No hay niveles de dificultad registrados.")
+
+        pool = get_question_pool(runtime)
+        pool_sizes = [
+            len(pool.question_ids_by_level.get(level.id, [])) for level in levels
+        ]
+
+        competence_threshold = options["competence_threshold"]
+        if competence_threshold is None:
+            competence_threshold = (params["p0"] + params["p1"]) / 200
+
+        rng = np.random.default_rng(options["seed"])
+        ability, p_correct = sprt_simulation.synthetic_examinees(
+            options["examinees"],
+            len(levels),
+            options["ability_mean"],
+            options["ability_sd"],
+            options["level_drop"],
+            rng=rng,
+        )
+
+        started = time.perf_counter()
+        result = sprt_simulation.simulate(pool_sizes, p_correct, rng=rng, **params)
+        elapsed = time.perf_counter() - started
+
+        summary = sprt_simulation.summarize(result, ability, competence_threshold)
+
+        self.stdout.write(f"Examen: {exam.title}")
+        self.stdout.write(
+            "Parámetros: P0={p0}, P1={p1}, alpha={alpha}, beta={beta}, "
+            "mínimo por nivel={min_questions_per_level}, "
+            "umbral de avance={success_threshold_to_advance}, "
+            "máximo de preguntas={max_questions}".format(**params)
+        )
+        self.stdout.write(
+            f"Examinados simulados: {summary['examinees']} en {elapsed:.2f}s"
+        )
+        self.stdout.write(
+            f"Longitud promedio: {summary['average_questions']:.2f} preguntas"
+        )
+        rates = [
+            ("Tasa de aprobación", "pass_rate"),
+            ("Examinados competentes", "competent_rate"),
+            ("Aprobados sin ser competentes", "false_approval_rate"),
+            ("Reprobados siendo competentes", "false_failure_rate"),
+            ("Clasificación errónea total", "misclassification_rate"),
+        ]
+        for label, key in rates:
+            self.stdout.write(f"{label}: {summary[key] * 100:.2f}%")
+
+        reasons = summary["reasons"]
+        self.stdout.write("Motivos de finalización:")
+        self.stdout.write(
+            f"  Límite inferior (aprobado): {reasons[sprt_simulation.REASON_APPROVED]}"
+        )
+        self.stdout.write(
+            f"  Límite superior (reprobado): {reasons[sprt_simulation.REASON_FAILED]}"
+        )
+        self.stdout.write(
+            f"  Máximo de preguntas: {reasons[sprt_simulation.REASON_MAX_QUESTIONS]}"
+        )
+        self.stdout.write(
+            "  Sin preguntas disponibles: "
+            f"{reasons[sprt_simulation.REASON_NO_MORE_QUESTIONS]}"
+        )
+
+        self.stdout.write("Por nivel:")
+        for index, level in enumerate(levels):
+            self.stdout.write(
+                f"  {level.name}: {pool_sizes[index]} preguntas, "
+                f"{summary['average_answered_per_level'][index]:.2f} respondidas "
+                f"en promedio, agotado en el "
+                f"{summary['exhaustion_per_level'][index] * 100:.2f}% de los intentos"
+            )
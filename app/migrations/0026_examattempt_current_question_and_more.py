@@ -0,0 +1,24 @@
+# Generated by Django 4.2.23 on 2026-10-17 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0025_rename_attempts_exam_max_attempts_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='current_question',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='issued_attempts', to='app.question'),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='current_question_issued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0026_examattempt_current_question_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='examattempt',
+            name='s_history',
+        ),
+    ]
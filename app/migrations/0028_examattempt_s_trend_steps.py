@@ -0,0 +1,77 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:25
+
+from django.db import migrations, models
+
+
+def backfill_in_progress(apps, schema_editor):
+    """
+    Calcula la tendencia del índice S y el análisis por nivel de los intentos
+    en progreso, que a partir de ahora se mantienen respuesta a respuesta.
+    """
+    ExamAttempt = apps.get_model("app", "ExamAttempt")
+    AttemptAnswer = apps.get_model("app", "AttemptAnswer")
+    LevelProgress = apps.get_model("app", "LevelProgress")
+
+    attempts = ExamAttempt.objects.filter(status="in_progress")
+
+    for attempt in attempts.iterator():
+        history = list(
+            AttemptAnswer.objects.filter(attempt=attempt)
+            .order_by("question_number")
+            .values_list("s_index_after", flat=True)
+        )
+        attempt.s_decreasing_steps = sum(
+            1 for i in range(1, len(history)) if history[i] < history[i - 1]
+        )
+        attempt.s_increasing_steps = sum(
+            1 for i in range(1, len(history)) if history[i] > history[i - 1]
+        )
+
+        attempt.level_analysis = {}
+        progress_rows = (
+            LevelProgress.objects.filter(attempt=attempt)
+            .select_related("difficulty_level")
+            .order_by("id")
+        )
+        for progress in progress_rows:
+            answered = progress.questions_answered
+            attempt.level_analysis[progress.difficulty_level.name] = {
+                "questions_answered": answered,
+                "correct": progress.correct_count,
+                "incorrect": progress.incorrect_count,
+                "accuracy": (
+                    (progress.correct_count / answered) * 100 if answered else 0
+                ),
+                "s_index": progress.s_index,
+                "completed": progress.is_completed,
+                "advanced": progress.passed_to_next_level,
+            }
+
+        attempt.save(
+            update_fields=[
+                "s_decreasing_steps",
+                "s_increasing_steps",
+                "level_analysis",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0027_remove_examattempt_s_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='s_decreasing_steps',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='s_increasing_steps',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_in_progress, migrations.RunPython.noop),
+    ]
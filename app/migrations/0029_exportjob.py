@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-17 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0028_examattempt_s_trend_steps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('exam_results_csv', 'Resultados del examen (CSV)'), ('exam_answers_csv', 'Respuestas del examen (CSV)'), ('exam_results_xlsx', 'Reporte del examen (Excel)'), ('exam_students_xlsx', 'Estudiantes del examen (Excel)'), ('exams_bundle_zip', 'Reportes de varios exámenes (ZIP)')], max_length=30)),
+                ('params', models.JSONField(default=dict, help_text='Parámetros de la exportación (ids de exámenes)')),
+                ('title', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'En Cola'), ('running', 'Generando'), ('completed', 'Listo'), ('failed', 'Fallido')], default='pending', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje de avance (0-100)')),
+                ('error', models.TextField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, null=True, upload_to='exports/')),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'app_export_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='app_export__status_fe6a68_idx')],
+            },
+        ),
+    ]
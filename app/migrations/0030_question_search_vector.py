@@ -0,0 +1,66 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX app_questions_search_gin ON app_questions USING gin (search_vector)",
+    """
+    UPDATE app_questions q SET search_vector =
+        setweight(to_tsvector('spanish', COALESCE(q.topic, '')), 'A')
+        || setweight(to_tsvector('spanish', COALESCE(
+            (SELECT ka.name FROM app_knowledge_areas ka
+             WHERE ka.id = q.knowledge_area_id), '')), 'A')
+        || setweight(to_tsvector('spanish', COALESCE(q.statement_text, '')), 'B')
+        || setweight(to_tsvector('spanish',
+            COALESCE(q.start_statement, '') || ' ' || COALESCE(q.end_statement, '')),
+            'C')
+    """,
+]
+
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS app_questions_search_gin"]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_questions_fts USING fts5(
+        topic, area, statement, tokenize = "unicode61 remove_diacritics 2"
+    )
+    """,
+    """
+    INSERT INTO app_questions_fts (rowid, topic, area, statement)
+    SELECT q.id, q.topic, COALESCE(ka.name, ''),
+        COALESCE(q.statement_text, '') || ' ' || COALESCE(q.start_statement, '')
+        || ' ' || COALESCE(q.end_statement, '')
+    FROM app_questions q
+    LEFT JOIN app_knowledge_areas ka ON ka.id = q.knowledge_area_id
+    """,
+    "ANALYZE",
+]
+
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS app_questions_fts"]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0029_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,110 @@
+from django.db import migrations, models
+from utils.utils import normalize_search_text
+
+
+BATCH_SIZE = 2000
+
+SEARCH_FIELDS = ("first_name", "last_name", "email", "document_number")
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX app_users_search_trgm ON app_users "
+    "USING gin (search_text gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS app_users_search_trgm"]
+
+# Tabla FTS5 con tokenizador de trigramas que replica search_text; los
+# triggers la mantienen sincronizada con app_users
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_users_search USING fts5(
+        search_text, tokenize = "trigram"
+    )
+    """,
+    """
+    INSERT INTO app_users_search (rowid, search_text)
+    SELECT id, search_text FROM app_users
+    """,
+    """
+    CREATE TRIGGER app_users_search_insert AFTER INSERT ON app_users BEGIN
+        INSERT INTO app_users_search (rowid, search_text)
+        VALUES (new.id, new.search_text);
+    END
+    """,
+    """
+    CREATE TRIGGER app_users_search_update AFTER UPDATE OF search_text ON app_users
+    BEGIN
+        UPDATE app_users_search SET search_text = new.search_text
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_users_search_delete AFTER DELETE ON app_users BEGIN
+        DELETE FROM app_users_search WHERE rowid = old.id;
+    END
+    """,
+    "ANALYZE",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS app_users_search_insert",
+    "DROP TRIGGER IF EXISTS app_users_search_update",
+    "DROP TRIGGER IF EXISTS app_users_search_delete",
+    "DROP TABLE IF EXISTS app_users_search",
+]
+
+
+def fill_search_text(apps, schema_editor):
+    CustomUser = apps.get_model("app", "CustomUser")
+    users = CustomUser.objects.only("id", *SEARCH_FIELDS).order_by("id")
+
+    batch = []
+    for user in users.iterator(chunk_size=BATCH_SIZE):
+        user.search_text = normalize_search_text(
+            *(getattr(user, field) for field in SEARCH_FIELDS)
+        )
+        batch.append(user)
+
+        if len(batch) == BATCH_SIZE:
+            CustomUser.objects.bulk_update(batch, ["search_text"])
+            batch = []
+
+    if batch:
+        CustomUser.objects.bulk_update(batch, ["search_text"])
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0030_question_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['document_number'], name='app_users_document_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['institution', '-created_at'], name='app_users_inst_created_idx'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
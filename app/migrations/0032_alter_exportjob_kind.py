@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0031_customuser_search_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('exam_results_csv', 'Resultados del examen (CSV)'), ('exam_answers_csv', 'Respuestas del examen (CSV)'), ('exam_results_xlsx', 'Reporte del examen (Excel)'), ('exam_students_xlsx', 'Estudiantes del examen (Excel)'), ('exams_bundle_zip', 'Reportes de varios exámenes (ZIP)'), ('question_bank_archive', 'Banco de preguntas (ZIP)')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='params',
+            field=models.JSONField(default=dict, help_text='Parámetros de la exportación (ids de exámenes o del banco)'),
+        ),
+    ]
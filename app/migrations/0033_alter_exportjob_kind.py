@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0032_alter_exportjob_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('exam_results_csv', 'Resultados del examen (CSV)'), ('exam_answers_csv', 'Respuestas del examen (CSV)'), ('exam_results_xlsx', 'Reporte del examen (Excel)'), ('exam_students_xlsx', 'Estudiantes del examen (Excel)'), ('exams_bundle_zip', 'Reportes de varios exámenes (ZIP)'), ('question_bank_archive', 'Banco de preguntas (ZIP)'), ('exam_rescore', 'Recalificación del examen (CSV)')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,17 @@
+import app.models.exports.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_alter_exportjob_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=app.models.exports.models.private_storage, upload_to='exports/'),
+        ),
+    ]
@@ -0,0 +1,139 @@
+from django.db import migrations
+
+
+# El vector de búsqueda se calcula en la base de datos al insertar o
+# modificar una pregunta, o al renombrar su área, sin importar desde dónde se
+# escriba (vistas, importaciones, administración, shell o migraciones)
+POSTGRES_FORWARD = [
+    """
+    CREATE FUNCTION app_questions_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('spanish', COALESCE(NEW.topic, '')), 'A')
+            || setweight(to_tsvector('spanish', COALESCE(
+                (SELECT ka.name FROM app_knowledge_areas ka
+                 WHERE ka.id = NEW.knowledge_area_id), '')), 'A')
+            || setweight(to_tsvector('spanish', COALESCE(NEW.statement_text, '')), 'B')
+            || setweight(to_tsvector('spanish',
+                COALESCE(NEW.start_statement, '') || ' '
+                || COALESCE(NEW.end_statement, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER app_questions_search_vector
+    BEFORE INSERT OR UPDATE OF
+        topic, knowledge_area_id, statement_text, start_statement, end_statement
+    ON app_questions
+    FOR EACH ROW EXECUTE FUNCTION app_questions_search_vector()
+    """,
+    """
+    CREATE FUNCTION app_knowledge_areas_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE app_questions SET knowledge_area_id = knowledge_area_id
+        WHERE knowledge_area_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER app_knowledge_areas_search_vector
+    AFTER UPDATE OF name ON app_knowledge_areas
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION app_knowledge_areas_search_vector()
+    """,
+    # Reindexar las preguntas escritas por caminos que no lo hacían
+    "UPDATE app_questions SET topic = topic",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS app_knowledge_areas_search_vector ON app_knowledge_areas",
+    "DROP FUNCTION IF EXISTS app_knowledge_areas_search_vector()",
+    "DROP TRIGGER IF EXISTS app_questions_search_vector ON app_questions",
+    "DROP FUNCTION IF EXISTS app_questions_search_vector()",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER app_questions_fts_insert AFTER INSERT ON app_questions BEGIN
+        INSERT INTO app_questions_fts (rowid, topic, area, statement)
+        VALUES (
+            new.id,
+            new.topic,
+            COALESCE((SELECT name FROM app_knowledge_areas
+                      WHERE id = new.knowledge_area_id), ''),
+            COALESCE(new.statement_text, '') || ' '
+            || COALESCE(new.start_statement, '') || ' '
+            || COALESCE(new.end_statement, '')
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER app_questions_fts_update AFTER UPDATE OF
+        topic, knowledge_area_id, statement_text, start_statement, end_statement
+    ON app_questions BEGIN
+        UPDATE app_questions_fts SET
+            topic = new.topic,
+            area = COALESCE((SELECT name FROM app_knowledge_areas
+                             WHERE id = new.knowledge_area_id), ''),
+            statement = COALESCE(new.statement_text, '') || ' '
+                || COALESCE(new.start_statement, '') || ' '
+                || COALESCE(new.end_statement, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_questions_fts_delete AFTER DELETE ON app_questions BEGIN
+        DELETE FROM app_questions_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_knowledge_areas_fts_update AFTER UPDATE OF name
+    ON app_knowledge_areas BEGIN
+        UPDATE app_questions_fts SET area = new.name
+        WHERE rowid IN (
+            SELECT id FROM app_questions WHERE knowledge_area_id = new.id
+        );
+    END
+    """,
+    # Reindexar las preguntas escritas por caminos que no lo hacían
+    "DELETE FROM app_questions_fts",
+    """
+    INSERT INTO app_questions_fts (rowid, topic, area, statement)
+    SELECT q.id, q.topic, COALESCE(ka.name, ''),
+        COALESCE(q.statement_text, '') || ' ' || COALESCE(q.start_statement, '')
+        || ' ' || COALESCE(q.end_statement, '')
+    FROM app_questions q
+    LEFT JOIN app_knowledge_areas ka ON ka.id = q.knowledge_area_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS app_questions_fts_insert",
+    "DROP TRIGGER IF EXISTS app_questions_fts_update",
+    "DROP TRIGGER IF EXISTS app_questions_fts_delete",
+    "DROP TRIGGER IF EXISTS app_knowledge_areas_fts_update",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0036_alter_exportjob_kind'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
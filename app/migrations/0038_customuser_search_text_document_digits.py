@@ -0,0 +1,39 @@
+from django.db import migrations
+from utils.utils import document_digits, normalize_search_text
+
+
+BATCH_SIZE = 2000
+
+SEARCH_FIELDS = ("first_name", "last_name", "email", "document_number")
+
+
+def fill_search_text(apps, schema_editor):
+    # search_text incluye ahora el documento sin separadores
+    CustomUser = apps.get_model("app", "CustomUser")
+    users = CustomUser.objects.only("id", *SEARCH_FIELDS).order_by("id")
+
+    batch = []
+    for user in users.iterator(chunk_size=BATCH_SIZE):
+        user.search_text = normalize_search_text(
+            *(getattr(user, field) for field in SEARCH_FIELDS),
+            document_digits(user.document_number),
+        )
+        batch.append(user)
+
+        if len(batch) == BATCH_SIZE:
+            CustomUser.objects.bulk_update(batch, ["search_text"])
+            batch = []
+
+    if batch:
+        CustomUser.objects.bulk_update(batch, ["search_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0037_question_search_triggers'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+    ]
@@ -26,3 +26,5 @@ from .sprt.models import (
     AttemptAnswer,
     LevelProgress,
 )
+
+from .exports.models import ExportJob
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def private_storage():
+    """
+    Almacenamiento de los archivos generados, fuera de MEDIA_ROOT: no tienen
+    URL pública y solo se entregan desde la vista de descarga.
+    """
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+# -------------------------------------------------------------------
+# Exportación generada en segundo plano
+# -------------------------------------------------------------------
+class ExportJob(models.Model):
+    """
+    Trabajo de exportación en cola. Lo solicita un administrador desde la
+    aplicación y lo procesa el comando run_export_worker, que deja el
+    archivo generado listo para descargar.
+
+    La misma cola ejecuta tareas largas de recalificación (EXAM_RESCORE y
+    QUESTION_REGRADE): se procesan igual que una exportación y su archivo es
+    el reporte de los intentos modificados.
+    """
+
+    class Kind(models.TextChoices):
+        EXAM_RESULTS_CSV = "exam_results_csv", "Resultados del examen (CSV)"
+        EXAM_ANSWERS_CSV = "exam_answers_csv", "Respuestas del examen (CSV)"
+        EXAM_RESULTS_XLSX = "exam_results_xlsx", "Reporte del examen (Excel)"
+        EXAM_STUDENTS_XLSX = "exam_students_xlsx", "Estudiantes del examen (Excel)"
+        EXAMS_BUNDLE_ZIP = "exams_bundle_zip", "Reportes de varios exámenes (ZIP)"
+        QUESTION_BANK_ARCHIVE = "question_bank_archive", "Banco de preguntas (ZIP)"
+        EXAM_RESCORE = "exam_rescore", "Recalificación del examen (CSV)"
+        QUESTION_REGRADE = "question_regrade", "Recalificación por pregunta (CSV)"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "En Cola"
+        RUNNING = "running", "Generando"
+        COMPLETED = "completed", "Listo"
+        FAILED = "failed", "Fallido"
+
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    params = models.JSONField(
+        default=dict,
+        help_text="Parámetros de la exportación (ids de exámenes o del banco)",
+    )
+    title = models.CharField(max_length=255)
+
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0, help_text="Porcentaje de avance (0-100)"
+    )
+    error = models.TextField(null=True, blank=True)
+
+    # Archivo generado
+    file = models.FileField(
+        upload_to="exports/", storage=private_storage, null=True, blank=True
+    )
+    filename = models.CharField(max_length=255, blank=True)
+
+    requested_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="export_jobs"
+    )
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "app_export_jobs"
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.title} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.COMPLETED, self.Status.FAILED)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 
 
@@ -118,6 +119,9 @@ class Question(models.Model):
         blank=True,
     )
     is_active = models.BooleanField(default=True)
+    # Vector de búsqueda de texto completo (solo PostgreSQL), mantenido por
+    # app.services.question_search; su índice GIN se crea en la migración
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
@@ -137,6 +141,14 @@ class Question(models.Model):
         y exactamente 1 marcada como correcta.
         """
         options = self.options.all() if self.pk else []
+        self.validate_options(options)
+
+    @staticmethod
+    def validate_options(options):
+        """
+        Regla de las opciones de una pregunta, también aplicada a opciones
+        aún sin guardar (por ejemplo, en la importación masiva).
+        """
         if len(options) < 2:
             raise ValidationError("La pregunta debe tener al menos 2 opciones.")
 
@@ -105,6 +105,16 @@ class ExamAttempt(models.Model):
         related_name="current_attempts",
     )
 
+    # Pregunta entregada actualmente y momento de su entrega
+    current_question = models.ForeignKey(
+        "app.Question",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="issued_attempts",
+    )
+    current_question_issued_at = models.DateTimeField(null=True, blank=True)
+
     # Contadores SPRT generales
     total_questions = models.PositiveIntegerField(default=0)
     correct_answers = models.PositiveIntegerField(default=0)
@@ -113,10 +123,10 @@ class ExamAttempt(models.Model):
     # Índice S acumulativo (SPRT)
     s_index = models.FloatField(default=0.0)
 
-    # Historial de índice S (JSON array)
-    s_history = models.JSONField(
-        default=list, help_text="Lista de valores S en cada pregunta"
-    )
+    # Tendencia del índice S: respuestas que lo hicieron bajar o subir
+    # respecto a la anterior, para la retroalimentación de consistencia
+    s_decreasing_steps = models.PositiveIntegerField(default=0)
+    s_increasing_steps = models.PositiveIntegerField(default=0)
 
     # Retroalimentación de consistencia
     consistency_feedback = models.CharField(
@@ -153,6 +163,19 @@ class ExamAttempt(models.Model):
             return 0
         return (self.correct_answers / self.total_questions) * 100
 
+    @property
+    def s_history(self):
+        """
+        Historial del índice S: el valor tras cada respuesta, en orden.
+        Se obtiene de AttemptAnswer.s_index_after, de modo que registrar una
+        respuesta no reescribe el historial completo del intento.
+        """
+        return list(
+            self.answers.order_by("question_number").values_list(
+                "s_index_after", flat=True
+            )
+        )
+
     def get_duration(self):
         """Retorna la duración del intento"""
         if self.completed_at:
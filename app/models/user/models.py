@@ -4,6 +4,7 @@ from django.contrib.auth.models import (
     BaseUserManager,
 )
 from django.core.validators import MinLengthValidator
+from utils.utils import document_digits, normalize_search_text
 
 
 class CustomUserManager(BaseUserManager):
@@ -80,21 +81,52 @@ class CustomUser(AbstractBaseUser):
     phone = models.CharField(max_length=20, blank=True, null=True)
     semester = models.PositiveSmallIntegerField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Nombre, correo y documento normalizados para la búsqueda de personas;
+    # se calcula al guardar y tiene índice de trigramas (ver la migración)
+    search_text = models.TextField(blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
     objects = CustomUserManager()
 
+    SEARCH_FIELDS = ("first_name", "last_name", "email", "document_number")
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     class Meta:
         db_table = "app_users"
+        indexes = [
+            # Búsqueda por prefijo del documento (LIKE 'x%' en PostgreSQL)
+            models.Index(
+                fields=["document_number"],
+                name="app_users_document_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Listados de personas de una institución, más recientes primero
+            models.Index(
+                fields=["institution", "-created_at"],
+                name="app_users_inst_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name or ''}".strip()
 
+    def save(self, *args, **kwargs):
+        # Incluye el documento sin separadores para encontrarlo con o sin ellos
+        self.search_text = normalize_search_text(
+            *(getattr(self, field) for field in self.SEARCH_FIELDS),
+            document_digits(self.document_number),
+        )
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_FIELDS):
+            kwargs["update_fields"] = {*update_fields, "search_text"}
+
+        super().save(*args, **kwargs)
+
     def is_super_admin(self):
         return self.role.name == "super_admin" if self.role else False
 
@@ -0,0 +1,479 @@
+# -------------------------------------------------------------------
+# Archivo portable de un banco de preguntas, para copiarlo a otra
+# institución o a otro entorno. Es un ZIP con:
+#
+#   manifest.json    formato, versión, datos del banco y catálogos usados
+#   questions.jsonl  una pregunta por línea, con sus opciones
+#   media/<sha256>   imágenes y audios direccionados por su contenido
+#
+# Niveles y áreas se referencian por nombre, no por id, y cada archivo
+# multimedia se incluye una sola vez aunque lo usen varias preguntas.
+# -------------------------------------------------------------------
+import hashlib
+import json
+import os
+import zipfile
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from app.models import (
+    AnswerOption,
+    DifficultyLevel,
+    KnowledgeArea,
+    Question,
+    QuestionBank,
+)
+from app.services.bank_inventory import invalidate_bank_inventory
+from app.services.question_pool import invalidate_question_pools
+from utils.utils import normalize_search_text
+
+
+ARCHIVE_FORMAT = "app_exams.question_bank"
+ARCHIVE_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+QUESTIONS_NAME = "questions.jsonl"
+MEDIA_DIR = "media/"
+
+# Preguntas que se leen o insertan por lote
+BATCH_SIZE = 500
+
+QUESTION_MEDIA_FIELDS = ("statement_image", "statement_audio")
+OPTION_MEDIA_FIELDS = ("option_image", "option_audio")
+
+
+def _name(value):
+    return normalize_search_text(value)
+
+
+def _questions(bank):
+    options = AnswerOption.objects.filter(deleted_at__isnull=True).order_by("id")
+
+    return (
+        Question.objects.filter(bank=bank, deleted_at__isnull=True)
+        .select_related("difficulty_level", "knowledge_area")
+        .prefetch_related(Prefetch("options", queryset=options))
+        .defer("search_vector")
+        .order_by("id")
+    )
+
+
+# -------------------------------------------------------------------
+# Exportación
+# -------------------------------------------------------------------
+def _media_names(bank):
+    """
+    Nombres en el almacenamiento de todos los archivos que usa el banco.
+    """
+    names = set()
+
+    questions = Question.objects.filter(bank=bank, deleted_at__isnull=True)
+    for row in questions.values_list(*QUESTION_MEDIA_FIELDS):
+        names.update(row)
+
+    options = AnswerOption.objects.filter(
+        question__in=questions, deleted_at__isnull=True
+    )
+    for row in options.values_list(*OPTION_MEDIA_FIELDS):
+        names.update(row)
+
+    names.discard(None)
+    names.discard("")
+    return sorted(names)
+
+
+def _write_media(archive, names):
+    """
+    Copia los archivos al ZIP con su hash SHA-256 como nombre; los archivos
+    con el mismo contenido se escriben una sola vez.
+
+    Returns:
+        tuple: ({nombre en el almacenamiento: ruta en el ZIP}, faltantes)
+    """
+    storage = Question._meta.get_field("statement_image").storage
+    paths = {}
+    written = set()
+    missing = []
+
+    for name in names:
+        try:
+            with storage.open(name, "rb") as file:
+                data = file.read()
+        except (FileNotFoundError, OSError):
+            missing.append(name)
+            continue
+
+        extension = os.path.splitext(name)[1].lower()
+        path = f"{MEDIA_DIR}{hashlib.sha256(data).hexdigest()}{extension}"
+
+        if path not in written:
+            # Imágenes y audios ya vienen comprimidos
+            archive.writestr(path, data, compress_type=zipfile.ZIP_STORED)
+            written.add(path)
+
+        paths[name] = path
+
+    return paths, missing
+
+
+def _media_path(file, paths):
+    return paths.get(file.name) if file else None
+
+
+def _question_entry(question, paths):
+    return {
+        "topic": question.topic,
+        "time": question.time,
+        "level": question.difficulty_level.name if question.difficulty_level else None,
+        "area": question.knowledge_area.name if question.knowledge_area else None,
+        "statement_type": question.statement_type,
+        "start_statement": question.start_statement,
+        "statement_text": question.statement_text,
+        "statement_image": _media_path(question.statement_image, paths),
+        "statement_audio": _media_path(question.statement_audio, paths),
+        "end_statement": question.end_statement,
+        "is_active": question.is_active,
+        "options": [
+            {
+                "option_type": option.option_type,
+                "option_text": option.option_text,
+                "option_image": _media_path(option.option_image, paths),
+                "option_audio": _media_path(option.option_audio, paths),
+                "feedback": option.feedback,
+                "is_correct": option.is_correct,
+                "is_active": option.is_active,
+            }
+            for option in question.options.all()
+        ],
+    }
+
+
+def write_bank_archive(bank, output, track=None):
+    """
+    Escribe el archivo portable del banco en output (un archivo binario).
+    Las preguntas se recorren por bloques, así que la memoria no crece con
+    el tamaño del banco; track puede envolver el iterador para reportar
+    avance.
+
+    Returns:
+        dict: el manifiesto escrito.
+    """
+    questions = _questions(bank)
+    levels = set()
+    areas = set()
+    question_count = 0
+    option_count = 0
+
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        paths, missing = _write_media(archive, _media_names(bank))
+
+        rows = questions.iterator(chunk_size=BATCH_SIZE)
+        if track is not None:
+            rows = track(rows)
+
+        with archive.open(QUESTIONS_NAME, "w") as entry:
+            for question in rows:
+                data = _question_entry(question, paths)
+                levels.add(data["level"])
+                areas.add(data["area"])
+                question_count += 1
+                option_count += len(data["options"])
+
+                line = json.dumps(data, ensure_ascii=False) + "\n"
+                entry.write(line.encode("utf-8"))
+
+        levels.discard(None)
+        areas.discard(None)
+
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "exported_at": timezone.now().isoformat(),
+            "bank": {"name": bank.name, "description": bank.description},
+            "levels": sorted(levels),
+            "areas": sorted(areas),
+            "questions": question_count,
+            "options": option_count,
+            "media": len(set(paths.values())),
+            "missing_media": missing,
+        }
+        archive.writestr(
+            MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2)
+        )
+
+    return manifest
+
+
+# -------------------------------------------------------------------
+# Importación
+# -------------------------------------------------------------------
+def read_manifest(archive):
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    except KeyError:
+        raise ValidationError(
+            "El archivo no es un banco exportado (falta el manifiesto)."
+        )
+    except ValueError:
+        raise ValidationError("El manifiesto del archivo no es válido.")
+
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValidationError("El archivo no es un banco de preguntas exportado.")
+    if manifest.get("version", 0) > ARCHIVE_VERSION:
+        raise ValidationError(
+            "El archivo fue generado por una versión más reciente de la aplicación."
+        )
+
+    return manifest
+
+
+class ArchiveMedia:
+    """
+    Guarda los archivos multimedia del ZIP en el almacenamiento. El nombre
+    de destino es el hash del contenido, de modo que un archivo que ya
+    existe (de esta u otra importación) se reutiliza en lugar de copiarse.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.names = {}
+        self.created = []
+        self.reused = 0
+
+    def _read(self, path):
+        digest = os.path.splitext(os.path.basename(path))[0]
+
+        try:
+            data = self.archive.read(path)
+        except KeyError:
+            raise ValidationError(f"Falta el archivo {path} en el banco exportado.")
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValidationError(f"El archivo {path} está dañado.")
+
+        return data
+
+    def save(self, path, field):
+        """
+        Retorna el nombre en el almacenamiento del archivo path del ZIP para
+        el campo indicado.
+        """
+        if not path:
+            return None
+
+        key = (path, field.upload_to)
+
+        if key not in self.names:
+            if not path.startswith(MEDIA_DIR):
+                raise ValidationError(f"Ruta de archivo no válida: {path}.")
+
+            name = f"{field.upload_to}{os.path.basename(path)}"
+
+            if field.storage.exists(name):
+                self.reused += 1
+            else:
+                name = field.storage.save(name, ContentFile(self._read(path)))
+                self.created.append((field.storage, name))
+
+            self.names[key] = name
+
+        return self.names[key]
+
+    def discard_created(self):
+        """
+        Elimina los archivos copiados cuando la importación no se confirma.
+        """
+        for storage, name in self.created:
+            storage.delete(name)
+        self.created = []
+
+
+def _areas_by_name(names):
+    """
+    Ids de las áreas del archivo por nombre normalizado, creando las que no
+    existen en este entorno.
+
+    Returns:
+        tuple: ({nombre normalizado: id}, nombres de las áreas creadas)
+    """
+    # Las áreas eliminadas también cuentan, porque el nombre es único
+    rows = KnowledgeArea.objects.order_by("-deleted_at").values_list("id", "name")
+    areas = {_name(name): pk for pk, name in rows}
+
+    missing = [name for name in names if _name(name) not in areas]
+    for area in KnowledgeArea.objects.bulk_create(
+        [KnowledgeArea(name=name) for name in missing]
+    ):
+        areas[_name(area.name)] = area.pk
+
+    return areas, missing
+
+
+def _levels_by_name(names):
+    rows = DifficultyLevel.objects.filter(deleted_at__isnull=True).values_list(
+        "id", "name"
+    )
+    levels = {_name(name): pk for pk, name in rows}
+
+    missing = [name for name in names if _name(name) not in levels]
+    if missing:
+        raise ValidationError(
+            "Los siguientes niveles de dificultad no existen en este entorno: "
+            f"{', '.join(missing)}."
+        )
+
+    return levels
+
+
+def _read_entries(archive):
+    try:
+        entry = archive.open(QUESTIONS_NAME)
+    except KeyError:
+        raise ValidationError("El archivo no contiene preguntas.")
+
+    with entry:
+        for line_number, line in enumerate(entry, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                raise ValidationError(f"La pregunta {line_number} no es válida.")
+
+
+def _build_question(bank, data, levels, areas, media):
+    question = Question(
+        bank=bank,
+        difficulty_level_id=levels.get(_name(data["level"] or "")),
+        knowledge_area_id=areas.get(_name(data["area"] or "")),
+        topic=data["topic"],
+        time=data["time"],
+        statement_type=data["statement_type"],
+        start_statement=data["start_statement"],
+        statement_text=data["statement_text"],
+        end_statement=data["end_statement"],
+        is_active=data["is_active"],
+    )
+
+    for field_name in QUESTION_MEDIA_FIELDS:
+        setattr(
+            question,
+            field_name,
+            media.save(data[field_name], Question._meta.get_field(field_name)),
+        )
+
+    return question
+
+
+def _build_option(question, data, media):
+    option = AnswerOption(
+        question=question,
+        option_type=data["option_type"],
+        option_text=data["option_text"],
+        feedback=data["feedback"] or "",
+        is_correct=data["is_correct"],
+        is_active=data["is_active"],
+    )
+
+    for field_name in OPTION_MEDIA_FIELDS:
+        setattr(
+            option,
+            field_name,
+            media.save(data[field_name], AnswerOption._meta.get_field(field_name)),
+        )
+
+    return option
+
+
+def _insert_batch(bank, batch, levels, areas, media):
+    questions = []
+    for line_number, data in batch:
+        try:
+            questions.append(_build_question(bank, data, levels, areas, media))
+        except (KeyError, TypeError):
+            raise ValidationError(f"La pregunta {line_number} está incompleta.")
+
+    questions = Question.objects.bulk_create(questions)
+
+    options = []
+    for question, (line_number, data) in zip(questions, batch):
+        try:
+            options.extend(
+                _build_option(question, option, media) for option in data["options"]
+            )
+        except (KeyError, TypeError):
+            raise ValidationError(f"La pregunta {line_number} está incompleta.")
+
+    AnswerOption.objects.bulk_create(options, batch_size=BATCH_SIZE * 4)
+
+    return len(questions), len(options)
+
+
+def import_bank_archive(file, institution=None, name=None):
+    """
+    Crea un banco nuevo con las preguntas, opciones y archivos multimedia
+    del archivo portable. Todo ocurre en una transacción: si algo falla no
+    queda un banco a medias ni archivos copiados.
+
+    Returns:
+        dict: bank, questions, options, media_created, media_reused y
+        areas_created.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ValidationError("El archivo no es un ZIP válido.")
+
+    with archive:
+        manifest = read_manifest(archive)
+        name = (name or manifest["bank"]["name"]).strip()
+
+        if QuestionBank.objects.filter(name__iexact=name).exists():
+            raise ValidationError(f"Ya existe un banco de preguntas llamado '{name}'.")
+
+        media = ArchiveMedia(archive)
+        report = {"questions": 0, "options": 0}
+
+        try:
+            with transaction.atomic():
+                levels = _levels_by_name(manifest["levels"])
+                areas, areas_created = _areas_by_name(manifest["areas"])
+
+                bank = QuestionBank.objects.create(
+                    name=name,
+                    description=manifest["bank"].get("description", ""),
+                    institution=institution,
+                    is_active=True,
+                )
+
+                def flush(batch):
+                    if batch:
+                        questions, options = _insert_batch(
+                            bank, batch, levels, areas, media
+                        )
+                        report["questions"] += questions
+                        report["options"] += options
+                    batch.clear()
+
+                batch = []
+                for entry in _read_entries(archive):
+                    batch.append(entry)
+                    if len(batch) >= BATCH_SIZE:
+                        flush(batch)
+                flush(batch)
+
+                transaction.on_commit(invalidate_question_pools)
+                invalidate_bank_inventory()
+        except Exception:
+            media.discard_created()
+            raise
+
+    report.update(
+        bank=bank,
+        media_created=len(media.created),
+        media_reused=media.reused,
+        areas_created=areas_created,
+    )
+    return report
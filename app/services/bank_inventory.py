@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from app.models import DifficultyLevel, Question
+
+
+# El inventario se invalida al crear o modificar preguntas, en la caché
+# compartida de CACHES; la expiración es solo un respaldo
+INVENTORY_TIMEOUT = 60 * 60
+
+_CACHE_KEY = "bank_inventory"
+
+
+def _build_inventory():
+    """
+    Cuenta en una sola consulta agrupada las preguntas activas de cada banco
+    por nivel de dificultad.
+    """
+    rows = (
+        Question.objects.filter(
+            bank__isnull=False, is_active=True, deleted_at__isnull=True
+        )
+        .values_list("bank_id", "difficulty_level_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+
+    inventory = {}
+    for bank_id, level_id, total in rows:
+        inventory.setdefault(bank_id, {})[level_id] = total
+
+    return inventory
+
+
+def get_bank_inventory():
+    """
+    Matriz banco x nivel: {bank_id: {level_id: preguntas activas}}.
+    """
+    inventory = cache.get(_CACHE_KEY)
+
+    if inventory is None:
+        inventory = _build_inventory()
+        cache.set(_CACHE_KEY, inventory, INVENTORY_TIMEOUT)
+
+    return inventory
+
+
+def invalidate_bank_inventory():
+    """
+    Descarta el inventario cuando la transacción actual se confirma.
+    """
+    transaction.on_commit(lambda: cache.delete(_CACHE_KEY))
+
+
+def difficulty_levels():
+    return list(DifficultyLevel.objects.filter(deleted_at__isnull=True).order_by("id"))
+
+
+def attach_level_counts(banks, levels=None):
+    """
+    Asigna a cada banco level_counts, una lista (nivel, preguntas) con todos
+    los niveles de dificultad, y total_questions con sus preguntas activas.
+    """
+    inventory = get_bank_inventory()
+    levels = difficulty_levels() if levels is None else levels
+
+    banks = list(banks)
+    for bank in banks:
+        counts = inventory.get(bank.id, {})
+        bank.level_counts = [(level, counts.get(level.id, 0)) for level in levels]
+        bank.total_questions = sum(counts.values())
+
+    return banks
@@ -0,0 +1,118 @@
+# -------------------------------------------------------------------
+# Catálogo en caché de los exámenes abiertos de cada institución: todos los
+# estudiantes de una institución comparten la misma lista, que solo cambia
+# cuando un examen abre o cierra, o cuando un administrador lo modifica.
+# Vive en la caché compartida de CACHES, por lo que la invalidación y el
+# bloqueo de reconstrucción valen para todas las instancias.
+# -------------------------------------------------------------------
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from app.models import Exam
+
+
+# Vigencia máxima del catálogo aunque no haya aperturas ni cierres próximos
+CATALOGUE_MAX_TIMEOUT = 60 * 60
+
+# Tiempo máximo que una petición espera a que otra termine de construirlo
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT_SECONDS = 2.0
+REBUILD_POLL_SECONDS = 0.05
+
+EXAM_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "max_questions",
+    "max_attempts",
+    "start_date",
+    "end_date",
+    "institution_id",
+)
+
+
+def _cache_key(institution_id):
+    return f"exam_catalogue:{institution_id}"
+
+
+def _lock_key(institution_id):
+    return f"exam_catalogue_lock:{institution_id}"
+
+
+def _build_catalogue(institution_id, now):
+    """
+    Obtiene los exámenes abiertos de la institución y el segundo hasta el que
+    la lista es válida: el próximo cierre de un examen abierto o la próxima
+    apertura de uno programado.
+    """
+    exams = (
+        Exam.objects.filter(
+            is_active=True,
+            deleted_at__isnull=True,
+            end_date__gte=now,
+            institution_id=institution_id,
+        )
+        .only(*EXAM_FIELDS)
+        .order_by("end_date", "id")
+    )
+
+    open_exams = []
+    boundaries = []
+
+    for exam in exams:
+        if exam.start_date <= now:
+            open_exams.append(exam)
+            boundaries.append(exam.end_date)
+        else:
+            boundaries.append(exam.start_date)
+
+    timeout = CATALOGUE_MAX_TIMEOUT
+    if boundaries:
+        seconds = (min(boundaries) - now).total_seconds()
+        timeout = max(1, min(CATALOGUE_MAX_TIMEOUT, int(seconds) + 1))
+
+    return open_exams, timeout
+
+
+def get_open_exams(institution_id):
+    """
+    Retorna los exámenes abiertos de la institución ordenados por fecha de
+    cierre. Cuando el catálogo no está en caché solo una petición lo
+    reconstruye; las demás esperan brevemente su resultado en lugar de
+    repetir la consulta.
+    """
+    key = _cache_key(institution_id)
+    exams = cache.get(key)
+
+    if exams is None:
+        lock_key = _lock_key(institution_id)
+        locked = cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT)
+
+        if not locked:
+            deadline = time.monotonic() + REBUILD_WAIT_SECONDS
+            while exams is None and time.monotonic() < deadline:
+                time.sleep(REBUILD_POLL_SECONDS)
+                exams = cache.get(key)
+
+        if exams is None:
+            try:
+                exams, timeout = _build_catalogue(institution_id, timezone.now())
+                cache.set(key, exams, timeout)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+
+    # Descartar los exámenes que cerraron o aún no abren, por si la caché
+    # se consulta justo en el límite de su vigencia
+    now = timezone.now()
+    return [exam for exam in exams if exam.start_date <= now <= exam.end_date]
+
+
+def invalidate_exam_catalogue(*institution_ids):
+    """
+    Descarta el catálogo de las instituciones indicadas cuando la transacción
+    actual se confirma.
+    """
+    keys = [_cache_key(institution_id) for institution_id in set(institution_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
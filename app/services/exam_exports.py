@@ -0,0 +1,315 @@
+import csv
+import urllib.parse
+from django.http import StreamingHttpResponse
+from app.models import ExamAttempt, AttemptAnswer, LevelProgress
+
+
+# Filas leídas por viaje a la base de datos al recorrer los querysets
+EXPORT_CHUNK_SIZE = 2000
+
+EXAM_RESULTS_HEADER = [
+    "#",
+    "Documento",
+    "Estudiante",
+    "Institución",
+    "Programa",
+    "Examen",
+    "Intento #",
+    "Fecha Inicio",
+    "Fecha Fin",
+    "Total Preguntas",
+    "Correctas",
+    "Incorrectas",
+    "Precisión %",
+    "Índice S",
+    "Resultado",
+    "Consistencia",
+]
+
+ATTEMPT_ANSWERS_HEADER = [
+    "#",
+    "Nivel",
+    "Área",
+    "Tema de la Pregunta",
+    "Respuesta Seleccionada",
+    "Es Correcta",
+    "Tiempo (s)",
+    "Tiempo Permitido (s)",
+    "Violación Tiempo",
+    "Índice S",
+]
+
+# Columnas que identifican el intento en el reporte de respuestas de un examen
+EXAM_ANSWERS_HEADER = [
+    "Documento",
+    "Estudiante",
+    "Intento #",
+    *ATTEMPT_ANSWERS_HEADER,
+]
+
+LEVEL_PROGRESS_HEADER = [
+    "Documento",
+    "Estudiante",
+    "Intento #",
+    "Nivel",
+    "Preguntas",
+    "Correctas",
+    "Incorrectas",
+    "Precisión %",
+    "Índice S",
+    "Completado",
+    "Avanzó",
+]
+
+
+class Echo:
+    """
+    Objeto tipo archivo que retorna lo que se escribe en él, para generar
+    las filas del CSV una a una sin acumularlas en memoria.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, filename):
+    """
+    Retorna una respuesta que genera el CSV mientras se descarga.
+    """
+    writer = csv.writer(Echo())
+
+    def content():
+        yield "\ufeff"
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(content(), content_type="text/csv")
+    ascii_filename = urllib.parse.quote(filename)
+    response["Content-Disposition"] = f'attachment; filename="{ascii_filename}"'
+    return response
+
+
+def _format_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M")
+
+
+def attempts_queryset(attempts):
+    """
+    Une cada intento con el estudiante, su institución y su programa,
+    limitado a las columnas del reporte.
+    """
+    return attempts.select_related(
+        "student__institution", "student__academic_department"
+    ).only(
+        "attempt_number",
+        "status",
+        "started_at",
+        "completed_at",
+        "total_questions",
+        "correct_answers",
+        "incorrect_answers",
+        "s_index",
+        "consistency_feedback",
+        "student__first_name",
+        "student__last_name",
+        "student__document_number",
+        "student__institution__name",
+        "student__academic_department__name",
+    )
+
+
+def exam_results_attempts(exam):
+    """
+    Intentos finalizados de un examen, del más reciente al más antiguo.
+    """
+    return attempts_queryset(
+        ExamAttempt.objects.filter(exam=exam)
+        .exclude(status=ExamAttempt.Status.IN_PROGRESS)
+        .order_by("-started_at")
+    )
+
+
+def attempt_row(contador, attempt, exam_title, format_datetime=_format_datetime):
+    """
+    Fila del reporte de resultados para un intento. format_datetime define
+    cómo se escriben las fechas (texto en CSV, fecha en XLSX).
+    """
+    student = attempt.student
+
+    return [
+        contador,
+        student.document_number,
+        student,
+        student.institution.name if student.institution else "N/A",
+        (
+            student.academic_department.name
+            if student.academic_department
+            else "N/A"
+        ),
+        exam_title,
+        attempt.attempt_number,
+        format_datetime(attempt.started_at),
+        format_datetime(attempt.completed_at) if attempt.completed_at else "N/A",
+        attempt.total_questions,
+        attempt.correct_answers,
+        attempt.incorrect_answers,
+        round(attempt.get_accuracy(), 2),
+        round(attempt.s_index, 4),
+        attempt.get_status_display(),
+        attempt.get_consistency_feedback_display() or "N/A",
+    ]
+
+
+def exam_results_rows(exam, format_datetime=_format_datetime):
+    """
+    Genera el encabezado y una fila por intento del reporte de resultados.
+    """
+    yield EXAM_RESULTS_HEADER
+
+    attempts = exam_results_attempts(exam).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for contador, attempt in enumerate(attempts, start=1):
+        yield attempt_row(contador, attempt, exam.title, format_datetime)
+
+
+def _answers_queryset(answers, related=(), fields=()):
+    """
+    Une cada respuesta con su nivel, pregunta, área y opción seleccionada,
+    limitada a las columnas del reporte (más las relaciones y columnas extra).
+    """
+    return answers.select_related(
+        "difficulty_level",
+        "question__knowledge_area",
+        "selected_option",
+        *related,
+    ).only(
+        *fields,
+        "question_number",
+        "is_correct",
+        "time_taken_seconds",
+        "allowed_time_seconds",
+        "time_violation",
+        "s_index_after",
+        "difficulty_level__name",
+        "question__topic",
+        "question__knowledge_area__name",
+        "selected_option__option_text",
+    )
+
+
+def _answer_row(answer):
+    question = answer.question
+
+    return [
+        answer.question_number,
+        answer.difficulty_level.name if answer.difficulty_level else "N/A",
+        question.knowledge_area.name if question.knowledge_area else "N/A",
+        question.topic if question.topic else "N/A",
+        (
+            answer.selected_option.option_text[:30] + "..."
+            if answer.selected_option.option_text
+            else "Respuesta no disponible"
+        ),
+        "Sí" if answer.is_correct else "No",
+        answer.time_taken_seconds,
+        answer.allowed_time_seconds,
+        "Sí" if answer.time_violation else "No",
+        round(answer.s_index_after, 4),
+    ]
+
+
+def attempt_answers_rows(attempt):
+    """
+    Genera el encabezado y una fila por respuesta de un intento.
+    """
+    yield ATTEMPT_ANSWERS_HEADER
+
+    answers = _answers_queryset(
+        AttemptAnswer.objects.filter(attempt=attempt).order_by("question_number")
+    )
+
+    for answer in answers.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield _answer_row(answer)
+
+
+def exam_answers_rows(exam):
+    """
+    Genera el encabezado y una fila por respuesta de todos los intentos
+    finalizados de un examen, agrupadas por intento.
+    """
+    yield EXAM_ANSWERS_HEADER
+
+    answers = _answers_queryset(
+        AttemptAnswer.objects.filter(attempt__exam=exam)
+        .exclude(attempt__status=ExamAttempt.Status.IN_PROGRESS)
+        .order_by("-attempt__started_at", "attempt_id", "question_number"),
+        related=("attempt__student",),
+        fields=(
+            "attempt__attempt_number",
+            "attempt__student__first_name",
+            "attempt__student__last_name",
+            "attempt__student__document_number",
+        ),
+    )
+
+    for answer in answers.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        attempt = answer.attempt
+        yield [
+            attempt.student.document_number,
+            attempt.student,
+            attempt.attempt_number,
+            *_answer_row(answer),
+        ]
+
+
+def level_progress_rows(progress):
+    """
+    Genera el encabezado y una fila por nivel de cada intento del queryset
+    de LevelProgress indicado.
+    """
+    yield LEVEL_PROGRESS_HEADER
+
+    progress = (
+        progress.select_related("attempt__student", "difficulty_level")
+        .only(
+            "questions_answered",
+            "correct_count",
+            "incorrect_count",
+            "s_index",
+            "is_completed",
+            "passed_to_next_level",
+            "difficulty_level__name",
+            "attempt__attempt_number",
+            "attempt__student__first_name",
+            "attempt__student__last_name",
+            "attempt__student__document_number",
+        )
+        .order_by("-attempt__started_at", "attempt_id", "difficulty_level_id")
+    )
+
+    for level in progress.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        attempt = level.attempt
+        yield [
+            attempt.student.document_number,
+            attempt.student,
+            attempt.attempt_number,
+            level.difficulty_level.name,
+            level.questions_answered,
+            level.correct_count,
+            level.incorrect_count,
+            round(level.get_accuracy(), 2),
+            round(level.s_index, 4),
+            "Sí" if level.is_completed else "No",
+            "Sí" if level.passed_to_next_level else "No",
+        ]
+
+
+def exam_level_progress_rows(exam):
+    """
+    Progreso por nivel de los intentos finalizados de un examen.
+    """
+    return level_progress_rows(
+        LevelProgress.objects.filter(attempt__exam=exam).exclude(
+            attempt__status=ExamAttempt.Status.IN_PROGRESS
+        )
+    )
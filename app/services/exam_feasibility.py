@@ -0,0 +1,109 @@
+# -------------------------------------------------------------------
+# Validación de la disponibilidad de preguntas de un examen: cuántas
+# preguntas aportan los bancos seleccionados en cada nivel y si alcanzan
+# para la progresión de niveles del SPRT.
+# -------------------------------------------------------------------
+from django.db.models import Count, Q
+from app.models import ExamSPRTConfig, QuestionBank
+from app.services.bank_inventory import difficulty_levels
+
+
+def question_availability(bank_ids):
+    """
+    Obtiene en una sola consulta los bancos seleccionados que existen y sus
+    preguntas disponibles por nivel, con el mismo criterio que el pool de
+    preguntas del examen.
+
+    Returns:
+        tuple: (ids de bancos encontrados, {level_id: preguntas})
+    """
+    rows = (
+        QuestionBank.objects.filter(pk__in=bank_ids, deleted_at__isnull=True)
+        .values_list("id", "questions__difficulty_level_id")
+        .annotate(
+            total=Count(
+                "questions",
+                filter=Q(questions__is_active=True, questions__deleted_at__isnull=True),
+            )
+        )
+        .order_by()
+    )
+
+    found_bank_ids = set()
+    level_counts = {}
+
+    for bank_id, level_id, total in rows:
+        found_bank_ids.add(bank_id)
+        if total:
+            level_counts[level_id] = level_counts.get(level_id, 0) + total
+
+    return found_bank_ids, level_counts
+
+
+def simulate_level_progression(levels, level_counts, max_questions, min_per_level):
+    """
+    Recorre los niveles como un estudiante que avanza en cuanto la regla lo
+    permite (min_per_level preguntas en cada nivel) y cuyo índice S no llega
+    a una decisión antes de max_questions, que es el caso que más preguntas
+    consume de cada nivel. Un nivel que se agota antes de cumplir el criterio
+    de avance termina el intento como reprobado, por lo que cada nivel se
+    evalúa con lo que requeriría si los anteriores tuvieran suficientes.
+
+    Returns:
+        list: (nivel, preguntas requeridas, disponibles) de los niveles que
+        se agotarían.
+    """
+    shortages = []
+    remaining = max_questions
+
+    for index, level in enumerate(levels):
+        if remaining <= 0:
+            break
+
+        available = level_counts.get(level.id, 0)
+        is_last = index == len(levels) - 1
+
+        # En el último nivel el estudiante permanece hasta terminar el examen
+        needed = remaining if is_last else min(min_per_level, remaining)
+
+        if available < needed:
+            shortages.append((level, needed, available))
+
+        remaining -= needed
+
+    return shortages
+
+
+def feasibility_warnings(level_counts, max_questions, sprt_config=None):
+    """
+    Advertencias sobre los niveles que se quedarían sin preguntas antes de
+    completar el mínimo para avanzar, con la configuración SPRT del examen
+    (o la configuración por defecto si aún no tiene una).
+    """
+    if sprt_config is None:
+        sprt_config = ExamSPRTConfig()
+
+    levels = difficulty_levels()
+    shortages = simulate_level_progression(
+        levels,
+        level_counts,
+        int(max_questions),
+        sprt_config.min_questions_per_level,
+    )
+
+    warnings = []
+    for level, needed, available in shortages:
+        if level is levels[-1]:
+            warnings.append(
+                f"El nivel {level.name} tiene {available} preguntas y un intento "
+                f"que llegue a él puede requerir {needed}: si se agotan antes de "
+                f"una decisión, el intento terminará como reprobado."
+            )
+        else:
+            warnings.append(
+                f"El nivel {level.name} tiene {available} preguntas, menos que las "
+                f"{needed} requeridas para avanzar: los intentos que lo agoten "
+                f"terminarán como reprobados."
+            )
+
+    return warnings
@@ -0,0 +1,158 @@
+# -------------------------------------------------------------------
+# Reportes XLSX en modo de solo escritura de openpyxl: las filas se escriben
+# a medida que se generan, sin mantener la hoja completa en memoria.
+# -------------------------------------------------------------------
+import tempfile
+from datetime import datetime
+from django.http import FileResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from app.models import ExamAttempt, LevelProgress
+from app.services.exam_exports import (
+    EXAM_RESULTS_HEADER,
+    EXPORT_CHUNK_SIZE,
+    attempt_answers_rows,
+    attempt_row,
+    attempts_queryset,
+    exam_answers_rows,
+    exam_level_progress_rows,
+    exam_results_rows,
+    level_progress_rows,
+)
+from app.services.exam_students import student_name, student_summaries
+
+
+XLSX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm"
+
+STUDENTS_HEADER = [
+    "#",
+    "Nombre",
+    "Documento",
+    "Correo electrónico",
+    "Intentos",
+    "Intentos Permitidos",
+    "En Progreso",
+    "% de Aciertos",
+    "Último Intento",
+]
+
+
+def excel_datetime(value):
+    """
+    Excel no admite zonas horarias: las fechas se escriben en la hora local.
+    """
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def _cell(worksheet, value, bold=False):
+    if isinstance(value, datetime):
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.number_format = DATETIME_FORMAT
+        return cell
+
+    if bold:
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.font = Font(bold=True)
+        return cell
+
+    # Los números se conservan como números; el resto se escribe como texto
+    if value is None or isinstance(value, (int, float)):
+        return value
+
+    return str(value)
+
+
+def write_workbook(sheets, output):
+    """
+    Escribe un libro con una hoja por cada (título, filas). La primera fila
+    de cada hoja es el encabezado.
+    """
+    workbook = Workbook(write_only=True)
+
+    for title, rows in sheets:
+        worksheet = workbook.create_sheet(title)
+        rows = iter(rows)
+
+        header = next(rows, None)
+        if header is not None:
+            worksheet.append([_cell(worksheet, value, bold=True) for value in header])
+
+        for row in rows:
+            worksheet.append([_cell(worksheet, value) for value in row])
+
+    workbook.save(output)
+
+
+def xlsx_response(sheets, filename):
+    """
+    Genera el libro en un archivo temporal y lo envía como descarga.
+    """
+    output = tempfile.TemporaryFile()
+    write_workbook(sheets, output)
+    output.seek(0)
+
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+def exam_workbook_sheets(exam):
+    """
+    Hojas del reporte de un examen: intentos, respuestas y progreso por nivel.
+    """
+    return [
+        ("Intentos", exam_results_rows(exam, excel_datetime)),
+        ("Respuestas", exam_answers_rows(exam)),
+        ("Progreso por Nivel", exam_level_progress_rows(exam)),
+    ]
+
+
+def _attempt_summary_rows(attempt):
+    yield EXAM_RESULTS_HEADER
+    summary = attempts_queryset(ExamAttempt.objects.filter(pk=attempt.pk)).get()
+    yield attempt_row(1, summary, attempt.exam.title, excel_datetime)
+
+
+def attempt_workbook_sheets(attempt):
+    """
+    Hojas del reporte de un intento: resumen, respuestas y progreso por nivel.
+    """
+    return [
+        ("Intento", _attempt_summary_rows(attempt)),
+        ("Respuestas", attempt_answers_rows(attempt)),
+        (
+            "Progreso por Nivel",
+            level_progress_rows(LevelProgress.objects.filter(attempt=attempt)),
+        ),
+    ]
+
+
+def exam_students_rows(exam):
+    """
+    Genera el encabezado y una fila por estudiante que presentó el examen.
+    """
+    yield STUDENTS_HEADER
+
+    summaries = student_summaries(exam).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for contador, summary in enumerate(summaries, start=1):
+        yield [
+            contador,
+            student_name(summary),
+            summary["student__document_number"],
+            summary["student__email"],
+            summary["attempts_used"],
+            exam.max_attempts,
+            summary["in_progress"],
+            round(summary["average_score"] or 0, 2),
+            excel_datetime(summary["last_started_at"]),
+        ]
@@ -0,0 +1,137 @@
+import math
+import threading
+from django.db.models import (
+    F,
+    Func,
+    IntegerField,
+    DateTimeField,
+    OuterRef,
+    Subquery,
+)
+from app.models import Exam, DifficultyLevel, Question, QuestionBank
+
+
+_runtimes = {}
+_lock = threading.Lock()
+
+
+class ExamRuntime:
+    """
+    Contexto de ejecución de un examen: configuración SPRT, constantes
+    precalculadas y niveles de dificultad ordenados.
+    Se reutiliza entre peticiones mientras el examen no cambie. Su marca
+    (stamp) incluye también los bancos y preguntas del examen, y versiona el
+    pool de preguntas.
+    """
+
+    def __init__(self, exam, stamp, levels):
+        self.exam = exam
+        self.config = exam.sprt_config
+        self.stamp = stamp
+
+        # Límites SPRT
+        self.lower_limit = math.log(self.config.beta / (1 - self.config.alpha))
+        self.upper_limit = math.log((1 - self.config.beta) / self.config.alpha)
+
+        # Incrementos del índice S por respuesta
+        p0 = self.config.p0 / 100
+        p1 = self.config.p1 / 100
+        self.delta_correct = math.log(p1 / p0)
+        self.delta_incorrect = math.log((1 - p1) / (1 - p0))
+
+        # Niveles de dificultad ordenados del más bajo al más alto
+        self.levels = levels
+        self.levels_by_id = {level.id: level for level in levels}
+
+    def first_level(self):
+        return self.levels[0] if self.levels else None
+
+    def get_level(self, level_id):
+        return self.levels_by_id.get(level_id)
+
+    def next_level(self, current_level):
+        """
+        Obtiene el nivel siguiente al indicado, o None si es el último.
+        """
+        for index, level in enumerate(self.levels[:-1]):
+            if level.id == current_level.id:
+                return self.levels[index + 1]
+
+        return None
+
+
+def _aggregate(queryset, function, field, output_field):
+    return Subquery(
+        queryset.order_by()
+        .annotate(stamp=Func(F(field), function=function, output_field=output_field))
+        .values("stamp")
+    )
+
+
+def _get_stamp(exam_id):
+    """
+    Obtiene en una sola consulta las marcas que invalidan el contexto:
+    el examen, su configuración SPRT, el catálogo de niveles, los bancos
+    del examen y sus preguntas.
+    """
+    levels = DifficultyLevel.objects.all()
+    banks = QuestionBank.objects.filter(exams=OuterRef("pk"))
+    questions = Question.objects.filter(bank__exams=OuterRef("pk"))
+
+    return (
+        Exam.objects.filter(pk=exam_id)
+        .annotate(
+            levels_updated_at=_aggregate(levels, "MAX", "updated_at", DateTimeField()),
+            levels_count=_aggregate(levels, "COUNT", "id", IntegerField()),
+            banks_updated_at=_aggregate(banks, "MAX", "updated_at", DateTimeField()),
+            banks_ids=_aggregate(banks, "SUM", "id", IntegerField()),
+            banks_count=_aggregate(banks, "COUNT", "id", IntegerField()),
+            questions_updated_at=_aggregate(
+                questions, "MAX", "updated_at", DateTimeField()
+            ),
+            questions_count=_aggregate(questions, "COUNT", "id", IntegerField()),
+        )
+        .values_list(
+            "updated_at",
+            "sprt_config__updated_at",
+            "levels_updated_at",
+            "levels_count",
+            "banks_updated_at",
+            "banks_ids",
+            "banks_count",
+            "questions_updated_at",
+            "questions_count",
+        )
+        .first()
+    )
+
+
+def _build_runtime(exam_id, stamp):
+    exam = Exam.objects.select_related("sprt_config").get(pk=exam_id)
+    levels = list(
+        DifficultyLevel.objects.filter(deleted_at__isnull=True).order_by("id")
+    )
+    return ExamRuntime(exam, stamp, levels)
+
+
+def get_exam_runtime(exam_id):
+    """
+    Retorna el contexto de ejecución del examen. Solo se reconstruye cuando
+    cambia el examen, su configuración SPRT o algún nivel de dificultad.
+    """
+    stamp = _get_stamp(exam_id)
+    if stamp is None:
+        raise Exam.DoesNotExist("El examen no existe.")
+
+    runtime = _runtimes.get(exam_id)
+    if runtime and runtime.stamp == stamp:
+        return runtime
+
+    with _lock:
+        runtime = _runtimes.get(exam_id)
+        if runtime and runtime.stamp == stamp:
+            return runtime
+
+        runtime = _build_runtime(exam_id, stamp)
+        _runtimes[exam_id] = runtime
+        return runtime
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, When
+from app.models import ExamAttempt
+
+
+# Las estadísticas se invalidan al iniciar, finalizar o recalificar intentos,
+# en la caché compartida de CACHES; la expiración es solo un respaldo
+STATISTICS_TIMEOUT = 60 * 5
+
+
+def attempt_accuracy():
+    """
+    Porcentaje de aciertos de un intento calculado en la base de datos,
+    equivalente a ExamAttempt.get_accuracy().
+    """
+    return Case(
+        When(
+            total_questions__gt=0,
+            then=F("correct_answers") * 100.0 / F("total_questions"),
+        ),
+        default=0.0,
+        output_field=FloatField(),
+    )
+
+
+def _cache_key(exam_id):
+    return f"exam_statistics:{exam_id}"
+
+
+def compute_exam_statistics(exam_id):
+    """
+    Calcula en una sola consulta los totales por estado y los promedios de
+    los intentos finalizados de un examen.
+    """
+    Status = ExamAttempt.Status
+    finished = ~Q(status=Status.IN_PROGRESS)
+
+    stats = ExamAttempt.objects.filter(exam_id=exam_id).aggregate(
+        total_attempts=Count("id"),
+        approved_count=Count("id", filter=Q(status=Status.APPROVED)),
+        failed_count=Count("id", filter=Q(status=Status.FAILED)),
+        in_progress_count=Count("id", filter=Q(status=Status.IN_PROGRESS)),
+        abandoned_count=Count("id", filter=Q(status=Status.ABANDONED)),
+        avg_questions=Avg("total_questions", filter=finished),
+        avg_accuracy=Avg(attempt_accuracy(), filter=finished),
+    )
+
+    total_attempts = stats["total_attempts"]
+
+    stats["avg_questions"] = round(stats["avg_questions"] or 0, 2)
+    stats["avg_accuracy"] = round(stats["avg_accuracy"] or 0, 2)
+    stats["approval_rate"] = (
+        round((stats["approved_count"] / total_attempts * 100), 2)
+        if total_attempts > 0
+        else 0
+    )
+
+    return stats
+
+
+def get_exam_statistics(exam_id):
+    """
+    Retorna las estadísticas del examen desde la caché, calculándolas si no
+    están disponibles.
+    """
+    key = _cache_key(exam_id)
+    stats = cache.get(key)
+
+    if stats is None:
+        stats = compute_exam_statistics(exam_id)
+        cache.set(key, stats, STATISTICS_TIMEOUT)
+
+    return stats
+
+
+def invalidate_exam_statistics(exam_id):
+    """
+    Descarta las estadísticas del examen cuando la transacción actual se
+    confirma, para que no se vuelvan a calcular con datos sin guardar.
+    """
+    transaction.on_commit(lambda: cache.delete(_cache_key(exam_id)))
@@ -0,0 +1,37 @@
+from django.db.models import Avg, Count, Max, Q
+from app.models import ExamAttempt
+from app.services.exam_statistics import attempt_accuracy
+
+
+def student_summaries(exam):
+    """
+    Resumen por estudiante de los intentos de un examen, calculado en una sola
+    consulta agrupada: intentos usados, intento en progreso, promedio de aciertos
+    y fecha del último intento.
+    """
+    return (
+        ExamAttempt.objects.filter(exam=exam)
+        .values(
+            "student_id",
+            "student__first_name",
+            "student__last_name",
+            "student__document_number",
+            "student__email",
+        )
+        .annotate(
+            attempts_used=Count("id"),
+            in_progress=Count("id", filter=Q(status=ExamAttempt.Status.IN_PROGRESS)),
+            average_score=Avg(attempt_accuracy()),
+            last_started_at=Max("started_at"),
+        )
+        .order_by("-last_started_at", "student_id")
+    )
+
+
+def student_name(summary):
+    """
+    Nombre del estudiante de un resumen, con el mismo formato que CustomUser.
+    """
+    return (
+        f"{summary['student__first_name']} {summary['student__last_name'] or ''}"
+    ).strip()
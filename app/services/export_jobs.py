@@ -0,0 +1,452 @@
+# -------------------------------------------------------------------
+# Cola local de exportaciones respaldada por la base de datos: las vistas
+# registran un ExportJob y el comando run_export_worker lo genera fuera de
+# la petición, sin depender de un broker externo. La cola también ejecuta
+# recalificaciones, que dejan como archivo el reporte de los cambios.
+# -------------------------------------------------------------------
+import csv
+import io
+import logging
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from app.models import (
+    AttemptAnswer,
+    Exam,
+    ExamAttempt,
+    ExportJob,
+    LevelProgress,
+    Question,
+    QuestionBank,
+)
+from app.services.bank_archive import write_bank_archive
+from app.services.exam_exports import (
+    exam_answers_rows,
+    exam_results_attempts,
+    exam_results_rows,
+)
+from app.services.exam_reports import (
+    exam_students_rows,
+    exam_workbook_sheets,
+    write_workbook,
+)
+from app.services.exam_students import student_summaries
+from app.services.sprt_rescoring import regrade_question, rescore_exam
+
+logger = logging.getLogger(__name__)
+
+
+# Un trabajo en proceso que no reporta avance en este tiempo se considera
+# abandonado (el worker se detuvo) y vuelve a quedar disponible
+STALE_AFTER = timedelta(minutes=10)
+
+# Cada cuánto se marca como activo un trabajo en proceso
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+
+
+def _today():
+    return timezone.now().strftime("%Y-%m-%d")
+
+
+def _exam(exam_id):
+    exam = Exam.objects.filter(pk=exam_id, deleted_at__isnull=True).first()
+    if exam is None:
+        raise ValueError("El examen ya no existe.")
+    return exam
+
+
+def _finished_attempts(exam):
+    return ExamAttempt.objects.filter(exam=exam).exclude(
+        status=ExamAttempt.Status.IN_PROGRESS
+    )
+
+
+def _exam_workbook_total(exam):
+    """
+    Filas del reporte XLSX de un examen: intentos, respuestas y niveles.
+    """
+    attempts = _finished_attempts(exam)
+
+    return (
+        attempts.count()
+        + AttemptAnswer.objects.filter(attempt__in=attempts).count()
+        + LevelProgress.objects.filter(attempt__in=attempts).count()
+    )
+
+
+class Progress:
+    """
+    Cuenta las filas escritas y guarda el porcentaje de avance del trabajo
+    solo cuando cambia, para no escribir en la base de datos por cada fila.
+    """
+
+    def __init__(self, job, total):
+        self.job = job
+        self.total = max(total, 1)
+        self.done = 0
+        self.percent = 0
+
+    def track(self, rows):
+        """
+        Recorre las filas de una hoja (la primera es el encabezado) y
+        actualiza el avance a medida que se consumen.
+        """
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield header
+
+        for row in rows:
+            yield row
+            self.step()
+
+    def step(self, count=1):
+        self.done += count
+        percent = min(int(self.done * 100 / self.total), 99)
+
+        if percent > self.percent:
+            self.percent = percent
+            ExportJob.objects.filter(pk=self.job.pk).update(
+                progress=percent, updated_at=timezone.now()
+            )
+
+
+def _write_csv(rows, output):
+    # utf-8-sig agrega el BOM que Excel necesita para reconocer los acentos
+    text = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+    csv.writer(text).writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def _build_exam_results_csv(job, output):
+    exam = _exam(job.params["exam_id"])
+    progress = Progress(job, exam_results_attempts(exam).count())
+
+    _write_csv(progress.track(exam_results_rows(exam)), output)
+    return f"Resultados de {exam.title} ({_today()}).csv"
+
+
+def _build_exam_answers_csv(job, output):
+    exam = _exam(job.params["exam_id"])
+    total = AttemptAnswer.objects.filter(attempt__in=_finished_attempts(exam))
+    progress = Progress(job, total.count())
+
+    _write_csv(progress.track(exam_answers_rows(exam)), output)
+    return f"Respuestas de {exam.title} ({_today()}).csv"
+
+
+def _build_exam_results_xlsx(job, output):
+    exam = _exam(job.params["exam_id"])
+    progress = Progress(job, _exam_workbook_total(exam))
+
+    sheets = [
+        (title, progress.track(rows)) for title, rows in exam_workbook_sheets(exam)
+    ]
+    write_workbook(sheets, output)
+    return f"Resultados de {exam.title} ({_today()}).xlsx"
+
+
+def _build_exam_students_xlsx(job, output):
+    exam = _exam(job.params["exam_id"])
+    progress = Progress(job, student_summaries(exam).count())
+
+    write_workbook([("Estudiantes", progress.track(exam_students_rows(exam)))], output)
+    return f"Estudiantes de {exam.title} ({_today()}).xlsx"
+
+
+def _build_exams_bundle_zip(job, output):
+    """
+    Un ZIP con el reporte XLSX de cada examen. Cada libro se genera en un
+    archivo temporal y se copia al ZIP, de modo que en memoria solo hay un
+    bloque a la vez.
+    """
+    exams = list(
+        Exam.objects.filter(
+            pk__in=job.params["exam_ids"], deleted_at__isnull=True
+        ).order_by("title")
+    )
+    if not exams:
+        raise ValueError("Los exámenes seleccionados ya no existen.")
+
+    progress = Progress(job, sum(_exam_workbook_total(exam) for exam in exams))
+
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for exam in exams:
+            title = exam.title.replace("/", "-")
+
+            with tempfile.TemporaryFile() as workbook:
+                sheets = [
+                    (sheet, progress.track(rows))
+                    for sheet, rows in exam_workbook_sheets(exam)
+                ]
+                write_workbook(sheets, workbook)
+                workbook.seek(0)
+
+                with bundle.open(f"{exam.id} - {title}.xlsx", "w") as entry:
+                    shutil.copyfileobj(workbook, entry)
+
+    return f"Reportes de {len(exams)} exámenes ({_today()}).zip"
+
+
+def _build_question_bank_archive(job, output):
+    bank = QuestionBank.objects.filter(
+        pk=job.params["bank_id"], deleted_at__isnull=True
+    ).first()
+    if bank is None:
+        raise ValueError("El banco de preguntas ya no existe.")
+
+    total = bank.questions.filter(deleted_at__isnull=True).count()
+    write_bank_archive(bank, output, track=Progress(job, total).track)
+    return f"Banco {bank.name.replace('/', '-')} ({_today()}).zip"
+
+
+def _write_rescore_report(report, output):
+    rows = [["Intento", "Estado anterior", "Estado nuevo", "S anterior", "S nuevo"]]
+    for change in report["changed_attempts"]:
+        rows.append(
+            [
+                change["attempt_id"],
+                ExamAttempt.Status(change["old_status"]).label,
+                ExamAttempt.Status(change["new_status"]).label,
+                change["old_s_index"],
+                change["new_s_index"],
+            ]
+        )
+
+    _write_csv(rows, output)
+
+
+def _build_exam_rescore(job, output):
+    """
+    Recalifica los intentos del examen con su configuración SPRT actual y
+    genera un CSV con los intentos que cambiaron.
+    """
+    exam = _exam(job.params["exam_id"])
+    _write_rescore_report(rescore_exam(exam.id), output)
+    return f"Recalificación de {exam.title} ({_today()}).csv"
+
+
+def _build_question_regrade(job, output):
+    """
+    Recalifica los intentos que respondieron una pregunta tras un cambio en
+    su clave de respuestas y genera un CSV con los intentos que cambiaron.
+    """
+    question = Question.objects.filter(pk=job.params["question_id"]).first()
+    if question is None:
+        raise ValueError("La pregunta ya no existe.")
+
+    _write_rescore_report(regrade_question(question.id), output)
+    return f"Recalificación de la pregunta {question.id} ({_today()}).csv"
+
+
+BUILDERS = {
+    ExportJob.Kind.EXAM_RESULTS_CSV: _build_exam_results_csv,
+    ExportJob.Kind.EXAM_ANSWERS_CSV: _build_exam_answers_csv,
+    ExportJob.Kind.EXAM_RESULTS_XLSX: _build_exam_results_xlsx,
+    ExportJob.Kind.EXAM_STUDENTS_XLSX: _build_exam_students_xlsx,
+    ExportJob.Kind.EXAMS_BUNDLE_ZIP: _build_exams_bundle_zip,
+    ExportJob.Kind.QUESTION_BANK_ARCHIVE: _build_question_bank_archive,
+    ExportJob.Kind.EXAM_RESCORE: _build_exam_rescore,
+    ExportJob.Kind.QUESTION_REGRADE: _build_question_regrade,
+}
+
+
+def enqueue_export(kind, exams, user):
+    """
+    Registra una exportación en la cola. Los reportes de un examen reciben
+    una lista con un único examen; el ZIP recibe todos los seleccionados.
+    """
+    label = ExportJob.Kind(kind).label
+
+    if kind == ExportJob.Kind.EXAMS_BUNDLE_ZIP:
+        params = {"exam_ids": [exam.id for exam in exams]}
+        title = f"{label}: {len(exams)} exámenes"
+    else:
+        params = {"exam_id": exams[0].id}
+        title = f"{label}: {exams[0].title}"
+
+    return ExportJob.objects.create(
+        kind=kind, params=params, title=title[:255], requested_by=user
+    )
+
+
+def enqueue_bank_archive(bank, user):
+    """
+    Registra en la cola la exportación portable de un banco de preguntas.
+    """
+    label = ExportJob.Kind.QUESTION_BANK_ARCHIVE.label
+
+    return ExportJob.objects.create(
+        kind=ExportJob.Kind.QUESTION_BANK_ARCHIVE,
+        params={"bank_id": bank.id},
+        title=f"{label}: {bank.name}"[:255],
+        requested_by=user,
+    )
+
+
+def enqueue_exam_rescore(exam, user):
+    """
+    Registra en la cola la recalificación de los intentos de un examen.
+    """
+    label = ExportJob.Kind.EXAM_RESCORE.label
+
+    return ExportJob.objects.create(
+        kind=ExportJob.Kind.EXAM_RESCORE,
+        params={"exam_id": exam.id},
+        title=f"{label}: {exam.title}"[:255],
+        requested_by=user,
+    )
+
+
+def enqueue_question_regrade(question, user):
+    """
+    Registra en la cola la recalificación de los intentos que respondieron
+    una pregunta cuya clave de respuestas cambió.
+    """
+    label = ExportJob.Kind.QUESTION_REGRADE.label
+
+    return ExportJob.objects.create(
+        kind=ExportJob.Kind.QUESTION_REGRADE,
+        params={"question_id": question.id},
+        title=f"{label}: {question.topic}"[:255],
+        requested_by=user,
+    )
+
+
+def claim_next_job():
+    """
+    Toma el trabajo pendiente más antiguo (o uno en proceso cuyo worker dejó
+    de reportar avance) y lo marca como en proceso. Varios workers pueden
+    ejecutarse a la vez: SKIP LOCKED evita que esperen por la misma fila y la
+    actualización condicional garantiza que solo uno lo tome.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ExportJob.Status.PENDING)
+                | Q(status=ExportJob.Status.RUNNING, updated_at__lt=now - STALE_AFTER)
+            )
+            .order_by("created_at")
+            .first()
+        )
+
+        if job is None:
+            return None
+
+        claimed = ExportJob.objects.filter(
+            pk=job.pk, status=job.status, updated_at=job.updated_at
+        ).update(
+            status=ExportJob.Status.RUNNING,
+            progress=0,
+            started_at=now,
+            updated_at=now,
+        )
+
+    if not claimed:
+        return None
+
+    job.status = ExportJob.Status.RUNNING
+    job.progress = 0
+    job.started_at = now
+    job.updated_at = now
+    return job
+
+
+class Heartbeat(threading.Thread):
+    """
+    Actualiza updated_at del trabajo mientras se genera, de modo que un
+    trabajo largo que no reporta avance (como una recalificación) no se
+    considere abandonado y otro worker lo tome de nuevo.
+    """
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job_id = job.pk
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(HEARTBEAT_INTERVAL.total_seconds()):
+                ExportJob.objects.filter(
+                    pk=self.job_id, status=ExportJob.Status.RUNNING
+                ).update(updated_at=timezone.now())
+        finally:
+            # El hilo abre su propia conexión
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """
+    Genera el archivo del trabajo y lo guarda en el almacenamiento privado.
+    Retorna True si terminó correctamente.
+    """
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+
+    try:
+        with tempfile.TemporaryFile() as output:
+            filename = BUILDERS[job.kind](job, output)
+            output.seek(0)
+            job.file.save(f"{job.pk}-{filename}", File(output), save=False)
+    except Exception as e:
+        logger.exception("Error generando la exportación %s", job.pk)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.Status.FAILED,
+            error=str(e),
+            completed_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        return False
+    finally:
+        heartbeat.stop()
+
+    job.filename = filename
+    job.status = ExportJob.Status.COMPLETED
+    job.progress = 100
+    job.completed_at = timezone.now()
+    job.save(
+        update_fields=[
+            "file",
+            "filename",
+            "status",
+            "progress",
+            "completed_at",
+            "updated_at",
+        ]
+    )
+    return True
+
+
+def purge_jobs(older_than):
+    """
+    Elimina los trabajos terminados antes de la fecha indicada junto con sus
+    archivos. Retorna la cantidad eliminada.
+    """
+    jobs = ExportJob.objects.filter(
+        status__in=[ExportJob.Status.COMPLETED, ExportJob.Status.FAILED],
+        completed_at__lt=older_than,
+    )
+
+    purged = 0
+    for job in jobs.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        purged += 1
+
+    return purged
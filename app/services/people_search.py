@@ -0,0 +1,75 @@
+# -------------------------------------------------------------------
+# Búsqueda de personas (estudiantes y administradores) por nombre, correo
+# o documento. Se consulta el campo normalizado search_text, con índice de
+# trigramas en PostgreSQL y una tabla FTS5 de trigramas en SQLite. Una
+# consulta numérica se busca además como prefijo del documento.
+# -------------------------------------------------------------------
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from utils.utils import document_digits, normalize_search_text
+
+
+SEARCH_TABLE = "app_users_search"
+
+# Palabras de la consulta que se tienen en cuenta
+MAX_TERMS = 5
+
+# Longitud mínima de una palabra para usar el índice de trigramas
+TRIGRAM_LENGTH = 3
+
+# Números de documento escritos con o sin separadores (1.234.567, 12-345)
+_DOCUMENT_RE = re.compile(r"^[\d.\-\s]+$")
+
+
+def document_prefix(query):
+    """
+    Retorna los dígitos de la consulta si parece un número de documento.
+    """
+    if query and _DOCUMENT_RE.match(query):
+        return document_digits(query) or None
+    return None
+
+
+def _term_filter(term):
+    if connection.vendor == "sqlite" and len(term) >= TRIGRAM_LENGTH:
+        # El tokenizador de trigramas resuelve LIKE '%term%' desde el índice
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return Q(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {SEARCH_TABLE} "
+                f"WHERE search_text LIKE %s ESCAPE '\\'",
+                [f"%{escaped}%"],
+            )
+        )
+    return Q(search_text__contains=term)
+
+
+def _document_filter(prefix):
+    if connection.vendor == "sqlite":
+        # LIKE no distingue mayúsculas en SQLite y no usa el índice; GLOB sí
+        return Q(
+            pk__in=RawSQL(
+                "SELECT id FROM app_users WHERE document_number GLOB %s",
+                [f"{prefix}*"],
+            )
+        )
+    return Q(document_number__startswith=prefix)
+
+
+def search_people(users, query):
+    """
+    Filtra los usuarios cuyo nombre, correo o documento contienen todas las
+    palabras de la consulta, sin distinguir mayúsculas ni tildes. Una
+    consulta numérica coincide con el prefijo del documento o con sus dígitos
+    en cualquier parte del nombre, correo o documento.
+    """
+    prefix = document_prefix(query)
+    if prefix:
+        return users.filter(_document_filter(prefix) | _term_filter(prefix))
+
+    for term in normalize_search_text(query).split()[:MAX_TERMS]:
+        users = users.filter(_term_filter(term))
+
+    return users
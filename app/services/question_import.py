@@ -0,0 +1,501 @@
+# -------------------------------------------------------------------
+# Importación masiva de preguntas a un banco desde un archivo XLSX o CSV,
+# con un ZIP opcional de imágenes y audios. Las filas se leen en streaming,
+# se validan una a una y las válidas se insertan por lotes con bulk_create;
+# las inválidas se reportan con su número de fila.
+# -------------------------------------------------------------------
+import csv
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from app.models import AnswerOption, DifficultyLevel, KnowledgeArea, Question
+from app.services.bank_inventory import invalidate_bank_inventory
+from app.services.question_pool import invalidate_question_pools
+from utils.utils import generate_unique_filename, normalize_search_text
+
+
+# Preguntas que se insertan por lote
+BATCH_SIZE = 500
+
+# Límites del archivo
+MAX_ROWS = 20000
+MAX_OPTIONS = 8
+MAX_MEDIA_SIZE = 10 * 1024 * 1024
+
+REQUIRED_COLUMNS = ("area", "nivel", "tema", "tiempo", "enunciado")
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"}
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".aac"}
+
+STATEMENT_TYPES = {
+    "texto": Question.StatementType.TEXT,
+    "text": Question.StatementType.TEXT,
+    "imagen": Question.StatementType.IMAGE,
+    "image": Question.StatementType.IMAGE,
+    "audio": Question.StatementType.AUDIO,
+}
+
+TRUE_VALUES = {"si", "x", "1", "true", "verdadero", "correcta"}
+
+# Encabezados y fila de ejemplo de la plantilla descargable
+TEMPLATE_HEADERS = [
+    "area",
+    "nivel",
+    "tema",
+    "tiempo",
+    "tipo_enunciado",
+    "enunciado_inicial",
+    "enunciado",
+    "enunciado_final",
+    "opcion_1",
+    "retroalimentacion_1",
+    "correcta_1",
+    "opcion_2",
+    "retroalimentacion_2",
+    "correcta_2",
+]
+
+TEMPLATE_EXAMPLE = [
+    "Matemáticas",
+    "Básico",
+    "Fracciones",
+    "60",
+    "texto",
+    "",
+    "¿Cuánto es 1/2 + 1/4?",
+    "",
+    "3/4",
+    "Correcto: 2/4 + 1/4 = 3/4.",
+    "si",
+    "2/6",
+    "No se suman los denominadores.",
+    "",
+]
+
+
+def _column_name(header):
+    return normalize_search_text(header).replace(" ", "_")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+# -------------------------------------------------------------------
+# Lectura del archivo
+# -------------------------------------------------------------------
+def _xlsx_rows(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_cell(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+
+    # Excel en español separa con punto y coma
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    try:
+        for row in csv.reader(text, dialect):
+            yield [_cell(value) for value in row]
+    finally:
+        # Evita que el wrapper cierre el archivo subido al descartarse
+        if not file.closed:
+            text.detach()
+
+
+def read_rows(file, filename):
+    """
+    Recorre las filas de un archivo XLSX o CSV como diccionarios con los
+    encabezados normalizados (minúsculas, sin tildes y con guion bajo).
+
+    Yields:
+        tuple: (número de fila en el archivo, {columna: valor})
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+
+    if extension == ".xlsx":
+        rows = _xlsx_rows(file)
+    elif extension == ".csv":
+        rows = _csv_rows(file)
+    else:
+        raise ValidationError("El archivo debe ser XLSX o CSV.")
+
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ValidationError("El archivo está vacío.")
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, UnicodeDecodeError):
+        raise ValidationError("No se pudo leer el archivo.")
+
+    columns = [_column_name(name) for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValidationError(f"Faltan las columnas: {', '.join(missing)}.")
+
+    for row_number, values in enumerate(rows, start=2):
+        yield row_number, dict(zip(columns, values))
+
+
+# -------------------------------------------------------------------
+# Archivos multimedia del ZIP
+# -------------------------------------------------------------------
+class MediaArchive:
+    """
+    Archivos del ZIP de multimedia, buscados por ruta o por nombre. Cada
+    archivo se guarda una sola vez por destino aunque lo usen varias filas.
+    """
+
+    def __init__(self, file=None):
+        self.members = {}
+        self.saved = {}
+        self.saved_files = []
+        self.archive = None
+
+        if file is None:
+            return
+
+        try:
+            self.archive = zipfile.ZipFile(file)
+        except zipfile.BadZipFile:
+            raise ValidationError("El archivo de multimedia no es un ZIP válido.")
+
+        for info in self.archive.infolist():
+            if info.is_dir():
+                continue
+            self.members.setdefault(info.filename, info)
+            self.members.setdefault(os.path.basename(info.filename), info)
+
+    def media_type(self, value):
+        extension = os.path.splitext(value)[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            return "image"
+        if extension in AUDIO_EXTENSIONS:
+            return "audio"
+        return None
+
+    def check(self, value):
+        """
+        Retorna el error de un archivo referenciado en una fila, o None.
+        """
+        info = self.members.get(value)
+
+        if info is None:
+            return f"El archivo '{value}' no está en el ZIP de multimedia."
+        if info.file_size > MAX_MEDIA_SIZE:
+            return f"El archivo '{value}' supera el tamaño máximo de 10 MB."
+        return None
+
+    def save(self, value, field):
+        """
+        Guarda el archivo en el almacenamiento del campo y retorna su nombre.
+        """
+        info = self.members[value]
+        key = (info.filename, field.upload_to)
+
+        if key not in self.saved:
+            content = ContentFile(
+                self.archive.read(info), name=os.path.basename(info.filename)
+            )
+            name = f"{field.upload_to}{generate_unique_filename(content)}"
+            self.saved[key] = field.storage.save(name, content)
+            self.saved_files.append((field.storage, self.saved[key]))
+
+        return self.saved[key]
+
+    def discard_saved(self):
+        """
+        Elimina los archivos guardados cuando la importación no se confirma.
+        """
+        for storage, name in self.saved_files:
+            storage.delete(name)
+        self.saved = {}
+        self.saved_files = []
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+# -------------------------------------------------------------------
+# Validación de filas
+# -------------------------------------------------------------------
+def _lookup(model):
+    return {
+        normalize_search_text(name): pk
+        for pk, name in model.objects.filter(deleted_at__isnull=True).values_list(
+            "id", "name"
+        )
+    }
+
+
+def _media_value(value, media, errors, label):
+    """
+    Tipo (text, image o audio) de un valor que puede referenciar un archivo
+    del ZIP de multimedia.
+    """
+    if media.archive is None or media.media_type(value) is None:
+        return "text"
+
+    error = media.check(value)
+    if error:
+        errors.append(f"{label}: {error}")
+    return media.media_type(value)
+
+
+def _parse_options(row, media, errors):
+    options = []
+
+    for number in range(1, MAX_OPTIONS + 1):
+        value = row.get(f"opcion_{number}", "")
+        if not value:
+            continue
+
+        option_type = _media_value(value, media, errors, f"Opción {number}")
+        correct = normalize_search_text(row.get(f"correcta_{number}", ""))
+        options.append(
+            {
+                "type": option_type,
+                "value": value,
+                "feedback": row.get(f"retroalimentacion_{number}", ""),
+                "is_correct": correct in TRUE_VALUES,
+            }
+        )
+
+    # Misma regla que Question.clean
+    try:
+        Question.validate_options(
+            [SimpleNamespace(is_correct=option["is_correct"]) for option in options]
+        )
+    except ValidationError as e:
+        errors.extend(e.messages)
+
+    return options
+
+
+def parse_row(row, areas, levels, media):
+    """
+    Valida una fila del archivo.
+
+    Returns:
+        tuple: (datos de la pregunta o None, lista de errores)
+    """
+    errors = []
+
+    area_id = areas.get(normalize_search_text(row.get("area", "")))
+    if area_id is None:
+        errors.append(f"El área de conocimiento '{row.get('area', '')}' no existe.")
+
+    level_id = levels.get(normalize_search_text(row.get("nivel", "")))
+    if level_id is None:
+        errors.append(f"El nivel de dificultad '{row.get('nivel', '')}' no existe.")
+
+    topic = row.get("tema", "")
+    if not topic:
+        errors.append("El tema es obligatorio.")
+    elif len(topic) > 255:
+        errors.append("El tema no puede superar 255 caracteres.")
+
+    try:
+        time = float(row.get("tiempo", ""))
+        if time <= 0 or not time.is_integer():
+            raise ValueError
+        time = int(time)
+    except ValueError:
+        time = None
+        errors.append("El tiempo debe ser un número entero de segundos mayor a 0.")
+
+    statement = row.get("enunciado", "")
+    statement_type = STATEMENT_TYPES.get(
+        normalize_search_text(row.get("tipo_enunciado", ""))
+    )
+
+    if not statement:
+        errors.append("El enunciado es obligatorio.")
+    elif statement_type is None:
+        statement_type = _media_value(statement, media, errors, "Enunciado")
+    elif statement_type != Question.StatementType.TEXT:
+        if media.archive is None:
+            errors.append("El enunciado requiere el ZIP de multimedia.")
+        elif media.media_type(statement) != statement_type:
+            errors.append(f"El enunciado debe ser un archivo de tipo {statement_type}.")
+        else:
+            error = media.check(statement)
+            if error:
+                errors.append(f"Enunciado: {error}")
+
+    options = _parse_options(row, media, errors)
+
+    if errors:
+        return None, errors
+
+    return {
+        "area_id": area_id,
+        "level_id": level_id,
+        "topic": topic,
+        "time": time,
+        "statement_type": statement_type,
+        "statement": statement,
+        "start_statement": row.get("enunciado_inicial", ""),
+        "end_statement": row.get("enunciado_final", ""),
+        "options": options,
+    }, []
+
+
+# -------------------------------------------------------------------
+# Inserción por lotes
+# -------------------------------------------------------------------
+def _build_question(bank, data, media):
+    fields = {
+        "bank": bank,
+        "difficulty_level_id": data["level_id"],
+        "knowledge_area_id": data["area_id"],
+        "topic": data["topic"],
+        "time": data["time"],
+        "statement_type": data["statement_type"],
+        "is_active": True,
+    }
+
+    if data["start_statement"]:
+        fields["start_statement"] = data["start_statement"]
+    if data["end_statement"]:
+        fields["end_statement"] = data["end_statement"]
+
+    statement_type = data["statement_type"]
+    if statement_type == Question.StatementType.TEXT:
+        fields["statement_text"] = data["statement"]
+    else:
+        field_name = f"statement_{statement_type}"
+        fields[field_name] = media.save(
+            data["statement"], Question._meta.get_field(field_name)
+        )
+
+    return Question(**fields)
+
+
+def _build_option(question, option, media):
+    fields = {
+        "question": question,
+        "option_type": option["type"],
+        "feedback": option["feedback"],
+        "is_correct": option["is_correct"],
+        "is_active": True,
+    }
+
+    if option["type"] == AnswerOption.OptionType.TEXT:
+        fields["option_text"] = option["value"]
+    else:
+        field_name = f"option_{option['type']}"
+        fields[field_name] = media.save(
+            option["value"], AnswerOption._meta.get_field(field_name)
+        )
+
+    return AnswerOption(**fields)
+
+
+def _insert_batch(bank, batch, media):
+    questions = Question.objects.bulk_create(
+        [_build_question(bank, data, media) for data in batch]
+    )
+
+    options = [
+        _build_option(question, option, media)
+        for question, data in zip(questions, batch)
+        for option in data["options"]
+    ]
+    AnswerOption.objects.bulk_create(options, batch_size=BATCH_SIZE * 4)
+
+
+    return len(questions), len(options)
+
+
+def import_questions(bank, file, filename, media_file=None, dry_run=False):
+    """
+    Importa las preguntas del archivo al banco. Las filas válidas se insertan
+    y las inválidas se reportan; con dry_run solo se validan. Los errores del
+    archivo completo (formato, columnas, cantidad de filas) se lanzan como
+    ValidationError sin importar ninguna fila.
+
+    Returns:
+        dict: total_rows, valid_rows, created, options, dry_run y errors, una
+        lista de {"row": número de fila, "errors": [mensajes]}.
+    """
+    report = {
+        "total_rows": 0,
+        "valid_rows": 0,
+        "created": 0,
+        "options": 0,
+        "dry_run": dry_run,
+        "errors": [],
+    }
+
+    areas = _lookup(KnowledgeArea)
+    levels = _lookup(DifficultyLevel)
+    media = MediaArchive(media_file)
+
+    def flush(batch):
+        if batch and not dry_run:
+            created, options = _insert_batch(bank, batch, media)
+            report["created"] += created
+            report["options"] += options
+        batch.clear()
+
+    try:
+        with transaction.atomic():
+            batch = []
+
+            for row_number, row in read_rows(file, filename):
+                if not any(row.values()):
+                    continue
+
+                report["total_rows"] += 1
+                if report["total_rows"] > MAX_ROWS:
+                    raise ValidationError(
+                        f"El archivo supera el máximo de {MAX_ROWS} preguntas."
+                    )
+
+                data, errors = parse_row(row, areas, levels, media)
+
+                if errors:
+                    report["errors"].append({"row": row_number, "errors": errors})
+                    continue
+
+                report["valid_rows"] += 1
+                if dry_run:
+                    continue
+
+                batch.append(data)
+                if len(batch) >= BATCH_SIZE:
+                    flush(batch)
+
+            flush(batch)
+
+            if report["created"] and not dry_run:
+                transaction.on_commit(invalidate_question_pools)
+                invalidate_bank_inventory()
+    except Exception:
+        media.discard_saved()
+        raise
+    finally:
+        media.close()
+
+    return report
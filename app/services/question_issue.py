@@ -0,0 +1,50 @@
+import random
+from app.models import AnswerOption
+
+
+def _file_url(field):
+    return field.url if field else ""
+
+
+def serialize_question(question):
+    """
+    Serializa una pregunta y sus opciones (en orden aleatorio) para
+    presentarla desde el cliente sin recargar la página.
+    No incluye qué opción es correcta ni la retroalimentación.
+    """
+    options = list(
+        question.options.filter(is_active=True, deleted_at__isnull=True).only(
+            "id",
+            "question_id",
+            "option_type",
+            "option_text",
+            "option_image",
+            "option_audio",
+        )
+    )
+    random.shuffle(options)
+
+    return {
+        "id": question.id,
+        "time": question.time,
+        "start_statement": question.start_statement or "",
+        "end_statement": question.end_statement or "",
+        "statement_type": question.statement_type,
+        "statement_text": question.statement_text or "",
+        "statement_image": _file_url(question.statement_image),
+        "statement_audio": _file_url(question.statement_audio),
+        "options": [
+            {
+                "id": option.id,
+                "type": option.option_type,
+                "text": (
+                    option.option_text or ""
+                    if option.option_type == AnswerOption.OptionType.TEXT
+                    else ""
+                ),
+                "image": _file_url(option.option_image),
+                "audio": _file_url(option.option_audio),
+            }
+            for option in options
+        ],
+    }
@@ -0,0 +1,129 @@
+# -------------------------------------------------------------------
+# Pool en memoria de las preguntas de cada examen, por proceso.
+# Se versiona con la marca del contexto de ejecución del examen, que cambia
+# con el examen, sus bancos y sus preguntas (altas, cambios de banco o de
+# nivel), de modo que se reconstruye también por cambios de otros procesos.
+# -------------------------------------------------------------------
+import random
+import threading
+import time
+from app.models import Question
+
+
+# Tiempo máximo (segundos) que un pool puede reutilizarse antes de reconstruirse.
+# Acota el desfase por cambios que no modifican ninguna fecha de actualización.
+POOL_TTL_SECONDS = 300
+
+# Intentos de muestreo por rechazo antes de filtrar la lista completa
+MAX_DRAW_ATTEMPTS = 8
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class QuestionPool:
+    """
+    Índice en memoria de los IDs de preguntas de un examen, agrupados por
+    nivel de dificultad. Se construye una sola vez por versión del examen.
+    """
+
+    def __init__(self, exam_id, version, bank_ids, question_ids_by_level):
+        self.exam_id = exam_id
+        self.version = version
+        self.bank_ids = bank_ids
+        self.question_ids_by_level = question_ids_by_level
+        self.built_at = time.monotonic()
+
+    def is_expired(self):
+        return time.monotonic() - self.built_at > POOL_TTL_SECONDS
+
+    def draw(self, level_id, exclude_ids):
+        """
+        Selecciona un ID aleatorio del nivel indicado que no esté en exclude_ids.
+        Retorna None si el nivel no tiene preguntas disponibles.
+        """
+        candidates = self.question_ids_by_level.get(level_id, [])
+        if not candidates:
+            return None
+
+        # Muestreo por rechazo: las preguntas respondidas suelen ser pocas
+        # frente al total del nivel, por lo que casi siempre acierta al primer intento
+        for _ in range(MAX_DRAW_ATTEMPTS):
+            question_id = random.choice(candidates)
+            if question_id not in exclude_ids:
+                return question_id
+
+        remaining = [qid for qid in candidates if qid not in exclude_ids]
+        if not remaining:
+            return None
+
+        return random.choice(remaining)
+
+    def remaining_by_level(self, exclude_ids):
+        """
+        Cantidad de preguntas aún disponibles en cada nivel, sin consultar
+        la base de datos.
+        """
+        return {
+            level_id: sum(1 for qid in question_ids if qid not in exclude_ids)
+            for level_id, question_ids in self.question_ids_by_level.items()
+        }
+
+    def discard(self, question_id):
+        """
+        Retira del pool una pregunta que ya no es válida (desactivada o eliminada).
+        """
+        for level_id, question_ids in self.question_ids_by_level.items():
+            if question_id in question_ids:
+                self.question_ids_by_level[level_id] = [
+                    qid for qid in question_ids if qid != question_id
+                ]
+
+
+def _build_pool(runtime):
+    exam = runtime.exam
+    bank_ids = list(exam.question_banks.values_list("id", flat=True))
+    question_ids_by_level = {}
+
+    rows = Question.objects.filter(
+        bank_id__in=bank_ids,
+        is_active=True,
+        deleted_at__isnull=True,
+    ).values_list("id", "difficulty_level_id")
+
+    for question_id, level_id in rows:
+        question_ids_by_level.setdefault(level_id, []).append(question_id)
+
+    return QuestionPool(exam.id, runtime.stamp, bank_ids, question_ids_by_level)
+
+
+def get_question_pool(runtime):
+    """
+    Retorna el pool de preguntas del examen del contexto de ejecución,
+    construyéndolo si no existe, si cambió su marca o si expiró.
+    """
+    exam_id = runtime.exam.id
+    pool = _pools.get(exam_id)
+    if pool and pool.version == runtime.stamp and not pool.is_expired():
+        return pool
+
+    with _lock:
+        pool = _pools.get(exam_id)
+        if pool and pool.version == runtime.stamp and not pool.is_expired():
+            return pool
+
+        pool = _build_pool(runtime)
+        _pools[exam_id] = pool
+        return pool
+
+
+def invalidate_question_pools(exam_id=None):
+    """
+    Descarta los pools de este proceso. Sin exam_id se descartan todos,
+    útil cuando cambia una pregunta que puede pertenecer a varios exámenes.
+    """
+    with _lock:
+        if exam_id is None:
+            _pools.clear()
+        else:
+            _pools.pop(exam_id, None)
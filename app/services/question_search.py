@@ -0,0 +1,261 @@
+# -------------------------------------------------------------------
+# Búsqueda de texto completo en las preguntas de un banco. En PostgreSQL
+# cada pregunta guarda un vector de búsqueda ponderado (tema y área sobre el
+# enunciado) con índice GIN; en SQLite se usa una tabla FTS5 equivalente.
+# Triggers de la base de datos (migración 0037) mantienen el índice al
+# escribir preguntas o renombrar áreas, desde cualquier camino.
+# -------------------------------------------------------------------
+import re
+import unicodedata
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from app.models import KnowledgeArea, Question
+
+
+SEARCH_CONFIG = "spanish"
+
+FTS_TABLE = "app_questions_fts"
+
+# Palabras de la consulta que se tienen en cuenta
+MAX_TERMS = 8
+
+# Preguntas que se reindexan por sentencia
+INDEX_BATCH_SIZE = 500
+
+# Longitud del fragmento del enunciado que se muestra con las coincidencias
+SNIPPET_LENGTH = 160
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _vendor():
+    return connection.vendor
+
+
+def _fold(text):
+    """
+    Minúsculas sin tildes conservando la longitud del texto, para ubicar las
+    coincidencias en el texto original.
+    """
+    return "".join(unicodedata.normalize("NFD", char.lower())[0] for char in text)
+
+
+def search_terms(query):
+    return _WORD_RE.findall(query or "")[:MAX_TERMS]
+
+
+# -------------------------------------------------------------------
+# Mantenimiento del índice
+# -------------------------------------------------------------------
+def _search_vector():
+    areas = KnowledgeArea.objects.filter(pk=OuterRef("knowledge_area_id"))
+    area_name = Subquery(areas.values("name")[:1])
+    return (
+        SearchVector("topic", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(area_name, weight="A", config=SEARCH_CONFIG)
+        + SearchVector("statement_text", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(
+            "start_statement", "end_statement", weight="C", config=SEARCH_CONFIG
+        )
+    )
+
+
+def _sqlite_reindex(where, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+            f"(SELECT id FROM app_questions q WHERE {where})",
+            params,
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, topic, area, statement) "
+            "SELECT q.id, q.topic, COALESCE(ka.name, ''), "
+            "COALESCE(q.statement_text, '') || ' ' || "
+            "COALESCE(q.start_statement, '') || ' ' || "
+            "COALESCE(q.end_statement, '') "
+            "FROM app_questions q "
+            "LEFT JOIN app_knowledge_areas ka ON ka.id = q.knowledge_area_id "
+            f"WHERE {where}",
+            params,
+        )
+
+
+def index_questions(question_ids):
+    """
+    Recalcula el índice de búsqueda de las preguntas indicadas. Los triggers
+    lo mantienen al día; solo hace falta para reconstruirlo.
+    """
+    question_ids = list(question_ids)
+    vendor = _vendor()
+
+    for offset in range(0, len(question_ids), INDEX_BATCH_SIZE):
+        batch = question_ids[offset : offset + INDEX_BATCH_SIZE]
+
+        if vendor == "postgresql":
+            Question.objects.filter(pk__in=batch).update(
+                search_vector=_search_vector()
+            )
+        elif vendor == "sqlite":
+            placeholders = ", ".join(["%s"] * len(batch))
+            _sqlite_reindex(f"q.id IN ({placeholders})", batch)
+
+
+def rebuild_search_index():
+    """
+    Reindexa todas las preguntas. En SQLite actualiza además las
+    estadísticas del planificador, sin las cuales puede recorrer el banco
+    completo en lugar de partir de las coincidencias de la tabla FTS5.
+
+    Returns:
+        int: preguntas reindexadas.
+    """
+    question_ids = list(Question.objects.order_by("id").values_list("id", flat=True))
+    index_questions(question_ids)
+
+    if _vendor() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    return len(question_ids)
+
+
+# -------------------------------------------------------------------
+# Consulta
+# -------------------------------------------------------------------
+def _postgres_search(questions, terms):
+    # Cada palabra funciona como prefijo para que la búsqueda responda
+    # mientras se escribe
+    raw_query = " & ".join(f"{term}:*" for term in terms)
+    search_query = SearchQuery(raw_query, config=SEARCH_CONFIG, search_type="raw")
+
+    return (
+        questions.filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by("-rank", "-created_at")
+    )
+
+
+def _sqlite_search(questions, terms):
+    match = " ".join('"{}"*'.format(term.replace('"', "")) for term in terms)
+    table = Question._meta.db_table
+
+    # Se une la tabla FTS5 para calcular bm25 en el mismo recorrido del
+    # MATCH; bm25 es menor cuanto más relevante es la fila, por lo que se
+    # invierte el signo para ordenar igual que en PostgreSQL
+    return questions.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = {table}.id", f"{FTS_TABLE} MATCH %s"],
+        params=[match],
+        select={"rank": f"-bm25({FTS_TABLE}, 4.0, 4.0, 1.0)"},
+    ).order_by("-rank", "-created_at")
+
+
+def _fallback_search(questions, query):
+    return questions.filter(
+        Q(knowledge_area__name__icontains=query)
+        | Q(topic__icontains=query)
+        | Q(statement_text__icontains=query)
+        | Q(start_statement__icontains=query)
+        | Q(end_statement__icontains=query)
+    ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_questions(questions, query):
+    """
+    Filtra las preguntas que coinciden con todas las palabras de la consulta
+    y las ordena por relevancia (anotación rank).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return questions
+
+    vendor = _vendor()
+
+    if vendor == "postgresql":
+        return _postgres_search(questions, terms)
+    if vendor == "sqlite":
+        return _sqlite_search(questions, terms)
+    return _fallback_search(questions, query)
+
+
+# -------------------------------------------------------------------
+# Resaltado
+# -------------------------------------------------------------------
+def _match_spans(text, terms):
+    """
+    Posiciones de las palabras del texto que empiezan por alguna de las
+    palabras buscadas, sin distinguir mayúsculas ni tildes.
+    """
+    folded = _fold(text)
+    prefixes = tuple(_fold(term) for term in terms)
+
+    return [
+        match.span()
+        for match in _WORD_RE.finditer(folded)
+        if match.group().startswith(prefixes)
+    ]
+
+
+def highlight(text, query, length=None):
+    """
+    Escapa el texto y marca con <mark> las coincidencias de la consulta. Con
+    length, recorta el texto a un fragmento alrededor de la primera
+    coincidencia.
+    """
+    text = text or ""
+    terms = search_terms(query)
+    spans = _match_spans(text, terms) if terms else []
+
+    start, end = 0, len(text)
+    if length and len(text) > length:
+        first = spans[0][0] if spans else 0
+        start = max(0, min(first - length // 4, len(text) - length))
+        end = start + length
+
+        # Ajustar los extremos del fragmento a palabras completas
+        if start > 0:
+            start = text.rfind(" ", 0, start) + 1
+        if end < len(text) and text.rfind(" ", start, end) > start:
+            end = text.rfind(" ", start, end)
+
+    parts = ["…"] if start > 0 else []
+    position = start
+
+    for span_start, span_end in spans:
+        if span_end <= start or span_start >= end:
+            continue
+        span_start, span_end = max(span_start, start), min(span_end, end)
+        parts.append(escape(text[position:span_start]))
+        parts.append(f"<mark>{escape(text[span_start:span_end])}</mark>")
+        position = span_end
+
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append("…")
+
+    return mark_safe("".join(parts))
+
+
+def attach_highlights(questions, query):
+    """
+    Asigna a cada pregunta de la página topic_highlight, area_highlight y
+    statement_snippet con las coincidencias de la consulta marcadas.
+    """
+    questions = list(questions)
+
+    for question in questions:
+        area = question.knowledge_area.name if question.knowledge_area else ""
+        question.topic_highlight = highlight(question.topic, query)
+        question.area_highlight = highlight(area, query)
+        question.statement_snippet = highlight(
+            question.statement_text, query, SNIPPET_LENGTH
+        )
+
+    return questions
@@ -0,0 +1,562 @@
+# -------------------------------------------------------------------
+# Recalificación masiva de intentos históricos.
+# Recalcula el índice S, su historial y la decisión SPRT de cada intento
+# con sumas acumuladas de NumPy sobre todas las respuestas del examen.
+# -------------------------------------------------------------------
+from datetime import datetime, timezone
+import numpy as np
+from django.db import transaction
+from app.models import ExamAttempt, AttemptAnswer, AnswerOption, LevelProgress
+from app.services.exam_runtime import get_exam_runtime
+from app.services.exam_statistics import invalidate_exam_statistics
+from app.services.sprt_service import classify_consistency, level_analysis_key
+
+
+BATCH_SIZE = 2000
+
+# Intentos bloqueados por transacción al reproducirlos mientras pueden
+# recibir respuestas (corrección de una clave, intentos en progreso)
+REGRADE_BATCH_SIZE = 500
+
+# Diferencia mínima para considerar que un valor del índice S cambió
+TOLERANCE = 1e-9
+
+ATTEMPT_FIELDS = (
+    "id",
+    "exam_id",
+    "status",
+    "correct_answers",
+    "incorrect_answers",
+    "s_index",
+    "consistency_feedback",
+    "level_analysis",
+)
+
+ANSWER_FIELDS = (
+    "id",
+    "attempt_id",
+    "question_id",
+    "selected_option_id",
+    "difficulty_level_id",
+    "is_correct",
+    "time_violation",
+    "s_index_after",
+)
+
+
+def replay_sequences(
+    attempt_ids,
+    level_ids,
+    is_correct,
+    *,
+    lower_limit,
+    upper_limit,
+    delta_correct,
+    delta_incorrect,
+    max_questions=None,
+):
+    """
+    Reproduce el SPRT sobre respuestas ya registradas, con las mismas
+    condiciones de cierre de SPRTService: la primera frontera alcanzada
+    decide el resultado y, sin cruce, al llegar a max_questions se decide por
+    el signo del índice S. Una secuencia que terminó antes sin cruzar una
+    frontera (sin más preguntas o abandonada) queda sin decidir.
+
+    Args:
+        attempt_ids, level_ids, is_correct: arreglos con una posición por
+            respuesta, ordenados por intento y número de pregunta.
+        max_questions: límite de preguntas del examen; None si no aplica.
+
+    Returns:
+        dict: el índice S tras cada respuesta ("s_after"), y por intento
+        (en orden de aparición) su ID, el rango de sus respuestas, el índice S
+        final, los aciertos, la tendencia del índice S, si el SPRT lo decide
+        ("decided"), si aprueba y las estadísticas por nivel (respondidas,
+        aciertos, índice S).
+    """
+    attempt_ids = np.asarray(attempt_ids, dtype=np.int64)
+    level_ids = np.asarray(level_ids, dtype=np.int64)
+    is_correct = np.asarray(is_correct, dtype=bool)
+    count = len(attempt_ids)
+
+    if count == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {
+            "s_after": np.zeros(0),
+            "attempt_ids": empty,
+            "starts": empty,
+            "counts": empty,
+            "s_final": np.zeros(0),
+            "correct": empty,
+            "decreasing": empty,
+            "increasing": empty,
+            "decided": np.zeros(0, dtype=bool),
+            "approved": np.zeros(0, dtype=bool),
+            "level_stats": {},
+        }
+
+    # Segmentos contiguos por intento
+    starts = np.flatnonzero(np.r_[True, attempt_ids[1:] != attempt_ids[:-1]])
+    counts = np.diff(np.r_[starts, count])
+    segments = len(starts)
+    segment = np.repeat(np.arange(segments), counts)
+    position = np.arange(count) - np.repeat(starts, counts)
+
+    # Matriz intentos x preguntas: la suma acumulada por filas es secuencial,
+    # igual que la suma respuesta a respuesta de SPRTService
+    deltas = np.where(is_correct, delta_correct, delta_incorrect)
+    matrix = np.zeros((segments, counts.max()))
+    matrix[segment, position] = deltas
+    cumulative = np.cumsum(matrix, axis=1)
+    s_after = cumulative[segment, position]
+
+    # Respuestas que el SPRT evalúa: las del intento, hasta max_questions
+    horizon = counts if max_questions is None else np.minimum(counts, max_questions)
+    valid = np.arange(counts.max())[None, :] < horizon[:, None]
+    crossed = valid & ((cumulative <= lower_limit) | (cumulative >= upper_limit))
+    has_crossing = crossed.any(axis=1)
+    first_crossing = crossed.argmax(axis=1)
+
+    rows = np.arange(segments)
+    s_final = cumulative[rows, counts - 1]
+    s_at_crossing = cumulative[rows, first_crossing]
+    s_at_horizon = cumulative[rows, horizon - 1]
+
+    # La primera frontera alcanzada decide el resultado; sin cruce, solo se
+    # decide por el signo de S al alcanzar el límite de preguntas
+    reached_limit = (
+        np.zeros(segments, dtype=bool)
+        if max_questions is None
+        else counts >= max_questions
+    )
+    decided = has_crossing | reached_limit
+    approved = np.where(has_crossing, s_at_crossing <= lower_limit, s_at_horizon < 0)
+
+    # Tendencia del índice S respecto a la respuesta anterior
+    follows = position > 0
+    decreasing = np.bincount(
+        segment, weights=follows & (deltas < 0), minlength=segments
+    )
+    increasing = np.bincount(
+        segment, weights=follows & (deltas > 0), minlength=segments
+    )
+
+    # Estadísticas por nivel: suma secuencial de los incrementos de cada nivel
+    unique_levels, level_index = np.unique(level_ids, return_inverse=True)
+    shape = (segments, len(unique_levels))
+    size = shape[0] * shape[1]
+    keys = segment * len(unique_levels) + level_index
+    level_s = np.bincount(keys, weights=deltas, minlength=size).reshape(shape)
+    level_answered = np.bincount(keys, minlength=size).reshape(shape)
+    level_correct = np.bincount(keys, weights=is_correct, minlength=size).reshape(
+        shape
+    )
+
+    level_stats = {}
+    for row, column in zip(*np.nonzero(level_answered)):
+        key = (int(attempt_ids[starts[row]]), int(unique_levels[column]))
+        level_stats[key] = (
+            int(level_answered[row, column]),
+            int(level_correct[row, column]),
+            float(level_s[row, column]),
+        )
+
+    return {
+        "s_after": s_after,
+        "attempt_ids": attempt_ids[starts],
+        "starts": starts,
+        "counts": counts,
+        "s_final": s_final,
+        "correct": np.bincount(segment, weights=is_correct, minlength=segments),
+        "decreasing": decreasing,
+        "increasing": increasing,
+        "decided": decided,
+        "approved": approved,
+        "level_stats": level_stats,
+    }
+
+
+def _changed(old, new):
+    return old is None or abs(old - new) > TOLERANCE
+
+
+def _empty_report():
+    return {
+        "attempts": 0,
+        "answers": 0,
+        "changed_answers": 0,
+        "changed_levels": 0,
+        "changed_attempts": [],
+        "status_changes": 0,
+    }
+
+
+def _replay_attempts(runtime, attempts, rows, is_correct, report, now):
+    """
+    Reproduce los intentos indicados y retorna las instancias a guardar
+    con bulk_update: (respuestas, progreso por nivel, intentos).
+
+    Args:
+        attempts: filas de ATTEMPT_FIELDS indexadas por ID.
+        rows: filas de ANSWER_FIELDS ordenadas por intento y número de pregunta.
+        is_correct: resultado vigente de cada respuesta.
+    """
+    count = len(rows)
+    result = replay_sequences(
+        np.fromiter((row[1] for row in rows), np.int64, count),
+        np.fromiter(
+            (row[4] if row[4] is not None else -1 for row in rows), np.int64, count
+        ),
+        is_correct,
+        lower_limit=runtime.lower_limit,
+        upper_limit=runtime.upper_limit,
+        delta_correct=runtime.delta_correct,
+        delta_incorrect=runtime.delta_incorrect,
+        max_questions=runtime.exam.max_questions,
+    )
+
+    report["attempts"] += len(attempts)
+    report["answers"] += count
+
+    # Respuestas cuyo resultado o índice S cambió
+    old_correct = np.fromiter((row[5] for row in rows), bool, count)
+    old_s_after = np.fromiter((row[7] for row in rows), np.float64, count)
+    changed = (old_correct != is_correct) | (
+        np.abs(old_s_after - result["s_after"]) > TOLERANCE
+    )
+    changed_answers = [
+        AttemptAnswer(
+            id=rows[index][0],
+            is_correct=bool(is_correct[index]),
+            s_index_after=float(result["s_after"][index]),
+        )
+        for index in np.flatnonzero(changed)
+    ]
+    report["changed_answers"] += len(changed_answers)
+
+    # Progreso por nivel
+    changed_levels = []
+    level_rows = LevelProgress.objects.filter(attempt_id__in=attempts).values_list(
+        "id", "attempt_id", "difficulty_level_id", "correct_count", "s_index"
+    )
+
+    for progress_id, attempt_id, level_id, correct_count, s_index in level_rows:
+        stats = result["level_stats"].get((attempt_id, level_id))
+        if stats is None:
+            continue
+
+        answered, correct, new_s = stats
+        if correct != correct_count or _changed(s_index, new_s):
+            changed_levels.append(
+                LevelProgress(
+                    id=progress_id,
+                    correct_count=correct,
+                    incorrect_count=answered - correct,
+                    s_index=new_s,
+                    updated_at=now,
+                )
+            )
+    report["changed_levels"] += len(changed_levels)
+
+    # Intentos
+    changed_attempts = []
+
+    for index, attempt_id in enumerate(result["attempt_ids"]):
+        attempt_id = int(attempt_id)
+        (
+            _,
+            _,
+            old_status,
+            old_correct_answers,
+            _,
+            old_s,
+            old_feedback,
+            level_analysis,
+        ) = attempts[attempt_id]
+
+        total = int(result["counts"][index])
+        new_s = float(result["s_final"][index])
+        correct_answers = int(result["correct"][index])
+
+        # Solo cambian de resultado los intentos finalizados que la
+        # reproducción decide; los demás conservan el estado registrado
+        new_status = old_status
+        if result["decided"][index] and old_status in (
+            ExamAttempt.Status.APPROVED,
+            ExamAttempt.Status.FAILED,
+        ):
+            new_status = (
+                ExamAttempt.Status.APPROVED
+                if result["approved"][index]
+                else ExamAttempt.Status.FAILED
+            )
+
+        feedback = old_feedback
+        if old_feedback:
+            feedback = classify_consistency(
+                total,
+                int(result["decreasing"][index]),
+                int(result["increasing"][index]),
+            )
+
+        if (
+            new_status == old_status
+            and feedback == old_feedback
+            and correct_answers == old_correct_answers
+            and not _changed(old_s, new_s)
+        ):
+            continue
+
+        # Mantener sincronizado el análisis por nivel
+        level_analysis = dict(level_analysis or {})
+        for level_id, level in runtime.levels_by_id.items():
+            stats = result["level_stats"].get((attempt_id, level_id))
+            key = level_analysis_key(level_analysis, level)
+            if stats is None or key is None:
+                continue
+
+            answered, correct, level_s = stats
+            level_analysis[level.name] = {
+                **level_analysis.pop(key),
+                "level_id": level_id,
+                "correct": correct,
+                "incorrect": answered - correct,
+                "accuracy": (correct / answered) * 100,
+                "s_index": level_s,
+            }
+
+        changed_attempts.append(
+            ExamAttempt(
+                id=attempt_id,
+                exam_id=runtime.exam.id,
+                status=new_status,
+                correct_answers=correct_answers,
+                incorrect_answers=total - correct_answers,
+                s_index=new_s,
+                s_decreasing_steps=int(result["decreasing"][index]),
+                s_increasing_steps=int(result["increasing"][index]),
+                consistency_feedback=feedback,
+                level_analysis=level_analysis,
+                updated_at=now,
+            )
+        )
+        report["changed_attempts"].append(
+            {
+                "attempt_id": attempt_id,
+                "old_status": old_status,
+                "new_status": str(new_status),
+                "old_s_index": old_s,
+                "new_s_index": new_s,
+            }
+        )
+        if new_status != old_status:
+            report["status_changes"] += 1
+
+    return changed_answers, changed_levels, changed_attempts
+
+
+def _save_replay(changed_answers, changed_levels, changed_attempts, batch_size):
+    AttemptAnswer.objects.bulk_update(
+        changed_answers, ["is_correct", "s_index_after"], batch_size=batch_size
+    )
+    LevelProgress.objects.bulk_update(
+        changed_levels,
+        ["correct_count", "incorrect_count", "s_index", "updated_at"],
+        batch_size=batch_size,
+    )
+    ExamAttempt.objects.bulk_update(
+        changed_attempts,
+        [
+            "status",
+            "correct_answers",
+            "incorrect_answers",
+            "s_index",
+            "s_decreasing_steps",
+            "s_increasing_steps",
+            "consistency_feedback",
+            "level_analysis",
+            "updated_at",
+        ],
+        batch_size=batch_size,
+    )
+
+    for exam_id in {attempt.exam_id for attempt in changed_attempts}:
+        invalidate_exam_statistics(exam_id)
+
+
+def _replay_locked(attempt_ids, correct_for, report, dry_run, batch_size):
+    """
+    Reproduce los intentos indicados en lotes de batch_size, cada uno en una
+    transacción que bloquea sus filas para no cruzarse con respuestas en curso.
+
+    Args:
+        correct_for: función (runtime, filas del examen) que retorna el
+        resultado vigente de cada respuesta.
+    """
+    for start in range(0, len(attempt_ids), batch_size):
+        batch = attempt_ids[start : start + batch_size]
+
+        with transaction.atomic():
+            attempts = {
+                row[0]: row
+                for row in ExamAttempt.objects.select_for_update()
+                .filter(id__in=batch)
+                .values_list(*ATTEMPT_FIELDS)
+            }
+            rows = list(
+                AttemptAnswer.objects.filter(attempt_id__in=batch)
+                .order_by("attempt_id", "question_number")
+                .values_list(*ANSWER_FIELDS)
+            )
+
+            changes = ([], [], [])
+
+            for exam_id in {row[1] for row in attempts.values()}:
+                runtime = get_exam_runtime(exam_id)
+
+                exam_attempts = {
+                    attempt_id: row
+                    for attempt_id, row in attempts.items()
+                    if row[1] == exam_id
+                }
+                exam_rows = [row for row in rows if row[1] in exam_attempts]
+
+                exam_changes = _replay_attempts(
+                    runtime,
+                    exam_attempts,
+                    exam_rows,
+                    correct_for(runtime, exam_rows),
+                    report,
+                    datetime.now(timezone.utc),
+                )
+                for collected, found in zip(changes, exam_changes):
+                    collected.extend(found)
+
+            if not dry_run:
+                _save_replay(*changes, batch_size)
+
+
+def _stored_correct(runtime, rows):
+    return np.fromiter((row[5] for row in rows), bool, len(rows))
+
+
+def rescore_attempts(attempts_queryset, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Recalifica los intentos del queryset con la configuración SPRT actual de
+    su examen. Los intentos en progreso se reproducen bloqueados, de modo que
+    las preguntas que les quedan continúan desde un índice S calculado con la
+    configuración nueva; conservan su estado.
+
+    Returns:
+        dict: totales procesados y la lista de intentos modificados con sus
+        valores anteriores y nuevos.
+    """
+    report = _empty_report()
+
+    in_progress_ids = list(
+        attempts_queryset.filter(status=ExamAttempt.Status.IN_PROGRESS)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    attempts_queryset = attempts_queryset.exclude(
+        status=ExamAttempt.Status.IN_PROGRESS
+    )
+
+    exam_ids = list(
+        attempts_queryset.order_by().values_list("exam_id", flat=True).distinct()
+    )
+
+    for exam_id in exam_ids:
+        runtime = get_exam_runtime(exam_id)
+        attempts = {
+            row[0]: row
+            for row in attempts_queryset.filter(exam_id=exam_id).values_list(
+                *ATTEMPT_FIELDS
+            )
+        }
+        rows = list(
+            AttemptAnswer.objects.filter(attempt_id__in=attempts)
+            .order_by("attempt_id", "question_number")
+            .values_list(*ANSWER_FIELDS)
+        )
+
+        changes = _replay_attempts(
+            runtime,
+            attempts,
+            rows,
+            _stored_correct(runtime, rows),
+            report,
+            datetime.now(timezone.utc),
+        )
+
+        if not dry_run:
+            with transaction.atomic():
+                _save_replay(*changes, batch_size)
+
+    _replay_locked(
+        in_progress_ids, _stored_correct, report, dry_run, REGRADE_BATCH_SIZE
+    )
+
+    return report
+
+
+def rescore_exam(exam_id, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Recalifica todos los intentos de un examen, incluidos los que siguen en
+    progreso.
+    """
+    return rescore_attempts(
+        ExamAttempt.objects.filter(exam_id=exam_id), dry_run, batch_size
+    )
+
+
+def regrade_question(question_id, dry_run=False, batch_size=REGRADE_BATCH_SIZE):
+    """
+    Corrige los intentos afectados por un cambio en la clave de respuestas de
+    una pregunta: resultado de sus respuestas, contadores, progreso por nivel,
+    índice S y decisión SPRT. Solo se reproducen los intentos que respondieron
+    la pregunta, en lotes de batch_size intentos por transacción.
+
+    Returns:
+        dict: totales procesados y los intentos modificados, incluidos los que
+        cambiaron de resultado.
+    """
+    question_id = int(question_id)
+    report = _empty_report()
+
+    correct_option_ids = set(
+        AnswerOption.objects.filter(
+            question_id=question_id, is_correct=True
+        ).values_list("id", flat=True)
+    )
+
+    attempt_ids = sorted(
+        set(
+            AttemptAnswer.objects.filter(question_id=question_id).values_list(
+                "attempt_id", flat=True
+            )
+        )
+    )
+
+    def correct_for(runtime, rows):
+        # Resultado corregido de las respuestas a la pregunta; una respuesta
+        # fuera de tiempo sigue siendo incorrecta si el examen aplica los
+        # límites de tiempo
+        enforce_time_limits = runtime.exam.enforce_time_limits
+        return np.fromiter(
+            (
+                (
+                    row[3] in correct_option_ids
+                    and not (enforce_time_limits and row[6])
+                )
+                if row[2] == question_id
+                else row[5]
+                for row in rows
+            ),
+            bool,
+            len(rows),
+        )
+
+    _replay_locked(attempt_ids, correct_for, report, dry_run, batch_size)
+
+    return report
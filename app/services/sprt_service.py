@@ -1,17 +1,51 @@
-import math
-import random
 from datetime import datetime, timezone
-from django.db import transaction
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import F
 from app.models import (
     Exam,
     ExamAttempt,
     AttemptAnswer,
     LevelProgress,
     Question,
-    DifficultyLevel,
-    ExamSPRTConfig,
 )
+from app.services.exam_runtime import get_exam_runtime
+from app.services.exam_statistics import invalidate_exam_statistics
+from app.services.question_pool import get_question_pool
+
+
+def level_analysis_key(level_analysis, level):
+    """
+    Retorna la clave con la que el análisis por nivel guarda el nivel
+    indicado, o None si no tiene entrada. Las entradas se identifican por el
+    id del nivel: la clave es su nombre, que solo se muestra y puede cambiar.
+    """
+    for key, summary in level_analysis.items():
+        if summary.get("level_id") == level.id:
+            return key
+
+    # Entradas anteriores, guardadas sin el id del nivel
+    summary = level_analysis.get(level.name)
+    if summary is not None and summary.get("level_id") is None:
+        return level.name
+    return None
+
+
+def classify_consistency(total, decreasing, increasing):
+    """
+    Clasifica la consistencia del desempeño a partir de cuántas respuestas
+    hicieron bajar (aciertos) o subir (errores) el índice S respecto a la anterior.
+    """
+    if total < 3:
+        return ExamAttempt.FeedbackConsistency.INSUFFICIENT
+
+    threshold = total // 2
+
+    if decreasing >= threshold:
+        return ExamAttempt.FeedbackConsistency.POSITIVE
+    elif increasing >= threshold:
+        return ExamAttempt.FeedbackConsistency.NEGATIVE
+    else:
+        return ExamAttempt.FeedbackConsistency.INCONSISTENT
 
 
 class SPRTService:
@@ -21,12 +55,22 @@ class SPRTService:
 
     def __init__(self, exam_attempt):
         self.attempt = exam_attempt
-        self.exam = exam_attempt.exam
-        self.config = self.exam.sprt_config
+        self.runtime = get_exam_runtime(exam_attempt.exam_id)
+        self.exam = self.runtime.exam
+        self.config = self.runtime.config
+
+        # Reutilizar el nivel del contexto para evitar recargarlo. El examen
+        # del intento no se reemplaza: sus datos de disponibilidad se leen
+        # siempre de la base de datos
+        current_level = self.runtime.get_level(
+            exam_attempt.current_difficulty_level_id
+        )
+        if current_level:
+            exam_attempt.current_difficulty_level = current_level
 
-        # Calcular límites SPRT
-        self.lower_limit = math.log(self.config.beta / (1 - self.config.alpha))
-        self.upper_limit = math.log((1 - self.config.beta) / self.config.alpha)
+        # Límites SPRT precalculados
+        self.lower_limit = self.runtime.lower_limit
+        self.upper_limit = self.runtime.upper_limit
 
     def get_next_question(self):
         """
@@ -34,6 +78,9 @@ class SPRTService:
         1. Nivel de dificultad actual
         2. Preguntas ya respondidas
         3. Bancos de preguntas del examen
+
+        La pregunta seleccionada queda registrada en el intento, de modo que
+        una recarga de la página la obtiene de nuevo por clave primaria.
         """
         # Verificar si el examen ya terminó
         if self.attempt.status != ExamAttempt.Status.IN_PROGRESS:
@@ -44,69 +91,148 @@ class SPRTService:
             self._finalize_attempt("max_questions_reached")
             return None
 
+        # Pool de preguntas del examen; las preguntas se verifican contra sus
+        # bancos por si cambiaron de banco desde que se construyó
+        pool = get_question_pool(self.runtime)
+
+        # Pregunta ya entregada y aún sin responder
+        if self.attempt.current_question_id:
+            question = Question.objects.filter(
+                pk=self.attempt.current_question_id,
+                bank_id__in=pool.bank_ids,
+                is_active=True,
+                deleted_at__isnull=True,
+            ).first()
+
+            if question:
+                if not self.attempt.current_question_issued_at:
+                    # Pregunta sin hora de entrega registrada
+                    self._issue_question(question)
+                return question
+
         # Obtener nivel actual
         current_level = self.attempt.current_difficulty_level
         if not current_level:
             # Iniciar con el nivel más bajo
-            current_level = (
-                DifficultyLevel.objects.filter(deleted_at__isnull=True)
-                .order_by("id")
-                .first()
-            )
+            current_level = self.runtime.first_level()
             self.attempt.current_difficulty_level = current_level
             self.attempt.save()
 
         # Obtener preguntas ya respondidas
-        answered_question_ids = self.attempt.answers.values_list(
-            "question_id", flat=True
+        answered_question_ids = set(
+            self.attempt.answers.values_list("question_id", flat=True)
         )
 
-        # Buscar pregunta del nivel actual
-        available_questions = Question.objects.filter(
-            bank__in=self.exam.question_banks.all(),
-            difficulty_level=current_level,
-            is_active=True,
-            deleted_at__isnull=True,
-        ).exclude(id__in=answered_question_ids)
-
-        if not available_questions.exists():
-            # No hay más preguntas en este nivel
-            return self._handle_no_questions_available(current_level)
-
-        # Seleccionar pregunta aleatoria
-        question = random.choice(list(available_questions))
+        # Seleccionar pregunta aleatoria del nivel actual desde el pool del examen
+        while True:
+            question_id = pool.draw(current_level.id, answered_question_ids)
+
+            if question_id is None:
+                # No hay más preguntas en este nivel
+                current_level = self._resolve_available_level(
+                    current_level, pool.remaining_by_level(answered_question_ids)
+                )
+                if current_level is None:
+                    self._finalize_attempt("no_more_questions")
+                    return None
+                continue
+
+            question = Question.objects.filter(
+                pk=question_id,
+                bank_id__in=pool.bank_ids,
+                is_active=True,
+                deleted_at__isnull=True,
+            ).first()
+
+            if question:
+                return self._issue_question(question)
+
+            # La pregunta dejó de estar disponible desde que se construyó el pool
+            pool.discard(question_id)
+
+    def _issue_question(self, question):
+        """
+        Registra en el intento la pregunta entregada y el momento de su entrega.
+        """
+        self.attempt.current_question = question
+        self.attempt.current_question_issued_at = datetime.now(timezone.utc)
+        self.attempt.save(
+            update_fields=[
+                "current_question",
+                "current_question_issued_at",
+                "last_activity_at",
+                "updated_at",
+            ]
+        )
         return question
 
-    def _handle_no_questions_available(self, current_level):
+    def _resolve_available_level(self, current_level, remaining_by_level):
         """
-        Maneja el caso cuando no hay preguntas disponibles en el nivel actual.
+        Resuelve en memoria el nivel desde el que continuar cuando el actual
+        no tiene preguntas: se avanza mientras el nivel agotado cumpla el
+        criterio de avance. Retorna None si no hay nivel disponible.
         """
-        # Verificar si puede avanzar al siguiente nivel
-        level_progress = LevelProgress.objects.filter(
-            attempt=self.attempt, difficulty_level=current_level
-        ).first()
-
-        if level_progress and self._should_advance_level(level_progress):
-            next_level = self._get_next_difficulty_level(current_level)
-            if next_level:
-                self.attempt.current_difficulty_level = next_level
-                self.attempt.save()
-                return self.get_next_question()
+        level = current_level
+        progress = None
+
+        while not remaining_by_level.get(level.id):
+            if progress is None:
+                # Avance por nivel registrado, identificado por el id del nivel
+                progress = {
+                    level_id: (answered, correct)
+                    for level_id, answered, correct in (
+                        self.attempt.level_progress.values_list(
+                            "difficulty_level_id",
+                            "questions_answered",
+                            "correct_count",
+                        )
+                    )
+                }
+
+            answered, correct = progress.get(level.id, (0, 0))
+            if not answered or not self._should_advance_level(
+                answered, (correct / answered) * 100
+            ):
+                return None
+
+            level = self._get_next_difficulty_level(level)
+            if not level:
+                return None
+
+        if level.id != current_level.id:
+            self.attempt.current_difficulty_level = level
+            self.attempt.save(
+                update_fields=[
+                    "current_difficulty_level",
+                    "last_activity_at",
+                    "updated_at",
+                ]
+            )
 
-        # No hay más preguntas disponibles
-        self._finalize_attempt("no_more_questions")
-        return None
+        return level
 
     @transaction.atomic
     def process_answer(self, question, selected_option, question_shown_at):
         """
         Procesa una respuesta y actualiza el estado SPRT.
 
+        Bloquea la fila del intento una sola vez, de modo que envíos
+        simultáneos (doble clic) se procesan en serie sin perder contadores.
+
         Returns:
             dict: Resultado del procesamiento con estado actualizado
         """
         now = datetime.now(timezone.utc)
 
+        # Bloquear el intento y leer su estado más reciente
+        self._lock_attempt()
+
+        # Solo se acepta la respuesta a la pregunta entregada y aún pendiente
+        if self.attempt.current_question_id != question.id:
+            raise ValueError(
+                "La pregunta enviada no es la pregunta actual del intento."
+            )
+
         # Calcular tiempo tomado
         time_taken = (now - question_shown_at).total_seconds()
         allowed_time = question.time
@@ -128,17 +254,19 @@ class SPRTService:
             self.attempt.incorrect_answers += 1
 
         # Calcular nuevo índice S (SPRT)
-        p0 = self.config.p0 / 100
-        p1 = self.config.p1 / 100
-
         if is_correct:
-            delta_s = math.log(p1 / p0)
+            delta_s = self.runtime.delta_correct
         else:
-            delta_s = math.log((1 - p1) / (1 - p0))
+            delta_s = self.runtime.delta_incorrect
 
         self.attempt.s_index += delta_s
-        self.attempt.s_history.append(self.attempt.s_index)
-        self.attempt.save()
+
+        # Tendencia del índice S respecto a la respuesta anterior
+        if self.attempt.total_questions > 1:
+            if delta_s < 0:
+                self.attempt.s_decreasing_steps += 1
+            elif delta_s > 0:
+                self.attempt.s_increasing_steps += 1
 
         # Registrar la respuesta
         answer = AttemptAnswer.objects.create(
@@ -146,7 +274,7 @@ class SPRTService:
             question=question,
             selected_option=selected_option,
             question_number=self.attempt.total_questions,
-            difficulty_level=question.difficulty_level,
+            difficulty_level_id=question.difficulty_level_id,
             is_correct=is_correct,
             question_shown_at=question_shown_at,
             time_taken_seconds=int(time_taken),
@@ -156,10 +284,27 @@ class SPRTService:
         )
 
         # Actualizar progreso por nivel
-        self._update_level_progress(question.difficulty_level, is_correct, delta_s)
+        progress = self._update_level_progress(
+            question.difficulty_level_id, is_correct, delta_s, now
+        )
 
         # Evaluar decisión SPRT
-        decision = self._evaluate_sprt_decision()
+        decision, changed_fields = self._evaluate_sprt_decision(progress, now)
+
+        # Mantener al día el análisis por nivel
+        self._update_level_analysis(progress)
+
+        # La pregunta entregada ya fue respondida
+        self.attempt.current_question = None
+        self.attempt.current_question_issued_at = None
+        changed_fields = [
+            *changed_fields,
+            "current_question",
+            "current_question_issued_at",
+        ]
+
+        # Guardar el intento en una sola sentencia
+        self._save_answer_counters(is_correct, changed_fields)
 
         return {
             "answer": answer,
@@ -170,118 +315,212 @@ class SPRTService:
             "feedback": selected_option.feedback,
         }
 
-    def _update_level_progress(self, difficulty_level, is_correct, delta_s):
+    def _lock_attempt(self):
         """
-        Actualiza el progreso en el nivel actual.
+        Bloquea la fila del intento (SELECT ... FOR UPDATE) y refresca en
+        memoria los campos que modifica el procesamiento de una respuesta.
         """
-        progress, created = LevelProgress.objects.get_or_create(
-            attempt=self.attempt,
-            difficulty_level=difficulty_level,
-            defaults={
-                "questions_answered": 0,
-                "correct_count": 0,
-                "incorrect_count": 0,
-                "s_index": 0.0,
-            },
+        state = (
+            ExamAttempt.objects.select_for_update()
+            .filter(pk=self.attempt.pk)
+            .values(
+                "status",
+                "total_questions",
+                "correct_answers",
+                "incorrect_answers",
+                "s_index",
+                "s_decreasing_steps",
+                "s_increasing_steps",
+                "level_analysis",
+                "current_difficulty_level_id",
+                "current_question_id",
+            )
+            .get()
         )
 
-        progress.questions_answered += 1
-        if is_correct:
-            progress.correct_count += 1
-        else:
-            progress.incorrect_count += 1
+        for field, value in state.items():
+            setattr(self.attempt, field, value)
+
+        current_level = self.runtime.get_level(state["current_difficulty_level_id"])
+        if current_level:
+            self.attempt.current_difficulty_level = current_level
+
+        if self.attempt.status != ExamAttempt.Status.IN_PROGRESS:
+            raise ValueError("Este intento ya ha finalizado.")
+
+    def _save_answer_counters(self, is_correct, changed_fields):
+        """
+        Persiste el intento tras una respuesta. Los contadores se incrementan
+        con expresiones F y solo se escriben los campos modificados.
+        """
+        counters = {
+            "total_questions": F("total_questions") + 1,
+            "correct_answers": F("correct_answers") + (1 if is_correct else 0),
+            "incorrect_answers": F("incorrect_answers") + (0 if is_correct else 1),
+        }
+        values = {field: getattr(self.attempt, field) for field in counters}
+
+        for field, expression in counters.items():
+            setattr(self.attempt, field, expression)
+
+        self.attempt.save(
+            update_fields=[
+                *counters,
+                "s_index",
+                "s_decreasing_steps",
+                "s_increasing_steps",
+                "level_analysis",
+                *changed_fields,
+                "last_activity_at",
+                "updated_at",
+            ]
+        )
 
-        progress.s_index += delta_s
-        progress.save()
+        # Conservar en memoria los valores ya calculados sobre la fila bloqueada
+        for field, value in values.items():
+            setattr(self.attempt, field, value)
 
-    def _evaluate_sprt_decision(self):
+    def _update_level_progress(self, difficulty_level_id, is_correct, delta_s, now):
+        """
+        Actualiza el progreso en el nivel actual con un único upsert
+        (INSERT ... ON CONFLICT DO UPDATE) y retorna el progreso resultante.
+        """
+        table = LevelProgress._meta.db_table
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        correct = 1 if is_correct else 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (
+                    attempt_id, difficulty_level_id, questions_answered,
+                    correct_count, incorrect_count, s_index, is_completed,
+                    passed_to_next_level, started_at, created_at, updated_at
+                )
+                VALUES (%s, %s, 1, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (attempt_id, difficulty_level_id) DO UPDATE SET
+                    questions_answered = {table}.questions_answered + 1,
+                    correct_count = {table}.correct_count + EXCLUDED.correct_count,
+                    incorrect_count = {table}.incorrect_count + EXCLUDED.incorrect_count,
+                    s_index = {table}.s_index + EXCLUDED.s_index,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING id, questions_answered, correct_count, incorrect_count,
+                    s_index, is_completed, passed_to_next_level
+                """,
+                [
+                    self.attempt.pk,
+                    difficulty_level_id,
+                    correct,
+                    1 - correct,
+                    delta_s,
+                    False,
+                    False,
+                    timestamp,
+                    timestamp,
+                    timestamp,
+                ],
+            )
+            row = cursor.fetchone()
+
+        return LevelProgress(
+            id=row[0],
+            attempt=self.attempt,
+            difficulty_level_id=difficulty_level_id,
+            questions_answered=row[1],
+            correct_count=row[2],
+            incorrect_count=row[3],
+            s_index=row[4],
+            is_completed=bool(row[5]),
+            passed_to_next_level=bool(row[6]),
+        )
+
+    def _evaluate_sprt_decision(self, progress, now):
         """
         Evalúa si el examen debe terminar según los límites SPRT.
 
         Returns:
-            str: 'continue', 'approved', 'failed'
+            tuple: ('continue' | 'approved' | 'failed', campos del intento modificados)
         """
         s = self.attempt.s_index
 
         if s <= self.lower_limit:
             # El estudiante ha demostrado competencia
-            self._finalize_attempt("approved")
-            return "approved"
+            return "approved", self._finalize_attempt("approved", commit=False)
 
         elif s >= self.upper_limit:
             # El estudiante no ha demostrado competencia
-            self._finalize_attempt("failed")
-            return "failed"
+            return "failed", self._finalize_attempt("failed", commit=False)
 
         elif self.attempt.total_questions >= self.exam.max_questions:
             # Se alcanzó el límite de preguntas
             # Decidir basándose en el índice S actual
             if s < 0:
-                self._finalize_attempt("approved")
-                return "approved"
+                return "approved", self._finalize_attempt("approved", commit=False)
             else:
-                self._finalize_attempt("failed")
-                return "failed"
+                return "failed", self._finalize_attempt("failed", commit=False)
 
         else:
+            changed_fields = []
+
             # Verificar si debe avanzar de nivel
             if self.exam.enable_difficulty_progression:
-                self._check_level_progression()
+                changed_fields = self._check_level_progression(progress, now)
 
-            return "continue"
+            return "continue", changed_fields
 
-    def _check_level_progression(self):
+    def _check_level_progression(self, progress, now):
         """
         Verifica si el estudiante debe avanzar al siguiente nivel de dificultad.
+        Retorna los campos del intento que se modificaron.
         """
         current_level = self.attempt.current_difficulty_level
-        progress = LevelProgress.objects.filter(
-            attempt=self.attempt, difficulty_level=current_level
-        ).first()
 
-        if progress and self._should_advance_level(progress):
+        if (
+            current_level
+            and progress.difficulty_level_id == current_level.id
+            and self._should_advance_level(
+                progress.questions_answered, progress.get_accuracy()
+            )
+        ):
             next_level = self._get_next_difficulty_level(current_level)
             if next_level:
+                LevelProgress.objects.filter(pk=progress.pk).update(
+                    is_completed=True,
+                    passed_to_next_level=True,
+                    completed_at=now,
+                    updated_at=now,
+                )
                 progress.is_completed = True
                 progress.passed_to_next_level = True
-                progress.completed_at = datetime.now(timezone.utc)
-                progress.save()
 
                 self.attempt.current_difficulty_level = next_level
-                self.attempt.save()
+                return ["current_difficulty_level"]
 
-    def _should_advance_level(self, level_progress):
+        return []
+
+    def _should_advance_level(self, questions_answered, accuracy):
         """
-        Determina si el estudiante debe avanzar al siguiente nivel.
+        Determina si el estudiante debe avanzar al siguiente nivel, a partir
+        de las preguntas respondidas y el porcentaje de aciertos en el nivel.
         """
         # Verificar mínimo de preguntas
-        if level_progress.questions_answered < self.config.min_questions_per_level:
+        if questions_answered < self.config.min_questions_per_level:
             return False
 
         # Verificar porcentaje de aciertos
-        accuracy = level_progress.get_accuracy() / 100
-        return accuracy >= self.config.success_threshold_to_advance
+        return accuracy / 100 >= self.config.success_threshold_to_advance
 
     def _get_next_difficulty_level(self, current_level):
         """
         Obtiene el siguiente nivel de dificultad.
         """
-        levels = list(
-            DifficultyLevel.objects.filter(deleted_at__isnull=True).order_by("id")
-        )
+        return self.runtime.next_level(current_level)
 
-        try:
-            current_index = levels.index(current_level)
-            if current_index < len(levels) - 1:
-                return levels[current_index + 1]
-        except ValueError:
-            pass
-
-        return None
-
-    def _finalize_attempt(self, reason):
+    def _finalize_attempt(self, reason, commit=True):
         """
         Finaliza el intento con el estado correspondiente.
+        Con commit=False solo asigna los campos y retorna sus nombres
+        para que el llamador los guarde junto con el resto del intento.
         """
         if reason in ["approved", "max_questions_reached"]:
             if self.attempt.s_index < 0:
@@ -293,58 +532,50 @@ class SPRTService:
         else:
             self.attempt.status = ExamAttempt.Status.FAILED
 
-        # Generar retroalimentación de consistencia
-        self.attempt.consistency_feedback = self._generate_consistency_feedback()
-
-        # Generar análisis por nivel
-        self.attempt.level_analysis = self._generate_level_analysis()
+        # Retroalimentación de consistencia a partir de la tendencia acumulada;
+        # el análisis por nivel ya se mantiene al procesar cada respuesta
+        self.attempt.consistency_feedback = classify_consistency(
+            self.attempt.total_questions,
+            self.attempt.s_decreasing_steps,
+            self.attempt.s_increasing_steps,
+        )
 
         self.attempt.completed_at = datetime.now(timezone.utc)
-        self.attempt.save()
 
-    def _generate_consistency_feedback(self):
-        """
-        Genera retroalimentación sobre la consistencia del desempeño.
-        """
-        history = self.attempt.s_history
-
-        if len(history) < 3:
-            return ExamAttempt.FeedbackConsistency.INSUFFICIENT
-
-        # Analizar tendencia
-        increasing = 0
-        decreasing = 0
-
-        for i in range(1, len(history)):
-            if history[i] < history[i - 1]:
-                decreasing += 1
-            elif history[i] > history[i - 1]:
-                increasing += 1
+        changed_fields = [
+            "status",
+            "consistency_feedback",
+            "completed_at",
+        ]
+        if commit:
+            self.attempt.save(
+                update_fields=[*changed_fields, "last_activity_at", "updated_at"]
+            )
 
-        threshold = len(history) // 2
+        invalidate_exam_statistics(self.attempt.exam_id)
 
-        if decreasing >= threshold:
-            return ExamAttempt.FeedbackConsistency.POSITIVE
-        elif increasing >= threshold:
-            return ExamAttempt.FeedbackConsistency.NEGATIVE
-        else:
-            return ExamAttempt.FeedbackConsistency.INCONSISTENT
+        return changed_fields
 
-    def _generate_level_analysis(self):
+    def _update_level_analysis(self, progress):
         """
-        Genera análisis detallado por nivel de dificultad.
+        Actualiza en memoria el resumen del nivel de la respuesta procesada.
         """
-        analysis = {}
-
-        for progress in self.attempt.level_progress.all():
-            analysis[progress.difficulty_level.name] = {
-                "questions_answered": progress.questions_answered,
-                "correct": progress.correct_count,
-                "incorrect": progress.incorrect_count,
-                "accuracy": progress.get_accuracy(),
-                "s_index": progress.s_index,
-                "completed": progress.is_completed,
-                "advanced": progress.passed_to_next_level,
-            }
-
-        return analysis
+        level = self.runtime.get_level(progress.difficulty_level_id)
+        if not level:
+            return
+
+        # La entrada se guarda con el nombre actual del nivel
+        key = level_analysis_key(self.attempt.level_analysis, level)
+        if key is not None and key != level.name:
+            del self.attempt.level_analysis[key]
+
+        self.attempt.level_analysis[level.name] = {
+            "level_id": level.id,
+            "questions_answered": progress.questions_answered,
+            "correct": progress.correct_count,
+            "incorrect": progress.incorrect_count,
+            "accuracy": progress.get_accuracy(),
+            "s_index": progress.s_index,
+            "completed": progress.is_completed,
+            "advanced": progress.passed_to_next_level,
+        }
@@ -0,0 +1,222 @@
+# -------------------------------------------------------------------
+# Simulación Monte Carlo del examen adaptativo SPRT.
+# Reproduce las reglas de SPRTService sobre arreglos de NumPy,
+# sin acceder a la base de datos.
+# -------------------------------------------------------------------
+import math
+import numpy as np
+
+
+# Estados y motivos de finalización
+APPROVED = 1
+FAILED = 0
+
+REASON_NONE = 0
+REASON_APPROVED = 1
+REASON_FAILED = 2
+REASON_MAX_QUESTIONS = 3
+REASON_NO_MORE_QUESTIONS = 4
+
+
+def sprt_constants(p0, p1, alpha, beta):
+    """
+    Calcula los límites de Wald y los incrementos del índice S.
+    p0 y p1 se expresan en porcentaje, igual que en ExamSPRTConfig.
+    """
+    lower_limit = math.log(beta / (1 - alpha))
+    upper_limit = math.log((1 - beta) / alpha)
+    delta_correct = math.log((p1 / 100) / (p0 / 100))
+    delta_incorrect = math.log((1 - p1 / 100) / (1 - p0 / 100))
+    return lower_limit, upper_limit, delta_correct, delta_incorrect
+
+
+def synthetic_examinees(count, levels, ability_mean, ability_sd, level_drop, rng=None):
+    """
+    Genera examinados sintéticos.
+
+    Returns:
+        tuple: (habilidad base por examinado, probabilidad de acierto por nivel
+        con forma (count, levels))
+    """
+    rng = rng or np.random.default_rng()
+    ability = np.clip(rng.normal(ability_mean, ability_sd, count), 0.01, 0.99)
+    drops = level_drop * np.arange(levels)
+    p_correct = np.clip(ability[:, None] - drops[None, :], 0.01, 0.99)
+    return ability, p_correct
+
+
+def simulate(
+    pool_sizes,
+    p_correct,
+    *,
+    p0,
+    p1,
+    alpha,
+    beta,
+    min_questions_per_level,
+    success_threshold_to_advance,
+    max_questions,
+    enable_difficulty_progression=True,
+    rng=None,
+):
+    """
+    Simula un intento por cada fila de p_correct.
+
+    Args:
+        pool_sizes: preguntas disponibles por nivel, ordenadas del nivel más bajo
+            al más alto.
+        p_correct: probabilidad de acierto de cada examinado en cada nivel,
+            con forma (examinados, niveles).
+
+    Returns:
+        dict: arreglos por examinado con el estado final, el motivo,
+        las preguntas respondidas, el índice S, el nivel final y los niveles
+        en los que se agotaron las preguntas.
+    """
+    rng = rng or np.random.default_rng()
+    pool_sizes = np.asarray(pool_sizes, dtype=np.int64)
+    p_correct = np.asarray(p_correct, dtype=np.float64)
+
+    count, levels = p_correct.shape
+    lower_limit, upper_limit, delta_correct, delta_incorrect = sprt_constants(
+        p0, p1, alpha, beta
+    )
+
+    level = np.zeros(count, dtype=np.int64)
+    answered = np.zeros((count, levels), dtype=np.int64)
+    correct = np.zeros((count, levels), dtype=np.int64)
+    s_index = np.zeros(count, dtype=np.float64)
+    total = np.zeros(count, dtype=np.int64)
+    active = np.ones(count, dtype=bool)
+    status = np.full(count, FAILED, dtype=np.int8)
+    reason = np.full(count, REASON_NONE, dtype=np.int8)
+    exhausted = np.zeros((count, levels), dtype=bool)
+
+    def should_advance(idx):
+        level_answered = answered[idx, level[idx]]
+        level_correct = correct[idx, level[idx]]
+        accuracy = np.divide(
+            level_correct,
+            level_answered,
+            out=np.zeros(len(idx), dtype=np.float64),
+            where=level_answered > 0,
+        )
+        return (level_answered >= min_questions_per_level) & (
+            accuracy >= success_threshold_to_advance
+        )
+
+    def finalize(idx, why):
+        # Igual que _finalize_attempt: solo "approved" y "max_questions_reached"
+        # pueden aprobar, y en ambos casos se desempata por el signo de S
+        if why in (REASON_APPROVED, REASON_MAX_QUESTIONS):
+            status[idx] = np.where(s_index[idx] < 0, APPROVED, FAILED)
+        else:
+            status[idx] = FAILED
+        reason[idx] = why
+        active[idx] = False
+
+    while active.any():
+        # 1. Selección de la siguiente pregunta (get_next_question)
+        idx = np.flatnonzero(active & (total >= max_questions))
+        finalize(idx, REASON_MAX_QUESTIONS)
+
+        # Resolver niveles sin preguntas (_handle_no_questions_available)
+        for _ in range(levels):
+            idx = np.flatnonzero(active)
+            empty = answered[idx, level[idx]] >= pool_sizes[level[idx]]
+            idx = idx[empty]
+            if len(idx) == 0:
+                break
+
+            exhausted[idx, level[idx]] = True
+            has_progress = answered[idx, level[idx]] > 0
+            can_advance = (
+                has_progress & should_advance(idx) & (level[idx] < levels - 1)
+            )
+
+            level[idx[can_advance]] += 1
+            finalize(idx[~can_advance], REASON_NO_MORE_QUESTIONS)
+
+        idx = np.flatnonzero(active)
+        if len(idx) == 0:
+            break
+
+        # 2. Respuesta (process_answer)
+        current = level[idx]
+        is_correct = rng.random(len(idx)) < p_correct[idx, current]
+
+        s_index[idx] += np.where(is_correct, delta_correct, delta_incorrect)
+        total[idx] += 1
+        answered[idx, current] += 1
+        correct[idx, current] += is_correct
+
+        # 3. Decisión SPRT (_evaluate_sprt_decision)
+        s = s_index[idx]
+        approved = s <= lower_limit
+        failed = ~approved & (s >= upper_limit)
+        limit = ~approved & ~failed & (total[idx] >= max_questions)
+        continuing = ~approved & ~failed & ~limit
+
+        finalize(idx[approved], REASON_APPROVED)
+        finalize(idx[failed], REASON_FAILED)
+        finalize(idx[limit], REASON_MAX_QUESTIONS)
+
+        # 4. Progresión de nivel (_check_level_progression)
+        if enable_difficulty_progression:
+            idx = idx[continuing]
+            advance = should_advance(idx) & (level[idx] < levels - 1)
+            level[idx[advance]] += 1
+
+    return {
+        "status": status,
+        "reason": reason,
+        "questions": total,
+        "s_index": s_index,
+        "final_level": level,
+        "answered_per_level": answered,
+        "exhausted": exhausted,
+    }
+
+
+def summarize(result, ability, competence_threshold):
+    """
+    Resume una simulación: longitud media, tasa de aprobación, errores de
+    clasificación frente a la competencia real y agotamiento por nivel.
+    """
+    approved = result["status"] == APPROVED
+    competent = ability >= competence_threshold
+    count = len(approved)
+
+    false_approvals = np.count_nonzero(approved & ~competent)
+    false_failures = np.count_nonzero(~approved & competent)
+
+    return {
+        "examinees": count,
+        "average_questions": float(result["questions"].mean()) if count else 0.0,
+        "pass_rate": float(approved.mean()) if count else 0.0,
+        "competent_rate": float(competent.mean()) if count else 0.0,
+        "false_approval_rate": (
+            false_approvals / np.count_nonzero(~competent)
+            if np.any(~competent)
+            else 0.0
+        ),
+        "false_failure_rate": (
+            false_failures / np.count_nonzero(competent) if np.any(competent) else 0.0
+        ),
+        "misclassification_rate": (
+            (false_approvals + false_failures) / count if count else 0.0
+        ),
+        "reasons": {
+            code: int(np.count_nonzero(result["reason"] == code))
+            for code in (
+                REASON_APPROVED,
+                REASON_FAILED,
+                REASON_MAX_QUESTIONS,
+                REASON_NO_MORE_QUESTIONS,
+            )
+        },
+        "exhaustion_per_level": result["exhausted"].mean(axis=0).tolist(),
+        "average_answered_per_level": result["answered_per_level"]
+        .mean(axis=0)
+        .tolist(),
+    }
@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from django.test import TestCase
+from app.models import (
+    AnswerOption,
+    CustomUser,
+    DifficultyLevel,
+    Exam,
+    ExamAttempt,
+    ExamSPRTConfig,
+    Institution,
+    InstitutionType,
+    KnowledgeArea,
+    Principal,
+    Question,
+    QuestionBank,
+    Role,
+)
+from app.services.exam_runtime import get_exam_runtime
+from app.services.sprt_service import SPRTService
+
+
+# Sentencias por respuesta: bloqueo del intento, registro de la respuesta,
+# upsert del progreso por nivel y actualización del intento, más el
+# savepoint que abre y libera la transacción de process_answer
+ANSWER_QUERIES = 6
+
+# Al avanzar de nivel se marca además el progreso del nivel completado
+LEVEL_UP_QUERIES = 1
+
+
+class ProcessAnswerQueriesTest(TestCase):
+    """
+    El procesamiento de una respuesta usa un número fijo de sentencias,
+    sin importar cuántas respuestas lleve el intento.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        institution = Institution.objects.create(
+            name="Institución",
+            tax_id="900000000",
+            principal=Principal.objects.create(name="Rector"),
+            institution_type=InstitutionType.objects.create(name="Universidad"),
+        )
+        levels = [
+            DifficultyLevel.objects.create(name=name)
+            for name in ["Básico", "Intermedio", "Avanzado"]
+        ]
+        area = KnowledgeArea.objects.create(name="Matemáticas")
+        bank = QuestionBank.objects.create(name="Banco", institution=institution)
+
+        for level in levels:
+            for number in range(10):
+                question = Question.objects.create(
+                    bank=bank,
+                    difficulty_level=level,
+                    knowledge_area=area,
+                    topic=f"Tema {number}",
+                    time=60,
+                    statement_text=f"¿{number} + {number}?",
+                )
+                AnswerOption.objects.create(
+                    question=question, option_text="Correcta", is_correct=True
+                )
+                AnswerOption.objects.create(
+                    question=question, option_text="Incorrecta", is_correct=False
+                )
+
+        cls.exam = Exam.objects.create(
+            title="Examen",
+            institution=institution,
+            max_questions=20,
+            max_attempts=3,
+            start_date=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            end_date=datetime(2100, 1, 1, tzinfo=timezone.utc),
+        )
+        cls.exam.question_banks.add(bank)
+        ExamSPRTConfig.objects.create(exam=cls.exam)
+
+        cls.student = CustomUser.objects.create_user(
+            "estudiante@example.com",
+            "clave",
+            first_name="Ana",
+            role=Role.objects.create(name="estudiante"),
+            institution=institution,
+        )
+
+    def setUp(self):
+        get_exam_runtime(self.exam.id)
+        self.attempt = ExamAttempt.objects.create(
+            exam=self.exam, student=self.student
+        )
+
+    def answer(self, correct, level_up=False):
+        """
+        Entrega la siguiente pregunta y la responde, contando solo las
+        sentencias de process_answer.
+        """
+        service = SPRTService(self.attempt)
+        question = service.get_next_question()
+        option = question.options.get(is_correct=correct)
+
+        expected = ANSWER_QUERIES + (LEVEL_UP_QUERIES if level_up else 0)
+        with self.assertNumQueries(expected):
+            return service.process_answer(
+                question, option, self.attempt.current_question_issued_at
+            )
+
+    def test_answer_uses_fixed_number_of_queries(self):
+        result = self.answer(correct=True)
+
+        self.assertEqual(result["decision"], "continue")
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.total_questions, 1)
+        self.assertEqual(self.attempt.correct_answers, 1)
+
+    def test_budget_holds_as_the_attempt_grows(self):
+        for correct in [False, True, False, True, False]:
+            self.answer(correct)
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.total_questions, 5)
+        self.assertEqual(self.attempt.correct_answers, 2)
+        self.assertEqual(self.attempt.level_progress.count(), 1)
+
+    def test_level_up_adds_one_query(self):
+        for _ in range(2):
+            self.answer(correct=True)
+        self.answer(correct=True, level_up=True)
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.current_difficulty_level.name, "Intermedio")
+
+    def test_deciding_answer_uses_the_same_queries(self):
+        # Con la configuración por defecto seis aciertos alcanzan el límite
+        # inferior; al tercero se avanza de nivel
+        for number in range(1, 6):
+            self.answer(correct=True, level_up=number == 3)
+        result = self.answer(correct=True)
+
+        self.assertEqual(result["decision"], "approved")
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, ExamAttempt.Status.APPROVED)
@@ -23,4 +23,6 @@ from .exams.urls import urlpatterns as exams_urls
 from .users.admins.urls import urlpatterns as admins_urls
 from .users.students.urls import urlpatterns as students_urls
 
-from .sprt.urls import urlpatterns as sprt_urls
\ No newline at end of file
+from .sprt.urls import urlpatterns as sprt_urls
+
+from .exports.urls import urlpatterns as exports_urls
@@ -0,0 +1,14 @@
+from django.urls import path
+from app.views import (
+    exports_table,
+    exports_enqueue,
+    exports_status,
+    exports_download,
+)
+
+urlpatterns = [
+    path("", exports_table, name="exports_table"),
+    path("enqueue/", exports_enqueue, name="exports_enqueue"),
+    path("<int:job_id>/status/", exports_status, name="exports_status"),
+    path("<int:job_id>/download/", exports_download, name="exports_download"),
+]
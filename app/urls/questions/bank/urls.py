@@ -7,7 +7,9 @@ from app.views import (
     questions_bank_delete,
     questions_bank_deactivate,
     questions_bank_activate,
-    questions_bank_questions
+    questions_bank_questions,
+    questions_bank_export_archive,
+    questions_bank_import,
 )
 
 urlpatterns = [
@@ -19,4 +21,6 @@ urlpatterns = [
     path('deactivate/<int:question_bank_id>/', questions_bank_deactivate, name='questions_bank_deactivate'),
     path('activate/<int:question_bank_id>/', questions_bank_activate, name='questions_bank_activate'),
     path('questions/<int:question_bank_id>/', questions_bank_questions, name='questions_bank_questions'),
+    path('export/<int:question_bank_id>/', questions_bank_export_archive, name='questions_bank_export_archive'),
+    path('import/', questions_bank_import, name='questions_bank_import'),
 ]
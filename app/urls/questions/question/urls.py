@@ -6,6 +6,8 @@ from app.views import (
     questions_deactivate,
     questions_activate,
     questions_delete,
+    questions_import,
+    questions_import_template,
 )
 
 
@@ -16,4 +18,6 @@ urlpatterns = [
     path("deactivate/<int:question_bank_id>/<int:question_id>/", questions_deactivate, name="questions_deactivate"),
     path("activate/<int:question_bank_id>/<int:question_id>/", questions_activate, name="questions_activate"),
     path("delete/<int:question_bank_id>/<int:question_id>/", questions_delete, name="questions_delete"),
+    path("import/<int:question_bank_id>/", questions_import, name="questions_import"),
+    path("import/template/", questions_import_template, name="questions_import_template"),
 ]
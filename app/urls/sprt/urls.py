@@ -10,6 +10,10 @@ from app.views import (
     exam_students,
     export_attempt_csv,
     export_exam_results,
+    export_exam_answers,
+    export_exam_results_xlsx,
+    export_attempt_xlsx,
+    export_exam_students_xlsx,
 )
 
 
@@ -26,4 +30,8 @@ urlpatterns = [
     path('exam/<int:exam_id>/students/', exam_students, name='exam_students'),   
     path('exams/attempts/<int:attempt_id>/export-csv/', export_attempt_csv, name='attempt_export_csv'),
     path('exams/<int:exam_id>/export-results/', export_exam_results, name='exam_export_results'),
+    path('exams/<int:exam_id>/export-answers/', export_exam_answers, name='exam_export_answers'),
+    path('exams/attempts/<int:attempt_id>/export-xlsx/', export_attempt_xlsx, name='attempt_export_xlsx'),
+    path('exams/<int:exam_id>/export-results-xlsx/', export_exam_results_xlsx, name='exam_export_results_xlsx'),
+    path('exam/<int:exam_id>/students/export-xlsx/', export_exam_students_xlsx, name='exam_students_export_xlsx'),
 ]
\ No newline at end of file
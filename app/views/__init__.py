@@ -106,6 +106,8 @@ from .questions.bank.views import (
     activate as questions_bank_activate,
     delete as questions_bank_delete,
     questions as questions_bank_questions,
+    export_archive as questions_bank_export_archive,
+    import_archive as questions_bank_import,
 )
 
 from .questions.question.views import (
@@ -115,6 +117,8 @@ from .questions.question.views import (
     deactivate as questions_deactivate,
     activate as questions_activate,
     delete as questions_delete,
+    bulk_import as questions_import,
+    import_template as questions_import_template,
 )
 
 # Exam Routes
@@ -163,4 +167,16 @@ from .sprt.views import (
     exam_students,
     export_attempt_csv,
     export_exam_results,
+    export_exam_answers,
+    export_exam_results_xlsx,
+    export_attempt_xlsx,
+    export_exam_students_xlsx,
+)
+
+# Export Routes
+from .exports.views import (
+    table as exports_table,
+    enqueue as exports_enqueue,
+    status as exports_status,
+    download as exports_download,
 )
@@ -5,8 +5,13 @@ from django.db.models import Q
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count
 from utils.date import to_aware
+from app.services.exam_catalogue import invalidate_exam_catalogue
+from app.services.bank_inventory import (
+    attach_level_counts,
+    difficulty_levels as difficulty_levels_list,
+)
+from app.services.exam_feasibility import feasibility_warnings, question_availability
 from app.models import (
     Institution,
     QuestionBank,
@@ -49,42 +54,17 @@ def create(request):
     institutions = Institution.objects.filter(deleted_at__isnull=True)
     question_banks = QuestionBank.objects.filter(
         deleted_at__isnull=True, is_active=True
-    ).annotate(
-        total_questions=Count(
-            "questions",
-            filter=Q(questions__is_active=True, questions__deleted_at__isnull=True),
-        )
     )
 
-    total_available_questions = 0
-
-    for bank in question_banks:
-        total_available_questions += bank.total_questions
-
-        basics_count = bank.questions.filter(
-            difficulty_level__name="Básico", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        intermediate_count = bank.questions.filter(
-            difficulty_level__name="Intermedio", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        advanced_count = bank.questions.filter(
-            difficulty_level__name="Avanzado", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        bank.total_questions_basics = basics_count
-        bank.total_questions_intermediate = intermediate_count
-        bank.total_questions_advanced = advanced_count
-
-    difficulty_levels = DifficultyLevel.objects.filter(
-        deleted_at__isnull=True
-    ).order_by("id")
-
     if request.user.institution:
         institutions = institutions.filter(id=request.user.institution.id)
         question_banks = question_banks.filter(institution=request.user.institution)
 
+    # Preguntas por nivel de cada banco desde el inventario en caché
+    difficulty_levels = difficulty_levels_list()
+    question_banks = attach_level_counts(question_banks, difficulty_levels)
+    total_available_questions = sum(bank.total_questions for bank in question_banks)
+
     return render(
         request,
         "exams/form.html",
@@ -106,52 +86,24 @@ def update(request, exam_id):
             institutions = Institution.objects.filter(deleted_at__isnull=True)
             question_banks = QuestionBank.objects.filter(
                 deleted_at__isnull=True, is_active=True
-            ).annotate(
-                total_questions=Count(
-                    "questions",
-                    filter=Q(
-                        questions__is_active=True, questions__deleted_at__isnull=True
-                    ),
-                )
             )
 
-            total_available_questions = 0
-
-            for bank in question_banks:
-                total_available_questions += bank.total_questions
-
-                basics_count = bank.questions.filter(
-                    difficulty_level__name="Básico",
-                    is_active=True,
-                    deleted_at__isnull=True,
-                ).count()
-
-                intermediate_count = bank.questions.filter(
-                    difficulty_level__name="Intermedio",
-                    is_active=True,
-                    deleted_at__isnull=True,
-                ).count()
-
-                advanced_count = bank.questions.filter(
-                    difficulty_level__name="Avanzado",
-                    is_active=True,
-                    deleted_at__isnull=True,
-                ).count()
-
-                bank.total_questions_basics = basics_count
-                bank.total_questions_intermediate = intermediate_count
-                bank.total_questions_advanced = advanced_count
-
-            difficulty_levels = DifficultyLevel.objects.filter(
-                deleted_at__isnull=True
-            ).order_by("id")
-
             if request.user.institution:
                 institutions = institutions.filter(id=request.user.institution.id)
                 question_banks = question_banks.filter(
                     institution=request.user.institution
                 )
 
+            # Preguntas por nivel de cada banco desde el inventario en caché
+            difficulty_levels = difficulty_levels_list()
+            question_banks = attach_level_counts(question_banks, difficulty_levels)
+            total_available_questions = sum(
+                bank.total_questions for bank in question_banks
+            )
+            selected_bank_ids = set(
+                exam.question_banks.values_list("id", flat=True)
+            )
+
             return render(
                 request,
                 "exams/form.html",
@@ -159,6 +111,7 @@ def update(request, exam_id):
                     "exam": exam,
                     "institutions": institutions,
                     "question_banks": question_banks,
+                    "selected_bank_ids": selected_bank_ids,
                     "difficulty_levels": difficulty_levels,
                     "total_available_questions": total_available_questions,
                 },
@@ -236,11 +189,19 @@ def save(request):
                         )
                         return redirect("exams_update", exam_id=exam_id)
 
-                    total_available_questions = 0
+                    # Bancos seleccionados y preguntas por nivel en una sola consulta
+                    found_bank_ids, level_counts = question_availability(
+                        selected_banks
+                    )
+
+                    if len(found_bank_ids) != len(set(map(int, selected_banks))):
+                        messages.error(
+                            request,
+                            "Alguno de los bancos de preguntas seleccionados no existe.",
+                        )
+                        return redirect("exams_update", exam_id=exam_id)
 
-                    for bank_id in selected_banks:
-                        bank = QuestionBank.objects.get(pk=bank_id)
-                        total_available_questions += bank.total_questions()
+                    total_available_questions = sum(level_counts.values())
 
                     if int(max_questions) > total_available_questions:
                         messages.error(
@@ -250,6 +211,7 @@ def save(request):
                         return redirect("exams_update", exam_id=exam_id)
 
                     # 3. Actualizar el examen
+                    previous_institution_id = exam.institution_id
                     exam.title = title
                     exam.description = description
                     exam.max_attempts = attempts
@@ -259,6 +221,9 @@ def save(request):
                     exam.institution_id = institution_id
                     exam.is_active = True
                     exam.save()
+                    invalidate_exam_catalogue(
+                        previous_institution_id, exam.institution_id
+                    )
 
                     # 4. Actualizar bancos de preguntas
                     exam.question_banks.set(
@@ -266,6 +231,12 @@ def save(request):
                     )
 
                     messages.success(request, "Examen actualizado correctamente.")
+
+                    sprt_config = ExamSPRTConfig.objects.filter(exam=exam).first()
+                    for warning in feasibility_warnings(
+                        level_counts, max_questions, sprt_config
+                    ):
+                        messages.warning(request, warning)
                 except Exception as e:
                     messages.error(request, f"Error al actualizar el examen: {str(e)}")
 
@@ -330,11 +301,19 @@ def save(request):
                         )
                         return redirect("exams_create")
 
-                    total_available_questions = 0
+                    # Bancos seleccionados y preguntas por nivel en una sola consulta
+                    found_bank_ids, level_counts = question_availability(
+                        selected_banks
+                    )
 
-                    for bank_id in selected_banks:
-                        bank = QuestionBank.objects.get(pk=bank_id)
-                        total_available_questions += bank.total_questions()
+                    if len(found_bank_ids) != len(set(map(int, selected_banks))):
+                        messages.error(
+                            request,
+                            "Alguno de los bancos de preguntas seleccionados no existe.",
+                        )
+                        return redirect("exams_create")
+
+                    total_available_questions = sum(level_counts.values())
 
                     if int(max_questions) > total_available_questions:
                         messages.error(
@@ -354,6 +333,7 @@ def save(request):
                         institution_id=institution_id,
                         is_active=True,
                     )
+                    invalidate_exam_catalogue(exam.institution_id)
 
                     # 4. Asociar bancos de preguntas
                     exam.question_banks.set(
@@ -361,6 +341,9 @@ def save(request):
                     )
 
                     messages.success(request, "Examen creado correctamente.")
+
+                    for warning in feasibility_warnings(level_counts, max_questions):
+                        messages.warning(request, warning)
                 except Exception as e:
                     messages.error(request, f"Error al crear el examen: {str(e)}")
 
@@ -378,6 +361,7 @@ def deactivate(request, exam_id):
             exam = get_object_or_404(Exam, pk=exam_id)
             exam.is_active = False
             exam.save()
+            invalidate_exam_catalogue(exam.institution_id)
             messages.success(request, "Examen desactivado correctamente.")
         except Exception as e:
             messages.error(request, f"Error al desactivar el examen: {str(e)}")
@@ -393,6 +377,7 @@ def activate(request, exam_id):
             exam = get_object_or_404(Exam, pk=exam_id)
             exam.is_active = True
             exam.save()
+            invalidate_exam_catalogue(exam.institution_id)
             messages.success(request, "Examen activado correctamente.")
         except Exception as e:
             messages.error(request, f"Error al activar el examen: {str(e)}")
@@ -408,6 +393,7 @@ def delete(request, exam_id):
             exam = get_object_or_404(Exam, pk=exam_id)
             exam.deleted_at = timezone.now()
             exam.save()
+            invalidate_exam_catalogue(exam.institution_id)
             messages.success(request, "Examen eliminado correctamente.")
         except Exception as e:
             messages.error(request, f"Error al eliminar el examen: {str(e)}")
@@ -419,7 +405,8 @@ def delete(request, exam_id):
 
 # Agregar estos imports al inicio del archivo
 from app.models import ExamSPRTConfig, DifficultyLevel, ExamAttempt
-from django.db import models
+from app.services.export_jobs import enqueue_exam_rescore
+from app.services.exam_statistics import get_exam_statistics
 
 
 # Agregar esta vista después de la función create existente
@@ -463,6 +450,27 @@ def configure_sprt(request, exam_id):
             sprt_config.save()
 
             messages.success(request, "Configuración SPRT actualizada correctamente.")
+
+            # Verificar que los niveles alcancen con el nuevo mínimo por nivel
+            _, level_counts = question_availability(
+                exam.question_banks.values_list("id", flat=True)
+            )
+            for warning in feasibility_warnings(
+                level_counts, exam.max_questions, sprt_config
+            ):
+                messages.warning(request, warning)
+
+            # Recalificar los intentos históricos con la nueva configuración,
+            # en segundo plano desde la cola de exportaciones
+            if request.POST.get("rescore_attempts"):
+                enqueue_exam_rescore(exam, request.user)
+                messages.success(
+                    request,
+                    "La recalificación quedó en cola. Podrás descargar el "
+                    "detalle de los cambios en Exportaciones.",
+                )
+                return redirect("exports_table")
+
             return redirect("exams_table")
 
         except Exception as e:
@@ -485,45 +493,18 @@ def exam_statistics(request, exam_id):
     """
     exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
 
-    attempts = ExamAttempt.objects.filter(exam=exam)
-
-    # Estadísticas generales
-    total_attempts = attempts.count()
-    approved_count = attempts.filter(status=ExamAttempt.Status.APPROVED).count()
-    failed_count = attempts.filter(status=ExamAttempt.Status.FAILED).count()
-    in_progress_count = attempts.filter(status=ExamAttempt.Status.IN_PROGRESS).count()
-    abandoned_count = attempts.filter(status=ExamAttempt.Status.ABANDONED).count()
-
-    # Calcular promedios
-    completed_attempts = attempts.exclude(status=ExamAttempt.Status.IN_PROGRESS)
-
-    if completed_attempts.exists():
-        avg_questions = completed_attempts.aggregate(avg=models.Avg("total_questions"))[
-            "avg"
-        ]
-        avg_accuracy = (
-            sum(a.get_accuracy() for a in completed_attempts)
-            / completed_attempts.count()
-        )
-    else:
-        avg_questions = 0
-        avg_accuracy = 0
+    recent_attempts = (
+        ExamAttempt.objects.filter(exam=exam)
+        .select_related("student__academic_department", "student__institution")
+        .order_by("-started_at")[:10]
+    )
 
+    # Totales y promedios en una sola consulta, reutilizados desde la caché
+    # hasta que un intento del examen inicia o finaliza
     context = {
         "exam": exam,
-        "total_attempts": total_attempts,
-        "approved_count": approved_count,
-        "failed_count": failed_count,
-        "in_progress_count": in_progress_count,
-        "abandoned_count": abandoned_count,
-        "avg_questions": round(avg_questions, 2) if avg_questions else 0,
-        "avg_accuracy": round(avg_accuracy, 2),
-        "approval_rate": (
-            round((approved_count / total_attempts * 100), 2)
-            if total_attempts > 0
-            else 0
-        ),
-        "recent_attempts": attempts.order_by("-started_at")[:10],
+        **get_exam_statistics(exam.id),
+        "recent_attempts": recent_attempts,
     }
 
     return render(request, "exams/exam_statistics.html", context)
@@ -0,0 +1,122 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from decorators.admin import is_admin
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
+from app.models import Exam, ExportJob
+from app.services.export_jobs import enqueue_export
+
+
+def _user_exams(user):
+    exams = Exam.objects.filter(deleted_at__isnull=True)
+
+    if user.institution:
+        exams = exams.filter(institution=user.institution)
+
+    return exams
+
+
+def _job_status(job):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "progress": job.progress,
+        "error": job.error,
+        "download_url": (
+            reverse("exports_download", args=[job.id])
+            if job.status == ExportJob.Status.COMPLETED
+            else None
+        ),
+    }
+
+
+# -------------------------------------------------------------------
+# Exportaciones solicitadas por el administrador
+# -------------------------------------------------------------------
+@login_required(login_url="auth_login")
+@is_admin
+def table(request):
+    jobs = ExportJob.objects.filter(requested_by=request.user).order_by("-created_at")
+
+    paginator = Paginator(jobs, 10)
+    page_number = request.GET.get("page")
+    page_obj = paginator.get_page(page_number)
+
+    context = {
+        "page_obj": page_obj,
+        "exams": _user_exams(request.user).only("id", "title").order_by("title"),
+        "has_active_jobs": any(not job.is_finished for job in page_obj),
+    }
+
+    return render(request, "exports/table.html", context)
+
+
+@login_required(login_url="auth_login")
+@is_admin
+@require_http_methods(["POST"])
+def enqueue(request):
+    """
+    Registra una exportación en la cola; el worker la genera en segundo plano.
+    """
+    kind = request.POST.get("kind")
+    exam_ids = request.POST.getlist("exam_ids")
+
+    # Los bancos de preguntas y las recalificaciones se solicitan desde su
+    # propia vista
+    if kind not in ExportJob.Kind.values or kind in (
+        ExportJob.Kind.QUESTION_BANK_ARCHIVE,
+        ExportJob.Kind.EXAM_RESCORE,
+        ExportJob.Kind.QUESTION_REGRADE,
+    ):
+        messages.error(request, "Tipo de exportación no válido.")
+        return redirect("exports_table")
+
+    exams = list(_user_exams(request.user).filter(pk__in=exam_ids))
+
+    if not exams:
+        messages.error(request, "Selecciona al menos un examen para exportar.")
+        return redirect("exports_table")
+
+    if kind != ExportJob.Kind.EXAMS_BUNDLE_ZIP and len(exams) != 1:
+        messages.error(request, "Este reporte se genera para un único examen.")
+        return redirect("exports_table")
+
+    enqueue_export(kind, exams, request.user)
+
+    messages.success(
+        request,
+        "La exportación quedó en cola. Podrás descargarla aquí cuando esté lista.",
+    )
+    return redirect("exports_table")
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def status(request, job_id):
+    """
+    Estado y avance de una exportación, consultado periódicamente por la tabla.
+    """
+    job = get_object_or_404(ExportJob, pk=job_id, requested_by=request.user)
+    return JsonResponse(_job_status(job))
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def download(request, job_id):
+    job = get_object_or_404(
+        ExportJob,
+        pk=job_id,
+        requested_by=request.user,
+        status=ExportJob.Status.COMPLETED,
+    )
+
+    try:
+        file = job.file.open("rb")
+    except (ValueError, FileNotFoundError):
+        raise Http404("El archivo de la exportación ya no está disponible.")
+
+    return FileResponse(file, as_attachment=True, filename=job.filename)
@@ -3,8 +3,14 @@ from django.contrib.auth.decorators import login_required
 from decorators.admin import is_admin
 from decorators.super_admin import is_super_admin
 from app.models import QuestionBank, Institution
+from app.services.bank_inventory import attach_level_counts
+from app.services.question_search import attach_highlights, search_questions
+from app.services.bank_archive import import_bank_archive
+from app.services.export_jobs import enqueue_bank_archive
+from django.core.exceptions import ValidationError
+from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.contrib import messages
 from django.utils import timezone
 
@@ -13,12 +19,7 @@ from django.utils import timezone
 @is_admin
 def table(request):
     query = request.GET.get("q", "").strip()
-    question_banks = QuestionBank.objects.filter(deleted_at__isnull=True).annotate(
-        total_questions=Count(
-            "questions",
-            filter=Q(questions__is_active=True, questions__deleted_at__isnull=True),
-        )
-    )
+    question_banks = QuestionBank.objects.filter(deleted_at__isnull=True)
 
     if request.user.institution:
         question_banks = question_banks.filter(institution=request.user.institution)
@@ -28,27 +29,13 @@ def table(request):
 
     question_banks = question_banks.order_by("-created_at")
 
-    for qb in question_banks:
-        basics_count = qb.questions.filter(
-            difficulty_level__name="Básico", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        intermediate_count = qb.questions.filter(
-            difficulty_level__name="Intermedio", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        advanced_count = qb.questions.filter(
-            difficulty_level__name="Avanzado", is_active=True, deleted_at__isnull=True
-        ).count()
-
-        qb.total_questions_basics = basics_count
-        qb.total_questions_intermediate = intermediate_count
-        qb.total_questions_advanced = advanced_count
-
     paginator = Paginator(question_banks, 5)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    # Preguntas por nivel de los bancos de la página desde el inventario
+    page_obj.object_list = attach_level_counts(page_obj.object_list)
+
     context = {
         "page_obj": page_obj,
         "query": query,
@@ -225,26 +212,108 @@ def delete(request, question_bank_id):
 @login_required(login_url="auth_login")
 @is_admin
 def questions(request, question_bank_id):
-    query = request.GET.get("q", "")
+    query = request.GET.get("q", "").strip()
     question_bank = get_object_or_404(
         QuestionBank, id=question_bank_id, deleted_at__isnull=True
     )
 
-    questions = question_bank.questions.filter(deleted_at__isnull=True).order_by(
-        "-created_at"
+    questions = (
+        question_bank.questions.filter(deleted_at__isnull=True)
+        .select_related("knowledge_area", "difficulty_level")
+        .defer("search_vector")
+        .order_by("-created_at")
     )
 
     if query:
-        questions = questions.filter(
-            Q(knowledge_area__name__icontains=query)
-            | Q(topic__icontains=query)
-            | Q(statement_text__icontains=query)
-            | Q(start_statement__icontains=query)
-            | Q(end_statement__icontains=query)
-        )
+        # Resultados ordenados por relevancia desde el índice de búsqueda
+        questions = search_questions(questions, query)
 
     paginator = Paginator(questions, 5)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+
+    if query:
+        page_obj.object_list = attach_highlights(page_obj.object_list, query)
+
     context = {"question_bank": question_bank, "page_obj": page_obj, "query": query}
     return render(request, "questions/question/table.html", context)
+
+
+@login_required(login_url="auth_login")
+@is_admin
+@require_http_methods(["POST"])
+def export_archive(request, question_bank_id):
+    """
+    Encola la exportación portable del banco (preguntas, opciones y
+    multimedia); el archivo se descarga desde la tabla de exportaciones.
+    """
+    question_banks = QuestionBank.objects.filter(deleted_at__isnull=True)
+
+    if request.user.institution:
+        question_banks = question_banks.filter(institution=request.user.institution)
+
+    question_bank = get_object_or_404(question_banks, id=question_bank_id)
+    enqueue_bank_archive(question_bank, request.user)
+
+    messages.success(
+        request,
+        "La exportación del banco quedó en cola. Podrás descargarla aquí cuando "
+        "esté lista.",
+    )
+    return redirect("exports_table")
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def import_archive(request):
+    """
+    Crea un banco a partir de un archivo exportado desde esta u otra
+    instalación, en la institución del administrador.
+    """
+    institutions = Institution.objects.filter(deleted_at__isnull=True)
+
+    if request.user.institution:
+        institutions = institutions.filter(id=request.user.institution.id)
+
+    if request.method == "POST":
+        archive = request.FILES.get("archive")
+        name = request.POST.get("name", "").strip()
+        institution = institutions.filter(pk=request.POST.get("institution")).first()
+
+        if not archive:
+            messages.error(request, "Selecciona el archivo del banco exportado.")
+            return redirect("questions_bank_import")
+
+        if institution is None:
+            messages.error(request, "La institución es obligatoria.")
+            return redirect("questions_bank_import")
+
+        try:
+            report = import_bank_archive(archive, institution=institution, name=name)
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("questions_bank_import")
+        except Exception as e:
+            messages.error(
+                request, f"Error al importar el banco de preguntas: {str(e)}"
+            )
+            return redirect("questions_bank_import")
+
+        messages.success(
+            request,
+            f"Banco importado con {report['questions']} preguntas y "
+            f"{report['options']} opciones.",
+        )
+        if report["areas_created"]:
+            messages.info(
+                request,
+                "Se crearon las áreas de conocimiento: "
+                f"{', '.join(report['areas_created'])}.",
+            )
+        return redirect("questions_bank_questions", question_bank_id=report["bank"].id)
+
+    return render(
+        request,
+        "questions/bank/import.html",
+        {"institutions": institutions},
+    )
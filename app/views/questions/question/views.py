@@ -14,8 +14,19 @@ from django.db.models import Q
 from django.db import transaction
 from django.contrib import messages
 from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from app.services.question_pool import invalidate_question_pools
+from app.services.bank_inventory import invalidate_bank_inventory
+from app.services.question_import import (
+    TEMPLATE_EXAMPLE,
+    TEMPLATE_HEADERS,
+    import_questions,
+)
+from app.services.export_jobs import enqueue_question_regrade
 import json
 import html
+import csv
 
 
 @login_required(login_url="auth_login")
@@ -189,6 +200,13 @@ def save(request):
 
                 question.save()
 
+                # Clave de respuestas antes de la edición
+                previous_key = set(
+                    question.options.filter(is_correct=True).values_list(
+                        "id", flat=True
+                    )
+                )
+
                 # 5. Recolectar opciones del formulario
                 options_data = {}
 
@@ -269,8 +287,26 @@ def save(request):
 
                 # 7. Eliminar opciones que no llegaron en el POST
                 question.options.exclude(pk__in=received_ids).delete()
+                transaction.on_commit(invalidate_question_pools)
+                invalidate_bank_inventory()
 
                 messages.success(request, "Pregunta actualizada exitosamente.")
+
+                # 8. Recalificar los intentos si cambió la clave de respuestas,
+                # en segundo plano desde la cola de exportaciones; el trabajo
+                # se registra junto con la edición
+                current_key = set(
+                    question.options.filter(is_correct=True).values_list(
+                        "id", flat=True
+                    )
+                )
+                if current_key != previous_key:
+                    enqueue_question_regrade(question, request.user)
+                    messages.info(
+                        request,
+                        "La recalificación de los intentos quedó en cola. Podrás "
+                        "descargar el detalle de los cambios en Exportaciones.",
+                    )
             except Exception as e:
                 messages.error(request, f"Error al actualizar la pregunta: {str(e)}")
 
@@ -412,6 +448,9 @@ def save(request):
                     )
                     option.save()
 
+                transaction.on_commit(invalidate_question_pools)
+                invalidate_bank_inventory()
+
                 messages.success(request, "Pregunta creada exitosamente.")
             except Exception as e:
                 messages.error(request, f"Error al crear la pregunta: {str(e)}")
@@ -428,6 +467,8 @@ def deactivate(request, question_bank_id, question_id):
             question = get_object_or_404(Question, pk=question_id)
             question.is_active = False
             question.save()
+            invalidate_question_pools()
+            invalidate_bank_inventory()
             messages.success(request, "Pregunta desactivada exitosamente.")
         except Exception as e:
             messages.error(request, f"Error al desactivar la pregunta: {str(e)}")
@@ -442,6 +483,8 @@ def activate(request, question_bank_id, question_id):
             question = get_object_or_404(Question, pk=question_id)
             question.is_active = True
             question.save()
+            invalidate_question_pools()
+            invalidate_bank_inventory()
             messages.success(request, "Pregunta activada exitosamente.")
         except Exception as e:
             messages.error(request, f"Error al activar la pregunta: {str(e)}")
@@ -456,8 +499,88 @@ def delete(request, question_bank_id, question_id):
             question = get_object_or_404(Question, pk=question_id)
             question.deleted_at = timezone.now()
             question.save()
+            invalidate_question_pools()
+            invalidate_bank_inventory()
 
             messages.success(request, "Pregunta eliminada exitosamente.")
         except Exception as e:
             messages.error(request, f"Error al eliminar la pregunta: {str(e)}")
     return redirect("questions_bank_questions", question_bank_id=question_bank_id)
+
+
+# Errores de filas que se muestran en el reporte de la importación
+IMPORT_REPORT_ERRORS = 200
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def bulk_import(request, question_bank_id):
+    """
+    Importa preguntas al banco desde un XLSX o CSV, con un ZIP opcional de
+    imágenes y audios, y muestra el reporte de filas con errores.
+    """
+    question_bank = get_object_or_404(
+        QuestionBank, pk=question_bank_id, deleted_at__isnull=True
+    )
+    report = None
+
+    if request.method == "POST":
+        file = request.FILES.get("file")
+        dry_run = request.POST.get("dry_run") == "on"
+
+        if not file:
+            messages.error(request, "Selecciona el archivo de preguntas.")
+            return redirect("questions_import", question_bank_id=question_bank_id)
+
+        try:
+            report = import_questions(
+                question_bank,
+                file,
+                file.name,
+                media_file=request.FILES.get("media"),
+                dry_run=dry_run,
+            )
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("questions_import", question_bank_id=question_bank_id)
+        except Exception as e:
+            messages.error(request, f"Error al importar las preguntas: {str(e)}")
+            return redirect("questions_import", question_bank_id=question_bank_id)
+
+        if dry_run:
+            messages.info(
+                request,
+                f"Validación completada: {report['valid_rows']} de "
+                f"{report['total_rows']} filas son válidas.",
+            )
+        elif report["created"]:
+            messages.success(
+                request, f"Se importaron {report['created']} preguntas."
+            )
+
+    return render(
+        request,
+        "questions/question/import.html",
+        {
+            "question_bank": question_bank,
+            "report": report,
+            "report_errors": report["errors"][:IMPORT_REPORT_ERRORS] if report else [],
+        },
+    )
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def import_template(request):
+    """
+    Plantilla CSV con las columnas de la importación y una fila de ejemplo.
+    """
+    response = HttpResponse(content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="plantilla_preguntas.csv"'
+    response.write("\ufeff")
+
+    writer = csv.writer(response)
+    writer.writerow(TEMPLATE_HEADERS)
+    writer.writerow(TEMPLATE_EXAMPLE)
+
+    return response
@@ -8,16 +8,30 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Count, Q
-from datetime import datetime
 from app.models import (
     Exam,
     ExamAttempt,
     Question,
     AnswerOption,
-    DifficultyLevel,
 )
 from app.services.sprt_service import SPRTService
+from app.services.exam_runtime import get_exam_runtime
+from app.services.exam_catalogue import get_open_exams
+from app.services.exam_statistics import invalidate_exam_statistics
+from app.services.exam_students import student_name, student_summaries
+from app.services.exam_exports import (
+    stream_csv,
+    exam_results_rows,
+    attempt_answers_rows,
+    exam_answers_rows,
+)
+from app.services.exam_reports import (
+    xlsx_response,
+    exam_workbook_sheets,
+    attempt_workbook_sheets,
+    exam_students_rows,
+)
+from app.services.question_issue import serialize_question
 from django.core.paginator import Paginator
 
 
@@ -29,56 +43,55 @@ def available_exams(request):
     """
     Muestra los exámenes disponibles para el estudiante actual.
     """
-    now = timezone.now()
+    # Exámenes abiertos de la institución, compartidos entre sus estudiantes
+    exams = get_open_exams(request.user.institution_id)
+
+    paginator = Paginator(exams, 5)
+    page_number = request.GET.get("page")
+    page_obj = paginator.get_page(page_number)
 
-    # Filtrar exámenes activos y dentro del rango de fechas
-    exams = Exam.objects.filter(
-        is_active=True,
-        deleted_at__isnull=True,
-        start_date__lte=now,
-        end_date__gte=now,
-        institution=request.user.institution,
-    ).annotate(
-        total_questions=Count(
-            "question_banks__questions",
-            filter=Q(
-                question_banks__questions__is_active=True,
-                question_banks__questions__deleted_at__isnull=True,
-            ),
+    # Intentos del estudiante en los exámenes de la página, del más reciente
+    # al más antiguo
+    attempts_by_exam = {}
+    attempts = (
+        ExamAttempt.objects.filter(
+            student=request.user,
+            exam_id__in=[exam.id for exam in page_obj.object_list],
         )
+        .order_by("exam_id", "-attempt_number")
+        .values_list("exam_id", "id", "status")
     )
+    for exam_id, attempt_id, status in attempts:
+        attempts_by_exam.setdefault(exam_id, []).append((attempt_id, status))
 
-    # Para cada examen, obtener información de intentos del estudiante
     exam_data = []
-    for exam in exams:
-        attempts = ExamAttempt.objects.filter(student=request.user, exam=exam).order_by(
-            "-attempt_number"
+    for exam in page_obj.object_list:
+        exam_attempts = attempts_by_exam.get(exam.id, [])
+        attempts_used = len(exam_attempts)
+        last_attempt_id, last_attempt_status = (
+            exam_attempts[0] if exam_attempts else (None, None)
         )
 
-        attempts_used = attempts.count()
-        attempts_remaining = exam.max_attempts - attempts_used
-        can_attempt = attempts_remaining > 0
-
-        # Verificar si hay un intento en progreso
-        in_progress_attempt = attempts.filter(
-            status=ExamAttempt.Status.IN_PROGRESS
-        ).first()
-
         exam_data.append(
             {
                 "exam": exam,
                 "attempts_used": attempts_used,
-                "attempts_remaining": attempts_remaining,
-                "can_attempt": can_attempt,
-                "in_progress_attempt": in_progress_attempt,
-                "last_attempt": attempts.first() if attempts.exists() else None,
-                "total_attempts": attempts if attempts.exists() else None,
+                "attempts_remaining": exam.max_attempts - attempts_used,
+                "can_attempt": attempts_used < exam.max_attempts,
+                "in_progress_attempt_id": next(
+                    (
+                        attempt_id
+                        for attempt_id, status in exam_attempts
+                        if status == ExamAttempt.Status.IN_PROGRESS
+                    ),
+                    None,
+                ),
+                "last_attempt_id": last_attempt_id,
+                "last_attempt_status": last_attempt_status,
             }
         )
 
-    paginator = Paginator(exam_data, 5)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = exam_data
 
     context = {
         "page_obj": page_obj,
@@ -129,9 +142,7 @@ def start_attempt(request, exam_id):
     session_token = uuid.uuid4().hex
 
     # Obtener el nivel de dificultad inicial (el primero/más bajo)
-    initial_level = (
-        DifficultyLevel.objects.filter(deleted_at__isnull=True).order_by("id").first()
-    )
+    initial_level = get_exam_runtime(exam.id).first_level()
 
     attempt = ExamAttempt.objects.create(
         student=request.user,
@@ -141,6 +152,7 @@ def start_attempt(request, exam_id):
         current_difficulty_level=initial_level,
         status=ExamAttempt.Status.IN_PROGRESS,
     )
+    invalidate_exam_statistics(exam.id)
 
     messages.success(
         request, f"Intento #{attempt.attempt_number} iniciado. ¡Buena suerte!"
@@ -165,13 +177,14 @@ def take_attempt(request, attempt_id):
             "attempt_results", attempt_id=attempt.id, student_id=request.user.id
         )
 
-    # Verificar que el examen siga disponible
+    # Verificar que el examen siga disponible, con sus datos actuales
     now = timezone.now()
     if not (attempt.exam.is_active and attempt.exam.end_date >= now):
         messages.error(request, "Este examen ya no está disponible.")
         attempt.status = ExamAttempt.Status.ABANDONED
         attempt.completed_at = now
         attempt.save()
+        invalidate_exam_statistics(attempt.exam_id)
         return redirect("exams_available")
 
     # Obtener la siguiente pregunta usando el servicio SPRT
@@ -190,10 +203,17 @@ def take_attempt(request, attempt_id):
         "?"
     )  # Aleatorizar orden
 
+    # El tiempo se cuenta desde la entrega registrada, por lo que recargar
+    # la página no reinicia el temporizador
+    issued_at = attempt.current_question_issued_at or now
+    elapsed = int((now - issued_at).total_seconds())
+    time_remaining = min(question.time, max(question.time - elapsed, 0))
+
     context = {
         "attempt": attempt,
         "question": question,
         "options": options,
+        "time_remaining": time_remaining,
         "question_number": attempt.total_questions + 1,
         "max_questions": attempt.exam.max_questions,
         "current_level": attempt.current_difficulty_level,
@@ -225,9 +245,9 @@ def submit_answer(request, attempt_id):
         # Obtener datos del POST
         question_id = request.POST.get("question_id")
         option_id = request.POST.get("option_id")
-        question_shown_at_str = request.POST.get("question_shown_at")
+        include_next = request.POST.get("include_next") == "1"
 
-        if not all([question_id, option_id, question_shown_at_str]):
+        if not all([question_id, option_id]):
             return JsonResponse(
                 {"success": False, "error": "Datos incompletos"}, status=400
             )
@@ -236,14 +256,25 @@ def submit_answer(request, attempt_id):
         question = get_object_or_404(Question, pk=question_id)
         option = get_object_or_404(AnswerOption, pk=option_id, question=question)
 
-        # Parsear timestamp
-        try:
-            question_shown_at = datetime.fromisoformat(
-                question_shown_at_str.replace("Z", "+00:00")
+        # Solo se acepta la pregunta entregada actualmente al intento
+        if str(attempt.current_question_id) != str(question_id):
+            return JsonResponse(
+                {
+                    "success": False,
+                    "error": "Pregunta no válida para este intento",
+                },
+                status=400,
             )
-        except ValueError:
+
+        # La hora en que se mostró la pregunta es la entrega registrada en el
+        # servidor
+        if not attempt.current_question_issued_at:
             return JsonResponse(
-                {"success": False, "error": "Formato de fecha inválido"}, status=400
+                {
+                    "success": False,
+                    "error": "La pregunta no tiene una entrega registrada",
+                },
+                status=400,
             )
 
         # Procesar respuesta usando el servicio SPRT
@@ -251,7 +282,7 @@ def submit_answer(request, attempt_id):
         result = sprt_service.process_answer(
             question=question,
             selected_option=option,
-            question_shown_at=question_shown_at,
+            question_shown_at=attempt.current_question_issued_at,
         )
 
         # Alamcenar todas las demas opciones de respuesta
@@ -295,15 +326,43 @@ def submit_answer(request, attempt_id):
             "accuracy": round(attempt.get_accuracy(), 2),
         }
 
+        # Entregar la siguiente pregunta para avanzar sin recargar la página.
+        # Su tiempo cuenta desde esta entrega, cuando su contenido ya está en
+        # el cliente
+        if result["decision"] == "continue" and include_next:
+            next_question = sprt_service.get_next_question()
+
+            if next_question:
+                payload = serialize_question(next_question)
+                payload["time_remaining"] = next_question.time
+                payload["question_number"] = attempt.total_questions + 1
+                payload["max_questions"] = sprt_service.exam.max_questions
+                payload["level"] = (
+                    attempt.current_difficulty_level.name
+                    if attempt.current_difficulty_level
+                    else ""
+                )
+                payload["progress_percentage"] = (
+                    attempt.total_questions / sprt_service.exam.max_questions
+                ) * 100
+                response_data["next_question"] = payload
+            else:
+                # El examen finalizó al no quedar preguntas disponibles
+                response_data["next_question"] = None
+                response_data["decision"] = attempt.status
+
         # Si el examen terminó, agregar URL de resultados
-        if result["decision"] in ["approved", "failed"]:
+        if response_data["decision"] in ["approved", "failed"]:
             response_data["redirect_url"] = (
-                f"/sprt/attempts/{attempt.id}/{attempt.student.id}/results/"
+                f"/sprt/attempts/{attempt.id}/{attempt.student_id}/results/"
             )
-            response_data["status"] = result["decision"]
+            response_data["status"] = response_data["decision"]
 
         return JsonResponse(response_data)
 
+    except ValueError as e:
+        # Respuesta repetida o a un intento que ya finalizó
+        return JsonResponse({"success": False, "error": str(e)}, status=409)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
@@ -339,9 +398,10 @@ def attempt_results(request, attempt_id, student_id):
     ]
 
     # Configuración SPRT para mostrar límites
-    sprt_config = attempt.exam.sprt_config
-    lower_limit = SPRTService(attempt).lower_limit
-    upper_limit = SPRTService(attempt).upper_limit
+    sprt_service = SPRTService(attempt)
+    sprt_config = sprt_service.config
+    lower_limit = sprt_service.lower_limit
+    upper_limit = sprt_service.upper_limit
 
     context = {
         "attempt": attempt,
@@ -403,6 +463,7 @@ def abandon_attempt(request, attempt_id):
     attempt.status = ExamAttempt.Status.ABANDONED
     attempt.completed_at = timezone.now()
     attempt.save()
+    invalidate_exam_statistics(attempt.exam_id)
 
     messages.warning(request, "Has abandonado el intento.")
     return redirect("exams_available")
@@ -419,56 +480,27 @@ def exam_students(request, exam_id):
     """
     exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
 
-    # Obtener intentos del examen
-    attempts = ExamAttempt.objects.filter(exam=exam).select_related("student")
-
-    # Agrupar por estudiante y contar intentos
-    student_data = {}
-    for attempt in attempts:
-        student_id = attempt.student.id
-        if student_id not in student_data:
-            student_data[student_id] = {
-                "student": attempt.student,
-                "attempts": [],
-            }
-        student_data[student_id]["attempts"].append(attempt)
-
-    # Preparar lista para la plantilla
-    exam_data = []
-    for data in student_data.values():
-        attempts = data["attempts"]
-        attempts_used = len(attempts)
-        attempts_remaining = exam.max_attempts - attempts_used
-        can_attempt = attempts_remaining > 0
-
-        # Verificar si hay un intento en progreso
-        in_progress_attempt = next(
-            (a for a in attempts if a.status == ExamAttempt.Status.IN_PROGRESS), None
-        )
-
-        # cada attempt tiene un metodo get_accuracy() que devuelve el porcentaje de aciertos
-        total_accuracy = sum(
-            a.get_accuracy() for a in attempts if a.get_accuracy() is not None
-        )
-        average_score = total_accuracy / attempts_used if attempts_used > 0 else 0
-
-        exam_data.append(
-            {
-                "student": data["student"],
-                "attempts_used": attempts_used,
-                "attempts_remaining": attempts_remaining,
-                "can_attempt": can_attempt,
-                "in_progress_attempt": in_progress_attempt,
-                "last_attempt": attempts[0] if attempts else None,
-                "total_attempts": attempts if attempts else None,
-                "average_score": average_score,
-            }
-        )
-
-    paginator = Paginator(exam_data, 5)
+    # Un resumen por estudiante agrupado y paginado en la base de datos
+    paginator = Paginator(student_summaries(exam), 5)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    page_obj.object_list = [
+        {
+            "student_id": summary["student_id"],
+            "name": student_name(summary),
+            "document_number": summary["student__document_number"],
+            "email": summary["student__email"],
+            "attempts_used": summary["attempts_used"],
+            "attempts_remaining": exam.max_attempts - summary["attempts_used"],
+            "can_attempt": summary["attempts_used"] < exam.max_attempts,
+            "in_progress": summary["in_progress"] > 0,
+            "last_started_at": summary["last_started_at"],
+            "average_score": summary["average_score"] or 0,
+        }
+        for summary in page_obj.object_list
+    ]
+
     context = {
         "page_obj": page_obj,
         "exam": exam,
@@ -486,60 +518,12 @@ def export_attempt_csv(request, attempt_id):
     """
     Exporta los resultados de un intento a CSV.
     """
-    attempt = get_object_or_404(ExamAttempt, pk=attempt_id)
-
-    # Crear respuesta HTTP
-    response = HttpResponse(content_type="text/csv")
-    filename = f"Intento # {attempt.id} de {attempt.student} ({attempt.started_at.strftime('%Y-%m-%d')}).csv"
-    ascii_filename = urllib.parse.quote(filename)
-    response["Content-Disposition"] = f'attachment; filename="{ascii_filename}"'
-    response.write("\ufeff".encode("utf8"))
-
-    # Generar CSV
-    writer = csv.writer(response)
-
-    # Encabezados
-    writer.writerow(
-        [
-            "#",
-            "Nivel",
-            "Área",
-            "Tema de la Pregunta",
-            "Respuesta Seleccionada",
-            "Es Correcta",
-            "Tiempo (s)",
-            "Tiempo Permitido (s)",
-            "Violación Tiempo",
-            "Índice S",
-        ]
+    attempt = get_object_or_404(
+        ExamAttempt.objects.select_related("student"), pk=attempt_id
     )
 
-    # Datos
-    for answer in attempt.answers.all().order_by("question_number"):
-        writer.writerow(
-            [
-                answer.question_number,
-                answer.difficulty_level.name if answer.difficulty_level else "N/A",
-                (
-                    answer.question.knowledge_area.name
-                    if answer.question.knowledge_area
-                    else "N/A"
-                ),
-                (answer.question.topic if answer.question.topic else "N/A"),
-                (
-                    answer.selected_option.option_text[:30] + "..."
-                    if answer.selected_option.option_text
-                    else "Respuesta no disponible"
-                ),
-                "Sí" if answer.is_correct else "No",
-                answer.time_taken_seconds,
-                answer.allowed_time_seconds,
-                "Sí" if answer.time_violation else "No",
-                round(answer.s_index_after, 4),
-            ]
-        )
-
-    return response
+    filename = f"Intento # {attempt.id} de {attempt.student} ({attempt.started_at.strftime('%Y-%m-%d')}).csv"
+    return stream_csv(attempt_answers_rows(attempt), filename)
 
 
 # -------------------------------------------------------------------
@@ -553,76 +537,65 @@ def export_exam_results(request, exam_id):
     """
     exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
 
-    attempts = (
-        ExamAttempt.objects.filter(exam=exam)
-        .exclude(status=ExamAttempt.Status.IN_PROGRESS)
-        .select_related("student")
-        .order_by("-started_at")
+    filename = f"Resultados de {exam.title} ({timezone.now().strftime('%Y-%m-%d')}).csv"
+    return stream_csv(exam_results_rows(exam), filename)
+
+
+# -------------------------------------------------------------------
+# Exportar todas las respuestas de un examen
+# -------------------------------------------------------------------
+@login_required(login_url="auth_login")
+@is_admin
+def export_exam_answers(request, exam_id):
+    """
+    Exporta a un solo CSV las respuestas de todos los intentos de un examen.
+    """
+    exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
+
+    filename = f"Respuestas de {exam.title} ({timezone.now().strftime('%Y-%m-%d')}).csv"
+    return stream_csv(exam_answers_rows(exam), filename)
+
+
+# -------------------------------------------------------------------
+# Reportes XLSX
+# -------------------------------------------------------------------
+@login_required(login_url="auth_login")
+@is_admin
+def export_exam_results_xlsx(request, exam_id):
+    """
+    Exporta los intentos, respuestas y progreso por nivel de un examen a XLSX.
+    """
+    exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
+
+    filename = (
+        f"Resultados de {exam.title} ({timezone.now().strftime('%Y-%m-%d')}).xlsx"
     )
+    return xlsx_response(exam_workbook_sheets(exam), filename)
 
-    # Crear CSV
-    response = HttpResponse(content_type="text/csv")
-    filename = f"Resultados de {exam.title} ({timezone.now().strftime('%Y-%m-%d')}).csv"
-    ascii_filename = urllib.parse.quote(filename)
-    response["Content-Disposition"] = f'attachment; filename="{ascii_filename}"'
-    response.write("\ufeff".encode("utf8"))
-
-    writer = csv.writer(response)
-
-    # Encabezados
-    writer.writerow(
-        [
-            "#",
-            "Documento",
-            "Estudiante",
-            "Institución",
-            "Programa",
-            "Examen",
-            "Intento #",
-            "Fecha Inicio",
-            "Fecha Fin",
-            "Total Preguntas",
-            "Correctas",
-            "Incorrectas",
-            "Precisión %",
-            "Índice S",
-            "Resultado",
-            "Consistencia",
-        ]
+
+@login_required(login_url="auth_login")
+@is_admin
+def export_attempt_xlsx(request, attempt_id):
+    """
+    Exporta el resumen, las respuestas y el progreso por nivel de un intento a XLSX.
+    """
+    attempt = get_object_or_404(
+        ExamAttempt.objects.select_related("student", "exam"), pk=attempt_id
     )
 
-    contador = 1
-
-    # Datos
-    for attempt in attempts:
-        writer.writerow(
-            [
-                contador,
-                attempt.student.document_number,
-                attempt.student or attempt.student.username,
-                attempt.student.institution.name if attempt.student.institution else "N/A",
-                (
-                    attempt.student.academic_department.name
-                    if attempt.student and attempt.student.academic_department
-                    else "N/A"
-                ),
-                attempt.exam.title,
-                attempt.attempt_number,
-                attempt.started_at.strftime("%Y-%m-%d %H:%M"),
-                (
-                    attempt.completed_at.strftime("%Y-%m-%d %H:%M")
-                    if attempt.completed_at
-                    else "N/A"
-                ),
-                attempt.total_questions,
-                attempt.correct_answers,
-                attempt.incorrect_answers,
-                round(attempt.get_accuracy(), 2),
-                round(attempt.s_index, 4),
-                attempt.get_status_display(),
-                attempt.get_consistency_feedback_display() or "N/A",
-            ]
-        )
-        contador += 1
+    filename = f"Intento # {attempt.id} de {attempt.student} ({attempt.started_at.strftime('%Y-%m-%d')}).xlsx"
+    return xlsx_response(attempt_workbook_sheets(attempt), filename)
+
+
+@login_required(login_url="auth_login")
+@is_admin
+def export_exam_students_xlsx(request, exam_id):
+    """
+    Exporta a XLSX el listado de estudiantes que presentaron un examen.
+    """
+    exam = get_object_or_404(Exam, pk=exam_id, deleted_at__isnull=True)
 
-    return response
+    filename = (
+        f"Estudiantes de {exam.title} ({timezone.now().strftime('%Y-%m-%d')}).xlsx"
+    )
+    return xlsx_response([("Estudiantes", exam_students_rows(exam))], filename)
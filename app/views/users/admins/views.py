@@ -2,7 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from decorators.super_admin import is_super_admin
 from app.models import CustomUser, Institution, Role
-from django.db.models import Q
+from app.services.people_search import search_people
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.utils import timezone
@@ -15,11 +15,7 @@ def table(request):
     admins = CustomUser.objects.filter(role__name="admin", deleted_at__isnull=True)
 
     if query:
-        admins = admins.filter(
-            Q(first_name__icontains=query)
-            | Q(last_name__icontains=query)
-            | Q(email__icontains=query)
-        )
+        admins = search_people(admins, query)
 
     admins = admins.order_by("-created_at")
 
@@ -9,7 +9,7 @@ from app.models import (
     DocumentType,
     Role,
 )
-from django.db.models import Q
+from app.services.people_search import search_people
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.utils import timezone
@@ -27,12 +27,7 @@ def table(request):
         students = students.filter(institution=request.user.institution)
 
     if query:
-        students = students.filter(
-            Q(first_name__icontains=query)
-            | Q(last_name__icontains=query)
-            | Q(email__icontains=query)
-            | Q(document_number__icontains=query)
-        )
+        students = search_people(students, query)
 
     students = students.order_by("-created_at")
 
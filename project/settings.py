@@ -107,6 +107,17 @@ DATABASES = {
     }
 }
 
+# Caché compartida entre procesos e instancias, en la misma base de datos:
+# las invalidaciones de estadísticas, catálogo e inventario llegan a todos.
+# La tabla la crea la migración 0035; si cambia LOCATION, ejecutar
+# python manage.py createcachetable
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "app_cache",
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -152,6 +163,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Archivos privados (exportaciones con datos de estudiantes): no se publican en
+# MEDIA_URL y solo se descargan desde la vista autenticada de exportaciones
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, "private_media")
+
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # Default primary key field type
@@ -23,6 +23,7 @@ from app.urls import (
     students_urls,
     
     sprt_urls,
+    exports_urls,
 )
 
 urlpatterns = [
@@ -47,6 +48,7 @@ urlpatterns = [
     path("students/", include(students_urls)),
     
     path("sprt/", include(sprt_urls)),
+    path("exports/", include(exports_urls)),
 ]
 
 if settings.DEBUG:
@@ -1,3 +1,5 @@
+import re
+import unicodedata
 from django.utils.crypto import get_random_string
 from datetime import datetime
 
@@ -16,3 +18,17 @@ def generate_unique_filename(file):
     unique_filename = f"{timestamp}_{random_str}.{ext}"
 
     return unique_filename
+
+
+def normalize_search_text(*parts):
+    # Minúsculas, sin tildes y con espacios simples, para búsquedas que no
+    # distinguen mayúsculas ni acentos
+    text = " ".join(str(part) for part in parts if part)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+def document_digits(value):
+    # Número de documento sin separadores (1.234.567 -> 1234567)
+    return re.sub(r"\D", "", value or "")